@@ -1,15 +1,6 @@
 import logging 
-import os 
 
-log_dir = "logging"
-os.makedirs(log_dir, exist_ok=True)
-
-logging.basicConfig(
-    filename=os.path.join(log_dir,'debug.log'),
-    level=logging.DEBUG,
-    filemode='w',
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+logger = logging.getLogger(__name__)
 
 def main_values(col_name,col_para_name,parameters,treshold,dataframe):
     """
@@ -30,22 +21,23 @@ def main_values(col_name,col_para_name,parameters,treshold,dataframe):
         top_values : list of dictionnary with values as keys and their count as values
     """
 
-    logging.info("Running main_values function")
-    logging.debug(f"Arguments: col_name={col_name}, col_para_name={col_para_name}, parameters={parameters}, treshold={treshold}")
+    logger.info("Running main_values function")
+    logger.debug("Arguments: col_name=%s, col_para_name=%s, parameters=%s, treshold=%s",
+                 col_name, col_para_name, parameters, treshold)
 
     # Verify that columns exist in the DataFrame
     if col_name not in dataframe.columns or col_para_name not in dataframe.columns:
-        logging.error(f"Columns '{col_name}' or '{col_para_name}' do not exist in the DataFrame.")
+        logger.error("Columns '%s' or '%s' do not exist in the DataFrame.", col_name, col_para_name)
         raise ValueError("col_name or col_para_name does not exist in the DataFrame")
 
     # Verify column names are strings
     if not isinstance(col_name, str) or not isinstance(col_para_name, str):
-        logging.error("col_name and col_para_name must be strings.")
+        logger.error("col_name and col_para_name must be strings.")
         raise ValueError("col_name and col_para_name must be strings")
 
     # Verify treshold is an integer
     if not isinstance(treshold, int):
-        logging.error("treshold must be an integer.")
+        logger.error("treshold must be an integer.")
         raise ValueError("treshold must be an integer")
 
     try:
@@ -55,19 +47,19 @@ def main_values(col_name,col_para_name,parameters,treshold,dataframe):
         # Normalize parameters to a list
         params = parameters if isinstance(parameters, list) else [parameters]
 
-        logging.info(f"Analyzing parameters: {params}")
+        logger.info("Analyzing parameters: %s", params)
 
         for p in params:
-            logging.debug(f"Processing parameter: {p}")
+            logger.debug("Processing parameter: %s", p)
             val_counts = dataframe[dataframe[col_para_name] == p][col_name].value_counts().head(treshold)
-            logging.info(f"Top {treshold} values for parameter '{p}' in '{col_para_name}': {val_counts.to_dict()}")
+            logger.info("Top %s values for parameter '%s' in '%s': %s", treshold, p, col_para_name, val_counts.to_dict())
             # Convert value counts to dictionary and append to top_values list
             top_values.append(val_counts.to_dict())
 
-        logging.info("Successfully calculated top values.")
+        logger.info("Successfully calculated top values.")
         return top_values
 
     except Exception as e:
-        logging.error(f"Error in main_values: {e}")
+        logger.error("Error in main_values: %s", e)
         raise
 
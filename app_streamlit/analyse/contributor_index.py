@@ -0,0 +1,67 @@
+"""Index of the recipes of each contributor, built once per dataset"""
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def sort_by_contributor(df):
+    """
+    Sort the recipes by contributor, keeping the order of the recipes of a contributor.
+
+    Args:
+        df (pd.DataFrame): recipes with the 'contributor_id' column.
+
+    Returns:
+        pd.DataFrame: the sorted recipes, with a new range index.
+    """
+    ids = df['contributor_id'].to_numpy()
+    if (ids[:-1] <= ids[1:]).all():
+        return df
+    order = np.argsort(ids, kind='stable')
+    return df.take(order).reset_index(drop=True)
+
+
+class ContributorIndex():
+    def __init__(self, df):
+        """
+        Offsets of the recipes of each contributor in a dataFrame sorted by contributor.
+
+        The recipes of `contributors[i]` are the rows `offsets[i]` to `offsets[i + 1]` of `df`.
+        The dataFrame is sorted first if it is not (see `sort_by_contributor`).
+
+        Args:
+            df (pd.DataFrame): recipes with the 'contributor_id' column.
+
+        Returns:
+            None.
+        """
+        self.df = sort_by_contributor(df)
+        ids = self.df['contributor_id'].to_numpy()
+        self.contributors, starts = np.unique(ids, return_index=True)
+        self.offsets = np.append(starts, len(ids))
+        logger.info("Contributor index built: %s contributors", len(self.contributors))
+
+    def __len__(self):
+        return len(self.contributors)
+
+    def __contains__(self, contributor_id):
+        position = np.searchsorted(self.contributors, contributor_id)
+        return position < len(self.contributors) and self.contributors[position] == contributor_id
+
+    def recipes(self, contributor_id):
+        """
+        Recipes of a contributor, a slice of the sorted dataFrame.
+
+        Args:
+            contributor_id (int): id of the contributor.
+
+        Returns:
+            pd.DataFrame: the recipes of the contributor, empty if they have none.
+        """
+        if contributor_id not in self:
+            return self.df.iloc[0:0]
+        position = np.searchsorted(self.contributors, contributor_id)
+        return self.df.iloc[self.offsets[position]:self.offsets[position + 1]]
@@ -0,0 +1,147 @@
+"""Registry of the columns derived from the dataset, computed once per version of the dataset"""
+
+import logging
+import threading
+
+import pandas as pd
+
+from analyse.memo import VERSION_ATTR, shares_data
+
+logger = logging.getLogger(__name__)
+
+# name -> (source columns, function computing the column from a dataFrame)
+_REGISTRY = {}
+
+# version of the dataset -> (full dataFrame, derived columns already computed)
+_DATASETS = {}
+
+_lock = threading.Lock()
+
+
+def register_derived(name, sources):
+    """
+    Register the function computing a derived column.
+
+    The function takes a dataFrame and returns a series with the same index. It must not
+    modify the dataFrame.
+
+    Args:
+        name (str): name of the derived column.
+        sources (list): columns the derived column is computed from.
+
+    Returns:
+        callable: decorator registering the function.
+    """
+    def decorator(compute):
+        _REGISTRY[name] = (list(sources), compute)
+        return compute
+    return decorator
+
+
+def register_dataset(df):
+    """
+    Register the full dataFrame of a version of the dataset (see memo.set_dataset_version).
+
+    The derived columns of this dataFrame and of its views and slices are computed once,
+    on the full dataFrame, the first time they are asked for.
+    """
+    version = df.attrs.get(VERSION_ATTR)
+    if version is None:
+        raise ValueError("The dataFrame has no dataset version, see memo.set_dataset_version")
+    with _lock:
+        _DATASETS[version] = (df, {})
+
+
+def clear_derived(version=None):
+    """
+    Forget the derived columns of a version of the dataset, or of every version.
+    """
+    with _lock:
+        if version is None:
+            _DATASETS.clear()
+        else:
+            _DATASETS.pop(version, None)
+
+
+def derived_nbytes():
+    """
+    Memory held by the derived columns already computed.
+    """
+    return sum(
+        int(column.memory_usage(deep=True)) for _, columns in _DATASETS.values() for column in columns.values()
+    )
+
+
+def _holds_full_values(values, full_values, positions):
+    """
+    True if a source column of a view holds the values of the full dataFrame at its rows.
+
+    A column still pointing to the buffer of the full dataFrame is checked in constant time,
+    the values are only compared when the view made a copy of the column.
+    """
+    if shares_data(values, full_values):
+        return True
+    if positions is not None:
+        full_values = full_values.take(positions)
+    return values.reset_index(drop=True).equals(full_values.reset_index(drop=True))
+
+
+def _stored_column(df, name):
+    """
+    Derived column of the full dataFrame of the version of `df`, None if `df` is not a view of it.
+    """
+    sources, compute = _REGISTRY[name]
+    entry = _DATASETS.get(df.attrs.get(VERSION_ATTR))
+    if entry is None:
+        return None
+    full_df, columns = entry
+
+    positions = None
+    if not (df.index is full_df.index or df.index.equals(full_df.index)):
+        if not full_df.index.is_unique:
+            return None
+        positions = full_df.index.get_indexer(df.index)
+        if (positions < 0).any():
+            return None
+
+    for col in sources:
+        # a page converting a source column gets its own derived column
+        if col not in df.columns or col not in full_df.columns or df[col].dtype != full_df[col].dtype:
+            return None
+        # and so does a page rewriting its values (e.g. clipping 'minutes')
+        if df is not full_df and not _holds_full_values(df[col], full_df[col], positions):
+            return None
+
+    with _lock:
+        if name not in columns:
+            columns[name] = compute(full_df).rename(name)
+            logger.info("Derived column '%s' computed for dataset %s", name, df.attrs.get(VERSION_ATTR))
+        column = columns[name]
+
+    if positions is None:
+        return column
+    return pd.Series(column.array.take(positions), index=df.index, name=name)
+
+
+def derived_column(df, name):
+    """
+    Value of a derived column for the rows of a dataFrame, without modifying it.
+
+    Views and slices of a registered dataset read the column computed once for the whole
+    dataset, as long as their source columns hold the values of the dataset. Other dataFrames,
+    and views whose source columns were rewritten, get the column computed for them.
+
+    Args:
+        df (pd.DataFrame): dataset or part of it.
+        name (str): name of a registered derived column.
+
+    Returns:
+        pd.Series: the derived column, with the index of df.
+    """
+    if name not in _REGISTRY:
+        raise KeyError(f"No derived column '{name}', registered: {list(_REGISTRY)}")
+    column = _stored_column(df, name)
+    if column is None:
+        logger.debug("Derived column '%s' computed for a dataFrame of %s rows", name, len(df))
+        column = _REGISTRY[name][1](df).rename(name)
+    return column
@@ -0,0 +1,219 @@
+"""Lookup of the ingredient names from their IDs, built once when the dataset is loaded"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from load_data.list_columns import flatten_list_column
+
+logger = logging.getLogger(__name__)
+
+# Ingredients not counted in the top ingredients by default
+DEFAULT_EXCLUDED_INGREDIENTS = frozenset({
+    'black pepper', 'vegetable oil', 'salt', 'pepper', 'olive oil',
+    'butter', 'water', 'sugar', 'flour', 'brown sugar',
+})
+
+UNKNOWN_INGREDIENT = 'Unknown'
+
+SEASONS = ['winter', 'spring', 'summer', 'autumn']
+
+
+class IngredientLookup():
+    def __init__(self, df_ingr_map):
+        """
+        Dense lookup of the ingredient names.
+
+        `codes[id]` is the code of the name of the ingredient `id` in `names`. IDs missing from
+        the map get the code of 'Unknown', which is the last name. Several IDs can share
+        the same name, their occurrences are then counted together.
+
+        Args:
+            df_ingr_map (pd.DataFrame): dataFrame mapping ingredient IDs ('id') to their names ('replaced').
+
+        Returns:
+            None.
+        """
+        ingr_map = df_ingr_map.drop_duplicates(subset='id', keep='last')
+        ids = ingr_map['id'].to_numpy(dtype=np.int64)
+        name_codes, names = pd.factorize(ingr_map['replaced'].astype(str))
+
+        self.names = pd.Index(list(names) + [UNKNOWN_INGREDIENT], name='mapped_ingredients')
+        self.unknown_code = len(self.names) - 1
+        size = int(ids.max()) + 1 if len(ids) else 0
+        self.codes = np.full(size, self.unknown_code, dtype=np.int32)
+        self.codes[ids] = name_codes
+        logger.info("Ingredient lookup built: %s IDs, %s names", len(ids), len(self.names))
+
+    def codes_aligned(self, ids):
+        """
+        Codes of the names of ingredient IDs, one per ID.
+
+        Args:
+            ids (np.ndarray): ingredient IDs.
+
+        Returns:
+            np.ndarray: codes in `names`, -1 for NaN or negative IDs.
+        """
+        ids = np.asarray(ids)
+        valid = ~np.isnan(ids) if ids.dtype.kind == 'f' else np.ones(len(ids), dtype=bool)
+        ids = np.where(valid, ids, -1).astype(np.int64)
+        codes = np.full(len(ids), -1, dtype=np.int32)
+        codes[ids >= 0] = self.unknown_code
+        known = (ids >= 0) & (ids < len(self.codes))
+        codes[known] = self.codes[ids[known]]
+        return codes
+
+    def codes_of(self, ids):
+        """
+        Codes of the names of ingredient IDs.
+
+        Args:
+            ids (np.ndarray): ingredient IDs, NaN or negative values are dropped.
+
+        Returns:
+            np.ndarray: codes in `names`.
+        """
+        codes = self.codes_aligned(ids)
+        return codes[codes >= 0]
+
+    def excluded_mask(self, excluded_ingredients):
+        """
+        Boolean mask over the codes of the excluded names.
+        """
+        return self.names.isin(list(excluded_ingredients))
+
+    def count(self, ids):
+        """
+        Number of occurrences of each name, indexed by code.
+
+        Args:
+            ids (np.ndarray): flat array of ingredient IDs.
+
+        Returns:
+            np.ndarray: counts of length len(names).
+        """
+        return np.bincount(self.codes_of(ids), minlength=len(self.names))
+
+    def top(self, counts, excluded_ingredients=None, top_n=10):
+        """
+        Most frequent names from counts indexed by code.
+
+        Args:
+            counts (np.ndarray): counts returned by `count`.
+            excluded_ingredients (set, optional): names not returned. Defaults to DEFAULT_EXCLUDED_INGREDIENTS.
+            top_n (int): number of names to return.
+
+        Returns:
+            pd.Series: top N names with their number of occurrences.
+        """
+        if excluded_ingredients is None:
+            excluded_ingredients = DEFAULT_EXCLUDED_INGREDIENTS
+        counts = np.where(self.excluded_mask(excluded_ingredients), 0, counts)
+        order = np.argsort(-counts, kind='stable')[:top_n]
+        order = order[counts[order] > 0]
+        return pd.Series(counts[order], index=self.names[order], name='count')
+
+    def top_ingredients(self, df, excluded_ingredients=None, top_n=10):
+        """
+        Most used ingredients of the recipes of a dataFrame.
+
+        Args:
+            df (pd.DataFrame): recipes with the 'ingredient_ids' column.
+            excluded_ingredients (set, optional): names not counted. Defaults to DEFAULT_EXCLUDED_INGREDIENTS.
+            top_n (int): number of ingredients to return.
+
+        Returns:
+            pd.Series: top N ingredients with their number of occurrences.
+        """
+        ids, _ = flatten_list_column(df['ingredient_ids'], 'int')
+        return self.top(self.count(ids), excluded_ingredients, top_n)
+
+
+class SeasonalIngredientCounts():
+    def __init__(self, df, lookup, excluded_ingredients=None):
+        """
+        Number of occurrences of each ingredient in each season, computed in one pass.
+
+        `matrix[s, c]` is the number of occurrences of the name of code `c` in `lookup.names`
+        in the recipes of the season SEASONS[s]. The excluded ingredients are counted as 0.
+
+        Args:
+            df (pd.DataFrame): recipes with the 'season' and 'ingredient_ids' columns.
+            lookup (IngredientLookup): lookup of the ingredient names.
+            excluded_ingredients (set, optional): names not counted. Defaults to DEFAULT_EXCLUDED_INGREDIENTS.
+
+        Returns:
+            None.
+        """
+        if excluded_ingredients is None:
+            excluded_ingredients = DEFAULT_EXCLUDED_INGREDIENTS
+        self.lookup = lookup
+
+        ids, lengths = flatten_list_column(df['ingredient_ids'], 'int')
+        seasons = pd.Categorical(df['season'], categories=SEASONS).codes
+        seasons = np.repeat(seasons, lengths)
+        codes = lookup.codes_aligned(ids)
+        keep = (seasons >= 0) & (codes >= 0)
+
+        n_names = len(lookup.names)
+        flat = seasons[keep].astype(np.int64) * n_names + codes[keep]
+        self.matrix = np.bincount(flat, minlength=len(SEASONS) * n_names).reshape(len(SEASONS), n_names)
+        self.matrix[:, lookup.excluded_mask(excluded_ingredients)] = 0
+        logger.info("Seasonal ingredient counts built from %s ingredients", keep.sum())
+
+    def top_codes(self, top_n):
+        """
+        Codes of the top N names of each season, by decreasing count.
+
+        Returns:
+            list: one array of codes per season, in the order of SEASONS.
+        """
+        order = np.argsort(-self.matrix, axis=1, kind='stable')[:, :top_n]
+        counts = np.take_along_axis(self.matrix, order, axis=1)
+        return [season_order[season_counts > 0] for season_order, season_counts in zip(order, counts)]
+
+    def top(self, top_n):
+        """
+        Top N ingredients of each season.
+
+        Returns:
+            list: one pd.Series per season (names and counts), in the order of SEASONS.
+        """
+        return [
+            pd.Series(season_counts[codes], index=self.lookup.names[codes], name='count')
+            for season_counts, codes in zip(self.matrix, self.top_codes(top_n))
+        ]
+
+    def _unique_codes(self, top_n):
+        """
+        Codes of the names in the top N of one season only, by decreasing count.
+        """
+        top_codes = self.top_codes(top_n)
+        in_top = np.zeros(self.matrix.shape, dtype=bool)
+        for season, codes in enumerate(top_codes):
+            in_top[season, codes] = True
+        only_one = in_top.sum(axis=0) == 1
+        return [codes[only_one[codes]] for codes in top_codes]
+
+    def unique(self, top_n):
+        """
+        Ingredients in the top N of one season only.
+
+        Returns:
+            list: one list of names per season, in the order of SEASONS, by decreasing count.
+        """
+        return [list(self.lookup.names[codes]) for codes in self._unique_codes(top_n)]
+
+    def unique_counts(self, top_n):
+        """
+        Ingredients in the top N of one season only, with their count in that season.
+
+        Returns:
+            list: one pd.Series per season (names and counts), in the order of SEASONS.
+        """
+        return [
+            pd.Series(season_counts[codes], index=self.lookup.names[codes], name='count')
+            for season_counts, codes in zip(self.matrix, self._unique_codes(top_n))
+        ]
@@ -0,0 +1,327 @@
+"""Memoization of the analysis functions, keyed by the version of the dataset and the call arguments"""
+
+import functools
+import logging
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Key of DataFrame.attrs holding the fingerprint of the dataset (hash of the source csv)
+VERSION_ATTR = 'dataset_version'
+
+# version of the dataset -> weak references to the dataFrames tagged with it, the data of the version
+_TAGGED_FRAMES = {}
+_tagged_lock = threading.Lock()
+
+
+class _NotMemoizable(Exception):
+    """Raised when the arguments of a call can not be part of a key."""
+
+
+def set_dataset_version(df, version):
+    """
+    Tag a dataFrame with the version of the dataset, so calls on it can be memoized.
+
+    The tag follows the views and slices of the dataFrame (DataFrame.attrs). The dataFrame
+    is the data of the version: a call is only memoized while the columns of its frames
+    still point to the buffers of a dataFrame tagged with their version.
+    """
+    df.attrs[VERSION_ATTR] = version
+    with _tagged_lock:
+        refs = [ref for ref in _TAGGED_FRAMES.get(version, []) if ref() is not None and ref() is not df]
+        _TAGGED_FRAMES[version] = refs + [weakref.ref(df)]
+    return df
+
+
+def _tagged_frames(version):
+    """
+    DataFrames tagged with a version of the dataset and still alive.
+    """
+    with _tagged_lock:
+        refs = list(_TAGGED_FRAMES.get(version, []))
+    return [frame for frame in (ref() for ref in refs) if frame is not None]
+
+
+def _tagged_column(tagged, name):
+    """
+    Column of a tagged dataFrame (or the tagged series) of this name, None if it has none.
+    """
+    if isinstance(tagged, pd.DataFrame):
+        return tagged[name] if name in tagged.columns and tagged.columns.is_unique else None
+    return tagged if tagged.name == name else None
+
+
+def _buffer_ranges(array):
+    """
+    Memory ranges (start, end) of the buffers holding the values of a column.
+    """
+    if isinstance(array, pd.Categorical):
+        array = array.codes
+    if hasattr(array, '__arrow_array__'):
+        return [(buffer.address, buffer.address + buffer.size)
+                for chunk in array.__arrow_array__().chunks for buffer in chunk.buffers()
+                if buffer is not None and buffer.size]
+    values = np.asarray(array)
+    start = values.__array_interface__['data'][0]
+    return [(start, start + values.nbytes)] if values.nbytes else []
+
+
+def shares_data(series, shared_series):
+    """
+    Check whether a column of a view, or of a slice of rows, still points to the buffer of the shared store.
+
+    Args:
+        series (pd.Series): column of the view.
+        shared_series (pd.Series): same column in the shared store.
+
+    Returns:
+        bool: True if no copy of the column has been made.
+    """
+    if series.array is shared_series.array:
+        return True
+    if series.dtype != shared_series.dtype:
+        return False
+    if isinstance(series.dtype, np.dtype):
+        return np.shares_memory(series.to_numpy(), shared_series.to_numpy())
+    shared_ranges = _buffer_ranges(shared_series.array)
+    return any(start < shared_end and shared_start < end
+               for start, end in _buffer_ranges(series.array) for shared_start, shared_end in shared_ranges)
+
+
+def _index_fingerprint(index, tagged):
+    """
+    Fingerprint of the rows of a dataFrame, so slices of the same dataset get different keys.
+
+    An index sharing the buffer of the index of a tagged dataFrame is identified by the
+    position of its values in that buffer, without reading them.
+    """
+    if isinstance(index, pd.RangeIndex):
+        return ('range', index.start, index.stop, index.step)
+    if isinstance(index.dtype, np.dtype):
+        values = np.asarray(index)
+        for frame in tagged:
+            if not isinstance(frame.index, pd.RangeIndex) and np.shares_memory(values, np.asarray(frame.index)):
+                return ('buffer', values.__array_interface__['data'][0], len(values), values.strides, str(values.dtype))
+    return ('hash', len(index), int(pd.util.hash_pandas_object(index, index=False).sum()))
+
+
+def _frame_fingerprint(frame):
+    """
+    Fingerprint of a dataFrame or a series of a versioned dataset.
+
+    Raises:
+        _NotMemoizable: the frame is not tagged with a dataset version, or a page rewrote
+            or added a column (it no longer points to the data of the version).
+    """
+    version = frame.attrs.get(VERSION_ATTR)
+    if version is None:
+        raise _NotMemoizable('frame without dataset version')
+    tagged = _tagged_frames(version)
+    if not any(frame is item for item in tagged):
+        items = frame.items() if isinstance(frame, pd.DataFrame) else [(frame.name, frame)]
+        for name, series in items:
+            shared = (_tagged_column(item, name) for item in tagged)
+            if not any(column is not None and shares_data(series, column) for column in shared):
+                raise _NotMemoizable(f"column '{name}' is not the data of dataset {version}")
+    if isinstance(frame, pd.DataFrame):
+        columns = tuple((str(col), str(dtype)) for col, dtype in frame.dtypes.items())
+    else:
+        columns = ((str(frame.name), str(frame.dtype)),)
+    return (version, columns, _index_fingerprint(frame.index, tagged))
+
+
+def _make_key(value):
+    """
+    Hashable key of an argument.
+
+    Raises:
+        _NotMemoizable: the argument can not be part of a key.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return _frame_fingerprint(value)
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(_make_key(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return ('set', frozenset(_make_key(item) for item in value))
+    if isinstance(value, dict):
+        return ('dict', frozenset((key, _make_key(item)) for key, item in value.items()))
+    try:
+        hash(value)
+    except TypeError:
+        raise _NotMemoizable(f'unhashable argument of type {type(value).__name__}')
+    return value
+
+
+def _versions(value):
+    """
+    Dataset versions of the frames in an argument.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return {value.attrs.get(VERSION_ATTR)}
+    if isinstance(value, (list, tuple)):
+        return set().union(*[_versions(item) for item in value])
+    return set()
+
+
+def _nbytes(value):
+    """
+    Approximate memory held by a result.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_nbytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def _copy_result(value):
+    """
+    Copy of a memoized result given to a caller, so callers can not modify the stored one.
+
+    With copy-on-write the copy of a dataFrame only copies the columns the caller writes into.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False) if pd.get_option('mode.copy_on_write') else value.copy()
+    if isinstance(value, tuple):
+        return tuple(_copy_result(item) for item in value)
+    if isinstance(value, list):
+        return [_copy_result(item) for item in value]
+    return value
+
+
+class AnalysisMemo():
+    def __init__(self, max_entries=128, max_bytes=256_000_000):
+        """
+        Least recently used store of the results of analysis functions.
+
+        Entries are evicted when there are more than `max_entries` of them or when they hold
+        more than `max_bytes` together. A result bigger than `max_bytes` is not stored.
+
+        Args:
+            max_entries (int, optional): maximum number of results. Defaults to 128.
+            max_bytes (int, optional): maximum memory held by the results. Defaults to 256 MB.
+
+        Returns:
+            None.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Stored result of a key, None if there is none.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, result, versions):
+        """
+        Store a result and evict the least recently used ones over the limits.
+        """
+        nbytes = _nbytes(result)
+        if nbytes > self.max_bytes:
+            logger.debug("Result of %s not memoized: %s bytes", key[1], nbytes)
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[2]
+            self._entries[key] = (result, versions, nbytes)
+            self.nbytes += nbytes
+            while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def invalidate(self, version=None):
+        """
+        Drop the results computed on a version of the dataset, or all of them.
+
+        Args:
+            version (str, optional): version of the dataset. Defaults to None (every result).
+
+        Returns:
+            int: number of results dropped.
+        """
+        with self._lock:
+            if version is None:
+                keys = list(self._entries)
+            else:
+                keys = [key for key, entry in self._entries.items() if version in entry[1]]
+            for key in keys:
+                self.nbytes -= self._entries.pop(key)[2]
+        logger.info("Invalidated %s memoized results (version %s)", len(keys), version)
+        return len(keys)
+
+    def stats(self):
+        """
+        Counters of the memo.
+
+        Returns:
+            dict: hits, misses, number of entries and bytes held.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries), 'nbytes': self.nbytes}
+
+
+# Memo shared by the analysis functions of the process
+ANALYSIS_MEMO = AnalysisMemo()
+
+
+def memoize(func=None, *, memo=None):
+    """
+    Memoize an analysis function on the dataset version of its dataFrame arguments and its other arguments.
+
+    Calls where a dataFrame is not tagged with a version (see `set_dataset_version`) or
+    where an argument is not hashable are not memoized. The memo assumes the values of a
+    version of the dataset are never modified, which the shared store guarantees.
+
+    Args:
+        func (callable): function to memoize.
+        memo (AnalysisMemo, optional): memo to use. Defaults to ANALYSIS_MEMO.
+
+    Returns:
+        callable: the memoized function, with the memo in its `memo` attribute.
+    """
+    if func is None:
+        return functools.partial(memoize, memo=memo)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        store = wrapper.memo
+        try:
+            key = (func.__module__, func.__qualname__, _make_key(args), _make_key(kwargs))
+        except _NotMemoizable as error:
+            logger.debug("%s not memoized: %s", func.__qualname__, error)
+            return func(*args, **kwargs)
+
+        entry = store.get(key)
+        if entry is not None:
+            return _copy_result(entry[0])
+
+        result = func(*args, **kwargs)
+        versions = set().union(_versions(args), *[_versions(value) for value in kwargs.values()])
+        store.put(key, result, frozenset(versions))
+        return _copy_result(result)
+
+    wrapper.memo = memo if memo is not None else ANALYSIS_MEMO
+    return wrapper
@@ -0,0 +1,134 @@
+"""Figures of the analysis, matplotlib, seaborn and wordcloud are only imported when a figure is drawn"""
+
+import hashlib
+import io
+import logging
+
+from analyse.memo import AnalysisMemo
+from analyse.utils import count_recipes_season_by_ranking
+
+logger = logging.getLogger(__name__)
+
+# PNG images of the word clouds, shared by the sessions
+WORDCLOUD_CACHE = AnalysisMemo(max_entries=64, max_bytes=32_000_000)
+
+
+def visualise_recipe_season(df):
+    """
+    Visualise count per season with low and high rankings.
+
+    The counts are memoized (count_recipes_season_by_ranking), the figure is drawn on each
+    call: a matplotlib figure is mutable and can not be shared by the sessions.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    count_data_low, count_data_high = count_recipes_season_by_ranking(df)
+
+    # Create the plot
+    fig, ax = plt.subplots()
+    sns.barplot(x='season', y='count', data=count_data_low, color='blue', label='Low ranking', ax=ax)
+    sns.barplot(x='season', y='count', data=count_data_high, alpha=0.7, color='orange', label='High ranking', ax=ax)
+    ax.set_xlabel('Season')
+    ax.set_ylabel('Count')
+    ax.set_title('Recipes count per season', weight='bold')
+    ax.legend()
+
+    logger.debug("Plot created successfully.")
+    return fig
+
+
+def visualise_low_rank_insight(df_low_count, df_high_count):
+    """ Visualise low vs high rank recipes over time of preparation"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig, ax = plt.subplots()
+    sns.barplot(df_low_count, x='minutes_tr', y='count',
+                label='low rating distribution', alpha=0.9, dodge=True)
+    sns.barplot(df_high_count, x='minutes_tr',  y='count',
+                label='all rating distribution', alpha=0.7, dodge=True)
+    ax.set_xlabel('time of preparation')
+    ax.set_ylabel('% of recipies')
+    ax.set_title('Sum of recipies (in %) per time of  preparation ', weight='bold')
+    ax.legend()
+    return fig
+
+
+def frequency_fingerprint(frequencies):
+    """
+    Fingerprint of the words and frequencies of a word cloud, whatever their order.
+
+    Args:
+        frequencies (dict or pd.Series): weight of each word.
+
+    Returns:
+        str: hexadecimal digest.
+    """
+    items = sorted((str(word), float(count)) for word, count in dict(frequencies).items())
+    return hashlib.sha1(repr(items).encode()).hexdigest()
+
+
+def wordcloud_png(frequencies, scope, top_n, colormap=None, width=800, height=400, cache=None):
+    """
+    Word cloud of words weighted by their frequencies, as PNG bytes.
+
+    The layout of the words is seeded, so the same frequencies always give the same image,
+    and the images are kept in a least recently used cache (WORDCLOUD_CACHE) keyed by the
+    scope, the number of words asked and the fingerprint of the frequencies.
+
+    Args:
+        frequencies (dict or pd.Series): weight of each word, at least one.
+        scope (str): what the cloud shows (a season, a filter of the recipes...).
+        top_n (int): number of words asked for.
+        colormap (str, optional): matplotlib colormap of the words. Defaults to None (wordcloud's default).
+        width (int, optional): width of the image in pixels. Defaults to 800.
+        height (int, optional): height of the image in pixels. Defaults to 400.
+        cache (AnalysisMemo, optional): cache of the images. Defaults to WORDCLOUD_CACHE.
+
+    Returns:
+        bytes: the PNG image.
+    """
+    cache = WORDCLOUD_CACHE if cache is None else cache
+    key = ('wordcloud', scope, top_n, frequency_fingerprint(frequencies), colormap, width, height)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry[0]
+
+    from wordcloud import WordCloud
+
+    wordcloud = WordCloud(width=width, height=height, background_color='white', colormap=colormap,
+                          random_state=0).generate_from_frequencies(dict(frequencies))
+    buffer = io.BytesIO()
+    wordcloud.to_image().save(buffer, format='PNG')
+    png = buffer.getvalue()
+    cache.put(key, png, set())
+    logger.debug("Word cloud of %s rendered: %s bytes", scope, len(png))
+    return png
+
+
+def nutrient_histogram(values, bins, color):
+    """
+    Histogram of a nutrient with its KDE curve, on a dark background.
+
+    Args:
+        values (pd.Series): values of the nutrient.
+        bins (int): number of bins.
+        color (str): color of the bars.
+
+    Returns:
+        matplotlib.figure.Figure: the histogram.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig = plt.figure(figsize=(10, 5), facecolor='#0F1116')
+    # Without grids
+    sns.set_theme(style='white')
+    # Historgam with KDE courb
+    sns.histplot(values, bins=bins, kde=True, color=color)
+    plt.xlabel(values.name, fontsize=14, color='white')
+    plt.ylabel('Frequency', fontsize=14, color='white')
+    plt.gca().set_facecolor('#0F1116')
+    sns.despine()
+    return fig
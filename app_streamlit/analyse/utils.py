@@ -3,79 +3,83 @@
 import ast
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import logging
-import os
+from load_data.list_columns import flatten_list_column
+from load_data.query import DatasetQuery
+from analyse.memo import memoize
+from analyse.derived import derived_column, register_derived
+from analyse.ingredients import DEFAULT_EXCLUDED_INGREDIENTS, IngredientLookup, SeasonalIngredientCounts
 
-# Remonter au dossier racine du projet (web_data_)
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+logger = logging.getLogger(__name__)
 
-# Construire le chemin vers le dossier logging
-log_dir = os.path.join(BASE_DIR, 'logging')
-os.makedirs(log_dir, exist_ok=True)  # Crée le dossier s'il n'existe pas
-
-# Chemin complet vers le fichier debug.log
-log_file = os.path.join(log_dir, 'debug.log')
-
-logging.basicConfig(
-    filename=log_file,
-    level=logging.DEBUG,
-    filemode='w',
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-
-def metrics_main_contributor(df):
+def metrics_main_contributor(df, summary=None):
     """
     Calculate the total number of unique contributors and recipes in the dataset.
 
     Args:
         df (pd.DataFrame): DataFrame containing recipe data.
+        summary (pd.DataFrame, optional): contributor summary of df (see load_data.contributor_summary),
+            read instead of scanning df.
 
     Returns:
         tuple: Number of unique contributors and recipes.
     """
-    logging.debug("Calculating number of unique contributors and recipes.")
-    num_contributors = df['contributor_id'].nunique()
-    num_recipes = df['recipe_id'].nunique()
-    logging.info(f"Number of contributors: {num_contributors}, Number of recipes: {num_recipes}")
+    logger.debug("Calculating number of unique contributors and recipes.")
+    if summary is not None:
+        num_contributors = len(summary)
+        # each recipe counted once, even when several contributors list it
+        num_recipes = int(summary['first_recipe_count'].sum())
+    else:
+        num_contributors = df['contributor_id'].nunique()
+        num_recipes = df['recipe_id'].nunique()
+    logger.info("Number of contributors: %s, Number of recipes: %s", num_contributors, num_recipes)
     return num_contributors, num_recipes
 
 
-def average_and_total_comments_per_contributor(df):
+@memoize
+def average_and_total_comments_per_contributor(df, summary=None):
     """
     Calculates the average number of comments per recipe and the total number of comments for each contributor.
 
     Arg:
         df (pd.DataFrame): A DataFrame containing recipe data, including 'contributor_id' and 'num_comments'.
+        summary (pd.DataFrame, optional): contributor summary of df (see load_data.contributor_summary),
+            read instead of grouping df.
 
     Returns:
-        df (pd.DataFrame): A DataFrame with 'contributor_id', 'avg_comments_per_recipe', and 'total_comments', where contributor_id is treated as a category.
-    """
-
-    # Vérifier que les colonnes nécessaires existent
-    logging.debug("Starting calculation of average and total comments per contributor.")
-    if 'contributor_id' not in df.columns or 'num_comments' not in df.columns:
-        logging.error("Required columns 'contributor_id' and 'num_comments' are missing.")
+        df (pd.DataFrame): A DataFrame with 'contributor_id' (as strings), 'avg_comments_per_recipe', and 'total_comments',
+            sorted by decreasing average then contributor_id, the same with or without summary.
+    """
+    if summary is not None:
+        stats = pd.DataFrame({
+            'contributor_id': summary['contributor_id'].astype(str),
+            'avg_comments_per_recipe': summary['mean_comments'],
+            'total_comments': summary['total_comments'],
+        })
+    else:
+        # Vérifier que les colonnes nécessaires existent
+        logger.debug("Starting calculation of average and total comments per contributor.")
+        if 'contributor_id' not in df.columns or 'num_comments' not in df.columns:
+            logger.error("Required columns 'contributor_id' and 'num_comments' are missing.")
 
-    # Convertir contributor_id en chaîne
-    logging.debug("Converting 'contributor_id' to string type.")
-    df['contributor_id'] = df['contributor_id'].astype(str)
+        # contributor_id en chaîne, calculé une fois pour le dataset (df n'est pas modifié)
+        contributor_key = derived_column(df, 'contributor_key').rename('contributor_id')
 
-    # Calculer la moyenne des commentaires et le total des commentaires par contributeur
-    logging.debug("Grouping data by 'contributor_id' and calculating statistics.")
-    stats = df.groupby('contributor_id')['num_comments'].agg(
-        avg_comments_per_recipe='mean',  # Moyenne des commentaires
-        total_comments='sum'            # Total des commentaires
-    ).reset_index()
+        # Calculer la moyenne des commentaires et le total des commentaires par contributeur
+        logger.debug("Grouping data by 'contributor_id' and calculating statistics.")
+        stats = df['num_comments'].groupby(contributor_key, observed=True).agg(
+            avg_comments_per_recipe='mean',  # Moyenne des commentaires
+            total_comments='sum'            # Total des commentaires
+        ).reset_index()
 
-    # Renommer les colonnes pour plus de clarté
-    stats.columns = ['contributor_id', 'avg_comments_per_recipe', 'total_comments']
+        # Renommer les colonnes pour plus de clarté, contributor_id en chaîne comme avec le résumé
+        stats.columns = ['contributor_id', 'avg_comments_per_recipe', 'total_comments']
+        stats['contributor_id'] = stats['contributor_id'].astype(str)
+        logger.info("Successfully calculated average and total comments per contributor.")
 
-    # Trier par moyenne décroissante
-    stats = stats.sort_values(by='avg_comments_per_recipe', ascending=False)
-    logging.info("Successfully calculated average and total comments per contributor.")
-    return stats
+    # Trier par moyenne décroissante, les égalités par contributor_id
+    return stats.sort_values(by=['avg_comments_per_recipe', 'contributor_id'], ascending=[False, True],
+                             ignore_index=True)
 
 
 def top_commented_recipes_by_contributors(df, top_contributors, max_recipes_per_contributor=5):
@@ -91,79 +95,59 @@ def top_commented_recipes_by_contributors(df, top_contributors, max_recipes_per_
     - pd.DataFrame: A DataFrame containing contributor IDs, recipe IDs, names, and number of comments.
     """
     # Vérifier les colonnes nécessaires
-    logging.debug("Extracting top commented recipes by contributors.")
+    logger.debug("Extracting top commented recipes by contributors.")
     if not {'contributor_id', 'recipe_id', 'name', 'num_comments'}.issubset(df.columns):
-        logging.error("The DataFrame must contain 'contributor_id', 'recipe_id', 'name', and 'num_comments'.")
+        logger.error("The DataFrame must contain 'contributor_id', 'recipe_id', 'name', and 'num_comments'.")
 
-    # Convertir contributor_id en chaîne dans les deux DataFrames
-    logging.debug("Filtering DataFrame to include only the top contributors.")
-    df['contributor_id'] = df['contributor_id'].astype(str)
-    top_contributors['contributor_id'] = top_contributors['contributor_id'].astype(str)
+    # Comparer contributor_id en chaîne, sans modifier les deux DataFrames
+    logger.debug("Filtering DataFrame to include only the top contributors.")
+    contributor_key = derived_column(df, 'contributor_key')
+    in_top = contributor_key.isin(top_contributors['contributor_id'].astype(str))
 
     # Filtrer les recettes appartenant aux top contributeurs
-    filtered_df = df[df['contributor_id'].isin(top_contributors['contributor_id'])]
+    filtered_df = df.loc[in_top, ['recipe_id', 'name', 'num_comments']]
+    filtered_df.insert(0, 'contributor_id', contributor_key[in_top])
     
     # Trier les recettes par nombre de commentaires
-    logging.debug("Sorting recipes by number of comments.")
+    logger.debug("Sorting recipes by number of comments.")
     filtered_df = filtered_df.sort_values(by='num_comments', ascending=False)
     
     # Limiter le nombre de recettes par contributeur
-    logging.debug("Limiting the number of recipes per contributor.")
+    logger.debug("Limiting the number of recipes per contributor.")
     top_recipes = (
-        filtered_df.groupby('contributor_id')
+        filtered_df.groupby('contributor_id', observed=True)
         .head(max_recipes_per_contributor)
         .reset_index(drop=True)
     )
     
     # Sélectionner les colonnes pertinentes
-    logging.info(f"Extracted top commented recipes for {len(top_recipes)} records.")
+    logger.info("Extracted top commented recipes for %s records.", len(top_recipes))
     return top_recipes[['contributor_id', 'recipe_id', 'name', 'num_comments']]
 
 
-def count_contributors_by_recipe_range_with_bins(df):
-    """
-    Calculate the average and total number of comments per contributor.
-
-    Args:
-        df (pd.DataFrame): DataFrame containing 'contributor_id' and 'num_comments'.
-
-    Returns:
-        pd.DataFrame: DataFrame with 'contributor_id', 'avg_comments_per_recipe', and 'total_comments'.
-    """
-    if 'contributor_id' not in df.columns or 'num_comments' not in df.columns:
-        logging.error("The DataFrame must contain 'contributor_id' and 'num_comments'.")
-
-    df['contributor_id'] = df['contributor_id'].astype(str)
-
-    logging.debug("Calculating average and total comments per contributor.")
-    stats = df.groupby('contributor_id')['num_comments'].agg(
-        avg_comments_per_recipe='mean',
-        total_comments='sum'
-    ).reset_index()
-
-    logging.info(f"Calculated stats for {len(stats)} contributors.")
-    stats = stats.sort_values(by='avg_comments_per_recipe', ascending=False)
-    logging.debug(f"Top contributors by average comments: {stats.head()}")
-    return stats
-
-def count_contributors_by_recipe_range_with_bins(df):
+@memoize
+def count_contributors_by_recipe_range_with_bins(df, summary=None):
     """
     Categorize contributors based on the number of unique recipes they contributed.
 
     Args:
         df (pd.DataFrame): DataFrame containing 'recipe_id' and 'contributor_id'.
+        summary (pd.DataFrame, optional): contributor summary of df (see load_data.contributor_summary),
+            read instead of grouping df.
 
     Returns:
         pd.Series: Series with recipe range categories as index and contributor counts as values.
     """
-    if 'recipe_id' not in df.columns or 'contributor_id' not in df.columns:
-        logging.error("The required columns 'recipe_id' and 'contributor_id' are missing.")
-
-    recipe_counts = df.groupby('contributor_id')['recipe_id'].nunique()
-    logging.info(f"Calculated unique recipe counts for {len(recipe_counts)} contributors.")
+    if summary is not None:
+        recipe_counts = summary['recipe_count']
+    else:
+        if 'recipe_id' not in df.columns or 'contributor_id' not in df.columns:
+            logger.error("The required columns 'recipe_id' and 'contributor_id' are missing.")
+        recipe_counts = df.groupby('contributor_id')['recipe_id'].nunique()
+    logger.info("Calculated unique recipe counts for %s contributors.", len(recipe_counts))
     bins = [0, 1, 5, 8, float('inf')]
     labels = ['1 recipe', '2-5 recipes', '6-8 recipes', '> 8 recipes']
-    logging.debug(f"Defining bins: {bins} and labels: {labels}.")
+    logger.debug("Defining bins: %s and labels: %s.", bins, labels)
 
     binned_counts = pd.cut(recipe_counts, bins=bins, labels=labels, right=True)
     return binned_counts.value_counts().sort_index()
@@ -180,18 +164,18 @@ def top_commented_recipes(df, top_n=10):
     Returns:
         pd.DataFrame: DataFrame containing top N recipes.
     """
-    logging.debug("Starting the function to extract top commented recipes.")
+    logger.debug("Starting the function to extract top commented recipes.")
     
     if 'num_comments' not in df.columns :
-        logging.error("The DataFrame is missing required columns: 'num_comments'.")
+        logger.error("The DataFrame is missing required columns: 'num_comments'.")
     
-    logging.debug(f"Sorting the DataFrame by 'num_comments' to find top {top_n} recipes.")
+    logger.debug("Sorting the DataFrame by 'num_comments' to find top %s recipes.", top_n)
     top_recipes = df.sort_values(by='num_comments', ascending=False).head(top_n)[
         ['contributor_id', 'recipe_id', 'num_comments', 'name']
     ]
     
-    logging.info(f"Top {top_n} recipes extracted successfully.")
-    logging.debug(f"Top recipes:\n{top_recipes}")
+    logger.info("Top %s recipes extracted successfully.", top_n)
+    logger.debug("Top recipes:\n%s", top_recipes)
 
     return top_recipes
 
@@ -214,124 +198,120 @@ def get_top_tags(df, most_commented=False, top_recipes=20, top_n=10):
     else:
         filtered_df = df
 
-    # Parse 'tags' strings into lists
-    def parse_tags(value):
-        if isinstance(value, str):
-            # Remove brackets and split by commas
-            return [tag.strip(" '\"") for tag in value.strip('[]').split(',')]
-        return []
-
-    # Apply parsing, then explode and count occurrences
-    tags_series = filtered_df['tags'].apply(parse_tags).explode()
-    return tags_series.value_counts().head(top_n)
+    # Count the dictionary codes of the tags, the strings are only read for the top N
+    tags, _ = flatten_list_column(filtered_df['tags'], 'dictionary')
+    counts = np.bincount(tags.codes[tags.codes >= 0], minlength=len(tags.categories))
+    tags_count = pd.Series(counts, index=pd.Index(tags.categories, name='tags'), name='count')
+    return tags_count[tags_count > 0].sort_values(ascending=False, kind='stable').head(top_n)
 
 
 def get_top_ingredients2(df, df_ingr_map, excluded_ingredients=None, top_n=10):
-    ingr_map = df_ingr_map.set_index('id')['replaced'].to_dict()
-
-    def parse_ingredient_ids(ids, ingr_map):
-        if isinstance(ids, str):
-            ids = ids.strip('[]')
-            try:
-                logging.debug(f"Parsing ingredient IDs: {ids}")
-                return [ingr_map.get(int(ingr.strip()), 'Unknown') for ingr in ids.split(',') if ingr.strip()]
-            except ValueError:
-                logging.error(f"ValueError while parsing ingredient IDs: {ids}")
-                return []
-        return []
-    
-    df['mapped_ingredients'] = df['ingredient_ids'].apply(lambda ids: parse_ingredient_ids(ids, ingr_map))
+    """
+    Retrieve the most used ingredients, from the ingredient IDs of the recipes.
+
+    Args:
+        df (pd.DataFrame): DataFrame containing recipe data, with the 'ingredient_ids' column.
+        df_ingr_map (pd.DataFrame or IngredientLookup): DataFrame mapping ingredient IDs ('id') to their
+            names ('replaced'), or the lookup built from it once when the dataset is loaded.
+        excluded_ingredients (set, optional): ingredients not counted. Defaults to common ones (salt, water...).
+        top_n (int): Number of ingredients to return.
+
+    Returns:
+        pd.Series: Top N ingredients with their number of occurrences.
+    """
+    if isinstance(df_ingr_map, IngredientLookup):
+        lookup = df_ingr_map
+    else:
+        lookup = IngredientLookup(df_ingr_map)
+
     if excluded_ingredients is None:
-        excluded_ingredients = {
-            'black pepper', 'vegetable oil', 'salt', 'pepper', 'olive oil',
-            'butter', 'water', 'sugar', 'flour', 'brown sugar',
-        }
-        logging.debug(f"Using default excluded ingredients: {excluded_ingredients}")
-
-    filtered_ingredients = (df['mapped_ingredients']
-        .explode()
-        .loc[lambda x: ~x.isin(excluded_ingredients)]
-        .value_counts()
-        .head(top_n)
-    )
-    
-    logging.info(f"Top {top_n} ingredients extracted successfully.")
-    logging.debug(f"Top ingredients:\n{filtered_ingredients}")
+        logger.debug("Using default excluded ingredients: %s", DEFAULT_EXCLUDED_INGREDIENTS)
+    filtered_ingredients = lookup.top_ingredients(df, excluded_ingredients, top_n)
+
+    logger.info("Top %s ingredients extracted successfully.", top_n)
+    logger.debug("Top ingredients:\n%s", filtered_ingredients)
     return filtered_ingredients
 
 
-def trendy_ingredients_by_seasons(df,ingr_map,top_n):
+def trendy_ingredients_by_seasons(df,ingr_map,top_n,seasonal=None):
     """
-    This function create a dataframe for each seasons and returns the top 200 ingredients used
+    This function returns the top ingredients used during each season
 
     Args:
         df (dataframe): dataframe cleaned 
-        ingr_map (dataFrame): dataFrame mapping ingredient IDs ('id') to their names ('replaced')
+        ingr_map (dataFrame or IngredientLookup): dataFrame mapping ingredient IDs ('id') to their names ('replaced')
         top_n (int, optional): number of top ingredients to return. Defaults to 200.
+        seasonal (SeasonalIngredientCounts, optional): counts already computed on df, computed here if None.
     
     Returns:
-        winter_ingr,spring_ingr,summer_ingr,autumn_ingr (pd.series) : four pd.series with the top 200 ingredients used
-    """
-    logging.debug(f"Starting trendy_ingredients_by_seasons with top_n={top_n}")
-    # Create dataFrames for each season
-    winter= df[df['season']=='winter']
-    spring=df[df['season']=='spring']
-    summer=df[df['season']=='summer']
-    autumn=df[df['season']=='autumn']
-    logging.info("Dataframes for each season created successfully.")
-
-    # Get the top 200 ingredients for each season
-    winter_ingr=get_top_ingredients2(winter, ingr_map, excluded_ingredients=None, top_n=top_n)
-    spring_ingr=get_top_ingredients2(spring, ingr_map, excluded_ingredients=None, top_n=top_n)
-    summer_ingr=get_top_ingredients2(summer, ingr_map, excluded_ingredients=None, top_n=top_n)
-    autumn_ingr=get_top_ingredients2(autumn, ingr_map, excluded_ingredients=None, top_n=top_n)
-    logging.info(f"Top {top_n} ingredients extracted for each season.")
+        winter_ingr,spring_ingr,summer_ingr,autumn_ingr (pd.series) : four pd.series with the top ingredients used
+    """
+    logger.debug("Starting trendy_ingredients_by_seasons with top_n=%s", top_n)
+    if seasonal is None:
+        seasonal = seasonal_ingredient_counts(df, ingr_map)
+
+    # Get the top ingredients for each season from the season x ingredient counts
+    winter_ingr,spring_ingr,summer_ingr,autumn_ingr=seasonal.top(top_n)
+    logger.info("Top %s ingredients extracted for each season.", top_n)
     return winter_ingr,spring_ingr,summer_ingr,autumn_ingr
 
-def unique_ingr(df,ingr_map,top_n=200):
+def seasonal_ingredient_counts(df,ingr_map):
+    """
+    Count the ingredients of each season in one pass, see SeasonalIngredientCounts.
+
+    Args:
+        df (dataframe): dataframe cleaned 
+        ingr_map (dataFrame or IngredientLookup): dataFrame mapping ingredient IDs ('id') to their names ('replaced')
+
+    Returns:
+        SeasonalIngredientCounts: the season x ingredient counts, for any number of top ingredients
+    """
+    if not isinstance(ingr_map, IngredientLookup):
+        ingr_map = IngredientLookup(ingr_map)
+    return SeasonalIngredientCounts(df, ingr_map)
+
+def unique_ingr(df,ingr_map,top_n=200,seasonal=None):
     """
     This function return the unique ingredients used during each season by comparing all the ingredients used in
     one season to all the other seasons. 
 
     Args:
         df (dataframe): dataframe cleaned 
-        ingr_map (dataFrame): dataFrame mapping ingredient IDs ('id') to their names ('replaced')
+        ingr_map (dataFrame or IngredientLookup): dataFrame mapping ingredient IDs ('id') to their names ('replaced')
         top_n (int, optional): number of top ingredients to return. Defaults to 200.
+        seasonal (SeasonalIngredientCounts, optional): counts already computed on df, computed here if None.
 
     Returns:
         winter_unique,spring_unique,summer_unique,autumn_unique (list): return a list for each season of unique ingredients 
     """
+    if seasonal is None:
+        seasonal = seasonal_ingredient_counts(df, ingr_map)
 
-    winter_ingr,spring_ingr,summer_ingr,autumn_ingr=trendy_ingredients_by_seasons(df,ingr_map,top_n)
-    # Initialize empty lists to store unique ingredient for each season
-    winter_unique=[]
-    spring_unique=[]
-    summer_unique=[]
-    autumn_unique=[]
+    # Ingredients in the top N of exactly one season
+    winter_unique,spring_unique,summer_unique,autumn_unique=seasonal.unique(top_n)
 
-    # For each season, identify unique index 
-    for i in winter_ingr.index:
-        if i not in spring_ingr.index and i not in summer_ingr.index and i not in autumn_ingr.index : 
-            winter_unique.append(i)
-    logging.debug(f"Winter unique ingredients: {len(winter_unique)}")
-
-    for i in spring_ingr.index:
-        if i not in winter_ingr.index and i not in summer_ingr.index and i not in autumn_ingr.index : 
-            spring_unique.append(i)
-    logging.debug(f"Spring unique ingredients: {len(spring_unique)}")
+    logger.info("Unique ingredients identified for each season: Winter=%s, Spring=%s, Summer=%s, Autumn=%s",
+                len(winter_unique), len(spring_unique), len(summer_unique), len(autumn_unique))
+    # Return unique indices for each season as a list
+    return winter_unique,spring_unique,summer_unique,autumn_unique
 
-    for i in summer_ingr.index:
-        if i not in winter_ingr.index and i not in spring_ingr.index and i not in autumn_ingr.index : 
-            summer_unique.append(i)
-    logging.debug(f"Summer unique ingredients: {len(summer_unique)}")
+def unique_ingr_counts(df,ingr_map,top_n=200,seasonal=None):
+    """
+    Same ingredients as `unique_ingr`, with their number of occurrences in their season
+    (the frequencies of the season word clouds).
 
-    for i in autumn_ingr.index:
-        if i not in winter_ingr.index and i not in summer_ingr.index and i not in spring_ingr.index : 
-            autumn_unique.append(i)
-    logging.debug(f"Autumn unique ingredients: {len(autumn_unique)}")
+    Args:
+        df (dataframe): dataframe cleaned 
+        ingr_map (dataFrame or IngredientLookup): dataFrame mapping ingredient IDs ('id') to their names ('replaced')
+        top_n (int, optional): number of top ingredients to compare. Defaults to 200.
+        seasonal (SeasonalIngredientCounts, optional): counts already computed on df, computed here if None.
 
-    logging.info(f"Unique ingredients identified for each season: Winter={len(winter_unique)}, Spring={len(spring_unique)}, Summer={len(summer_unique)}, Autumn={len(autumn_unique)}")
-    # Return unique indices for each season as a list
+    Returns:
+        winter_unique,spring_unique,summer_unique,autumn_unique (pd.series): names and counts, by decreasing count
+    """
+    if seasonal is None:
+        seasonal = seasonal_ingredient_counts(df, ingr_map)
+    winter_unique,spring_unique,summer_unique,autumn_unique=seasonal.unique_counts(top_n)
     return winter_unique,spring_unique,summer_unique,autumn_unique
   
 def count_recipes_season(df):
@@ -341,25 +321,44 @@ def count_recipes_season(df):
                          'spring': len(df[df['season'] == 'spring']),
                          'summer': len(df[df['season'] == 'summer']),
                          'autumn': len(df[df['season'] == 'autumn'])}
-    logging.debug(f"Recipe count per season: {recipe_per_season}")
+    logger.debug("Recipe count per season: %s", recipe_per_season)
     return recipe_per_season
 
-def user_recipes(merged_df, user_id):
+def user_recipes(merged_df, user_id, contributor_index=None):
     """Finds the recipes published by the user
 
 
     Args:
-        df (pd.DataFrame): DataFrame with recipe data and a 'season' column.
+        merged_df (pd.DataFrame or DatasetQuery): DataFrame with recipe data and a 'contributor_id' column,
+            or a query over it (the filter is pushed down into the read).
+        user_id (int): id of the contributor.
+        contributor_index (ContributorIndex, optional): index built on merged_df, used instead
+            of scanning the whole 'contributor_id' column.
 
     Returns:
-        dict: Recipe counts per season.
+        pd.DataFrame: recipes of the user.
     """
 
-    recipes_user_df = merged_df.loc[merged_df["contributor_id"] == user_id]
-    logging.debug(f"Number of recipes found for user_id {user_id}: {len(recipes_user_df)}")
+    if contributor_index is not None:
+        recipes_user_df = contributor_index.recipes(user_id)
+    else:
+        query = merged_df if isinstance(merged_df, DatasetQuery) else DatasetQuery(merged_df)
+        recipes_user_df = query.filter("contributor_id", "==", user_id).collect()
+    logger.debug("Number of recipes found for user_id %s: %s", user_id, len(recipes_user_df))
     return recipes_user_df 
 
 
+# Upper bounds (included) of each level of points of the Nutri-Score, a value above the
+# last bound gets the maximum number of points
+CALORIES_THRESHOLDS = np.array([335, 670, 1005, 1340, 1675, 2010, 2345, 2680, 3015, 3350])
+SUGAR_THRESHOLDS = np.array([4.5, 9, 13.5, 18, 22.5, 27, 31, 36, 40, 45])
+SATURATED_FAT_THRESHOLDS = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10])
+SODIUM_THRESHOLDS = np.array([90, 180, 270, 360, 450, 540, 630, 720, 810, 900])
+PROTEIN_THRESHOLDS = np.array([1.6, 3.2, 4.8, 6.4, 8])
+# Upper bounds (included) of the score of the grades A to D, above is E
+GRADE_THRESHOLDS = np.array([-1, 2, 10, 18])
+NUTRI_SCORE_GRADES = ['A', 'B', 'C', 'D', 'E']
+
 def calculate_negative_points_nutri_score(row):
     """
     Calculate the negative points that will lower the Nutri-Score based on 
@@ -442,7 +441,7 @@ def calculate_positive_points_nutri_score(row):
     elif row["Protein"] <= 6.4: protein_points = 3
     elif row["Protein"] <= 8: protein_points = 4
     else: protein_points = 5
-    logging.debug(f"Calculated positive points based on Protein value {row['Protein']}: {protein_points}")
+    logger.debug("Calculated positive points based on Protein value %s: %s", row['Protein'], protein_points)
     return protein_points
 
 def nutri_score(df):
@@ -460,9 +459,9 @@ def nutri_score(df):
     """
     negative_points = calculate_negative_points_nutri_score(df)
     positive_points = calculate_positive_points_nutri_score(df)
-    logging.debug(f"Negative points: {negative_points}, Positive points: {positive_points}")
+    logger.debug("Negative points: %s, Positive points: %s", negative_points, positive_points)
     score = negative_points - positive_points
-    logging.debug(f"Nutri-Score calculated score: {score}")
+    logger.debug("Nutri-Score calculated score: %s", score)
     # Conversion Nutri-Score
     if score <= -1:
         grade = "A"
@@ -476,10 +475,38 @@ def nutri_score(df):
         grade = "E"
 
     # Log the final grade
-    logging.debug(f"Nutri-Score grade: {grade}")
+    logger.debug("Nutri-Score grade: %s", grade)
 
     return grade
     
+def nutri_score_batch(df):
+    """
+    Vectorized `nutri_score`: calculate the Nutri-Score grade of every row at once.
+
+    The points of each nutrient are the position of the value in its table of thresholds,
+    so every value gets the same grade as with `nutri_score` (missing values included).
+
+    Args:
+        df (pd.DataFrame): DataFrame with the columns "Calories", "Sugar", "Saturated Fat",
+            "Sodium" and "Protein".
+
+    Returns:
+        pd.Series: categorical Nutri-Score grades (A to E, ordered), aligned on df.
+    """
+    negative_points = (
+        np.searchsorted(CALORIES_THRESHOLDS, df['Calories'].to_numpy(dtype=float))
+        + np.searchsorted(SUGAR_THRESHOLDS, df['Sugar'].to_numpy(dtype=float))
+        + np.searchsorted(SATURATED_FAT_THRESHOLDS, df['Saturated Fat'].to_numpy(dtype=float))
+        + np.searchsorted(SODIUM_THRESHOLDS, df['Sodium'].to_numpy(dtype=float))
+    )
+    positive_points = np.searchsorted(PROTEIN_THRESHOLDS, df['Protein'].to_numpy(dtype=float))
+    score = negative_points - positive_points
+
+    codes = np.searchsorted(GRADE_THRESHOLDS, score)
+    grades = pd.Categorical.from_codes(codes, categories=NUTRI_SCORE_GRADES, ordered=True)
+    logger.debug("Nutri-Score calculated for %s rows.", len(df))
+    return pd.Series(grades, index=df.index, name='nutri_score')
+
 def top_recipes_user(df):
     """
     Returns the top 5 recipes with the most comments from a specific user.
@@ -498,14 +525,10 @@ def top_recipes_user(df):
             - 'Number of comments': count of comments per recipe.
             - 'Average Rating': average rating for each recipe.
     """
-    # Filtrer les recettes valides
-    filtered_df = df[df['name'].notna()]
-    logging.debug(f"Filtered data (recipes with valid names):\n{filtered_df.head()}")
-    # Sélectionner les colonnes nécessaires et trier
-    top_user_recipe = filtered_df[['name', 'num_comments', 'avg_reviews']].sort_values(
-        by=['num_comments', 'avg_reviews'], ascending=[False, False]
-    ).head(5)
-    logging.debug(f"Top 5 recipes based on comments and ratings:\n{top_user_recipe}")
+    # Recettes valides, seules les colonnes affichées sont copiées
+    query = DatasetQuery(df).filter('name', 'notna').select(['name', 'num_comments', 'avg_reviews'])
+    top_user_recipe = query.top(5, by=['num_comments', 'avg_reviews'], ascending=[False, False])
+    logger.debug("Top 5 recipes based on comments and ratings:\n%s", top_user_recipe)
     # Renommer les colonnes pour une meilleure lisibilité
     top_user_recipe = top_user_recipe.rename(
         columns={'name': 'Recipe', 'num_comments': 'Number of comments', 'avg_reviews': 'Average Rating'}
@@ -515,6 +538,7 @@ def top_recipes_user(df):
 
 
 
+@memoize
 def top_recipes(df):
     """
     Returns the top 5 recipes with the most comments.
@@ -526,45 +550,105 @@ def top_recipes(df):
         pd.DataFrame
     """
 
-    logging.debug("Starting to find the top 5 recipes with the most comments.")
-    logging.debug(f"Initial DataFrame:\n{df.head()}")
+    logger.debug("Starting to find the top 5 recipes with the most comments.")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Initial DataFrame:\n%s", df.head())
 
-    filtered_df = df[df['name'].notna()]
-    assert filtered_df['name'].isna().sum() == 0, "Filtered DataFrame still contains NaN in 'name'"
-    logging.debug(f"Filtered DataFrame (no NaN in 'name'):\n{filtered_df.head()}")
-    # Top 5 commented recipes
-    top_recipe_df = filtered_df[['name', 'num_comments', 'avg_reviews']].sort_values(
-        by='num_comments', ascending=False
-    ).head(5)
-    logging.debug(f"Top 5 recipes based on number of comments:\n{top_recipe_df}")
+    # Top 5 commented recipes, only the displayed columns of the named recipes are copied
+    query = DatasetQuery(df).filter('name', 'notna').select(['name', 'num_comments', 'avg_reviews'])
+    top_recipe_df = query.top(5, by='num_comments', ascending=False)
+    assert top_recipe_df['name'].isna().sum() == 0, "Filtered DataFrame still contains NaN in 'name'"
+    logger.debug("Top 5 recipes based on number of comments:\n%s", top_recipe_df)
     top_recipe_df = top_recipe_df.rename(
         columns={'name': 'Recipe', 'num_comments': 'Number of comments', 'avg_reviews': 'Avg reviews'}
     )
-    logging.debug(f"Top 5 recipes with renamed columns:\n{top_recipe_df}")
+    logger.debug("Top 5 recipes with renamed columns:\n%s", top_recipe_df)
     return top_recipe_df
 
 
+# Categories of time of preparation, in order: (category, label on the pages, upper edge in minutes).
+# Every upper edge is included, except 240 minutes which belongs to '4h_more'.
+MINUTES_TABLE = [
+    ('less_15min', "15 minutes or less", 15),
+    ('15_30min', "Between 15 to 30 minutes", 30),
+    ('30min_1h', "Between 30 minutes to 1 hour", 60),
+    ('1h_2h', "Between 1 hour to 2 hours", 120),
+    ('2h_3h', "Between 2 hours to 3 hours", 180),
+    ('3h_4h', "Between 3 hours to 4 hours", np.nextafter(240, -np.inf)),
+    ('4h_more', "More than 4 hours", np.inf),
+]
+MINUTES_CATEGORIES = [category for category, _, _ in MINUTES_TABLE]
+MINUTES_LABELS = {label: category for category, label, _ in MINUTES_TABLE}
+
+
 def cat_minutes(df):
     """
     Transform columns minutes in categorical values
 
+    Negative and missing values are in '4h_more', like the values of 240 minutes and above.
+
     Args:
         df : (pd.DataFrame) : DataFrame containnning 'minutes' column
 
     Returns:
-        cat_minutes : pd.Series : 'minutes' column transformed in categorical values
+        cat_minutes : pd.Series : 'minutes' column transformed in ordered categorical values (MINUTES_CATEGORIES)
 
     """
-    cat_minutes = ['less_15min' if 0 <= x <= 15 else
-                   '15_30min' if 15 < x <= 30 else
-                   '30min_1h' if 30 < x <= 60 else
-                   '1h_2h' if 60 < x <= 120 else
-                   '2h_3h' if 120 < x <= 180 else
-                   '3h_4h' if 180 < x < 240 else
-                   '4h_more'
-                   for x in df['minutes']]
+    edges = [0] + [upper for _, _, upper in MINUTES_TABLE]
+    cat_minutes = pd.cut(df['minutes'], bins=edges, labels=MINUTES_CATEGORIES, right=True,
+                         include_lowest=True, ordered=True)
+    return cat_minutes.fillna('4h_more').rename('minutes_tr')
+
 
-    return cat_minutes
+@register_derived('minutes_tr', sources=['minutes'])
+def minutes_category(df):
+    """
+    Derived column 'minutes_tr': categories of time of preparation (see cat_minutes).
+    """
+    return cat_minutes(df)
+
+
+@register_derived('contributor_key', sources=['contributor_id'])
+def contributor_category(df):
+    """
+    Derived column 'contributor_key': contributor_id as strings, stored as a categorical.
+    """
+    codes, contributors = pd.factorize(df['contributor_id'])
+    return pd.Series(pd.Categorical.from_codes(codes, categories=contributors.astype(str)), index=df.index)
+
+
+@register_derived('nutri_score_numeric', sources=['nutri_score'])
+def nutri_score_numeric(df):
+    """
+    Derived column 'nutri_score_numeric': nutri-score from 1 (A) to 5 (E), missing if unknown.
+    """
+    codes = pd.Categorical(df['nutri_score'].astype(object), categories=NUTRI_SCORE_GRADES).codes
+    numeric = pd.array(codes + 1, dtype='Int8')
+    numeric[codes < 0] = pd.NA
+    return pd.Series(numeric, index=df.index)
+
+
+def minutes_filters(time_r):
+    """
+    Conditions on 'minutes' of a category of time of preparation, for a DatasetQuery.
+
+    Args:
+        time_r (str): category of MINUTES_CATEGORIES.
+
+    Returns:
+        list: alternatives, each a list of (column, operator, value) conditions that must all
+            hold ('4h_more' also holds the negative and missing values, see cat_minutes).
+            Empty for an unknown category.
+    """
+    lower = 0
+    for category, _, upper in MINUTES_TABLE:
+        if category == time_r:
+            if np.isinf(upper):
+                return [[('minutes', '>', lower)], [('minutes', '<', 0)], [('minutes', 'isna', None)]]
+            first = ('minutes', '>=', lower) if lower == 0 else ('minutes', '>', lower)
+            return [[first, ('minutes', '<=', upper)]]
+        lower = upper
+    return []
 
 
 def best_recipe_filter_time(df, time_r, nb_show):
@@ -572,7 +656,8 @@ def best_recipe_filter_time(df, time_r, nb_show):
     Get information about the best recipes (ranking-higher comments) filtered on time of preparation
 
     args:
-        df : pd.DataFrame : dataframe containing columns 'minutes','name', 'n_steps', 'num_comments', 'ingredients','avg_reviews'
+        df : pd.DataFrame or DatasetQuery : dataframe containing columns 'minutes','name', 'n_steps', 'num_comments', 'ingredients','avg_reviews',
+            or a query over it (the filters and columns are pushed down into the read)
         time_r : str : time of preparation (categorie) we want to filter results on 
         nb_show : int : number of recipes to show
 
@@ -580,29 +665,34 @@ def best_recipe_filter_time(df, time_r, nb_show):
         result : pd.DataFrame : recipes info that have the best ranking + higher comment filtered on time_r
 
     """
-    logging.debug("Starting best_recipe_filter_time function.")
-    logging.debug(f"Received time_r: {time_r}, nb_show: {nb_show}")
+    logger.debug("Starting best_recipe_filter_time function.")
+    logger.debug("Received time_r: %s, nb_show: %s", time_r, nb_show)
 
-    list_cat_time = ['less_15min', '15_30min',
-                     '30min_1h', '1h_2h', '2h_3h', '3h_4h', '4h_more']
+    list_cat_time = MINUTES_CATEGORIES
     
     if time_r not in list_cat_time or not nb_show in [1, 2, 3, 4, 5, 10]:
         error_msg = f"** ERROR ** time_r should be in {list_cat_time} - got: {time_r}, and nb_show in [1, 2, 3, 4, 5, 10] - got: {nb_show}"
-        logging.error(error_msg)
-    
-    if 'minutes_tr' not in df.columns : 
-        logging.debug("Creating 'minutes_tr' column using 'cat_minutes'.")
-        df['minutes_tr'] = cat_minutes(df)
-
-    df = df[df['minutes_tr'] == time_r]
-
-    result = df[df['avg_reviews'] == 5][['name', 'n_steps', 'num_comments', 'ingredients','avg_reviews']]
-    logging.debug(f"Filtered recipes with perfect ratings (5): {len(result)} records.")
+        logger.error(error_msg)
+
+    # Recettes notées 5 du temps de préparation, seules les colonnes affichées sont lues
+    columns = ['name', 'n_steps', 'num_comments', 'ingredients', 'avg_reviews']
+    query = df if isinstance(df, DatasetQuery) else DatasetQuery(df)
+    query = query.filter('avg_reviews', '==', 5).select(columns)
+    parts = []
+    for conditions in minutes_filters(time_r):
+        part = query
+        for condition in conditions:
+            part = part.filter(*condition)
+        parts.append(part.top(nb_show, by='num_comments'))
+    if not parts:
+        return pd.DataFrame(columns=columns)
+
+    result = pd.concat(parts) if len(parts) > 1 else parts[0]
     result = result.sort_values(by='num_comments', ascending=False).head(nb_show)
-    logging.debug(f"Sorted and selected top {nb_show} recipes with highest comments.")
-    logging.debug(f"Returning result with {len(result)} records.")
+    logger.debug("Returning result with %s records.", len(result))
     return result
 
+@memoize
 def get_insight_low_ranking(df):
     """
     get insight of number of recipes per time of preparation for all the recipes and for low ranking recpies
@@ -615,63 +705,47 @@ def get_insight_low_ranking(df):
         df_high_count : (pd.DataFrame) filter on high ranking
 
     """
-    logging.debug(f"Initial DataFrame shape: {df.shape}")
+    logger.debug("Initial DataFrame shape: %s", df.shape)
 
-    if 'minutes_tr' not in df.columns : 
-        logging.debug("Creating 'minutes_tr' column using 'cat_minutes'.")
-        df['minutes_tr'] = cat_minutes(df)
+    minutes_tr = derived_column(df, 'minutes_tr')
 
     # filter low ranking - insight on time preparation
-    df_low_rating = df[df['avg_reviews'].isin([1, 2])]
-    logging.debug(f"Filtered low-ranking recipes: {len(df_low_rating)} records.")
+    low_rating = df['avg_reviews'].isin([1, 2])
+    logger.debug("Filtered low-ranking recipes: %s records.", low_rating.sum())
 
-    df_low_count = df_low_rating.groupby(
-        ['minutes_tr']).size().reset_index(name='count')
+    df_low_count = minutes_tr[low_rating].groupby(
+        minutes_tr[low_rating], observed=True).size().reset_index(name='count')
     l_low = np.sum(df_low_count['count'])
     df_low_count['count'] = np.round(df_low_count['count']*100/l_low, 2)
     
     # filter high ranking - insight on time preparation
-    df_high_count = df.groupby(['minutes_tr']).size().reset_index(name='count')    
+    df_high_count = minutes_tr.groupby(minutes_tr, observed=True).size().reset_index(name='count')    
     l_all = np.sum(df_high_count['count'])
     df_high_count['count'] = np.round(df_high_count['count']*100/l_all, 2)
-    logging.debug("Returning df_low_count and df_high_count.")
+    logger.debug("Returning df_low_count and df_high_count.")
     return df_low_count, df_high_count
 
 
-def visualise_recipe_season(df):
-    """Visualise count per season with low and high rankings."""
-    
-    # Filter for high and low rankings
-    df_high = df[df['avg_reviews'].isin([4, 5])]
-    df_low = df[df['avg_reviews'].isin([1, 2, 3])]
-    logging.debug(f"Number of high-ranking recipes: {len(df_high)}")
-    logging.debug(f"Number of low-ranking recipes: {len(df_low)}")
-
-    # Count recipes per season
-    count_data_high = df_high.groupby(['season']).size().reset_index(name='count')
-    count_data_low = df_low.groupby(['season']).size().reset_index(name='count')
-    
-    # Create the plot
-    fig, ax = plt.subplots()
-    sns.barplot(x='season', y='count', data=count_data_low, color='blue', label='Low ranking', ax=ax)
-    sns.barplot(x='season', y='count', data=count_data_high, alpha=0.7, color='orange', label='High ranking', ax=ax)
-    ax.set_xlabel('Season')
-    ax.set_ylabel('Count')
-    ax.set_title('Recipes count per season', weight='bold')
-    ax.legend()
-    
-    logging.debug("Plot created successfully.")
-    return fig
-
-def visualise_low_rank_insight(df_low_count, df_high_count):
-    """ Visualise low vs high rank recipes over time of preparation"""
-    fig, ax = plt.subplots()
-    sns.barplot(df_low_count, x='minutes_tr', y='count',
-                label='low rating distribution', alpha=0.9, dodge=True)
-    sns.barplot(df_high_count, x='minutes_tr',  y='count',
-                label='all rating distribution', alpha=0.7, dodge=True)
-    ax.set_xlabel('time of preparation')
-    ax.set_ylabel('% of recipies')
-    ax.set_title('Sum of recipies (in %) per time of  preparation ', weight='bold')
-    ax.legend()
-    return fig 
+@memoize
+def count_recipes_season_by_ranking(df):
+    """
+    Count the recipes of each season, for the low (1 to 3) and high (4 and 5) rankings.
+
+    Returns:
+        count_data_low, count_data_high (pd.DataFrame): 'season' and 'count' columns
+    """
+    # Count recipes per season for high and low rankings, only the 'season' column is read
+    count_data_high = DatasetQuery(df).filter('avg_reviews', 'in', [4, 5]).group_count('season')
+    count_data_low = DatasetQuery(df).filter('avg_reviews', 'in', [1, 2, 3]).group_count('season')
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Number of high-ranking recipes: %s", count_data_high['count'].sum())
+        logger.debug("Number of low-ranking recipes: %s", count_data_low['count'].sum())
+    return count_data_low, count_data_high
+
+
+def __getattr__(name):
+    # The figures moved to analyse.plots, which imports the plotting libraries
+    if name in ('visualise_recipe_season', 'visualise_low_rank_insight'):
+        from analyse import plots
+        return getattr(plots, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,13 +2,8 @@
 """
 
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.express as px
 import os
 
-from wordcloud import WordCloud
-
 from analyse.utils import (
     count_contributors_by_recipe_range_with_bins,
     get_top_tags,
@@ -16,9 +11,8 @@ from analyse.utils import (
     metrics_main_contributor,
     average_and_total_comments_per_contributor,
 )
-
-df_ingr_map = pd.read_pickle("data_files/ingr_map.pkl")
-
+from analyse.derived import derived_column
+from analyse.plots import wordcloud_png
 
 
 # Source fonction my_metric : https://py.cafe/maartenbreddels/streamlit-custom-metrics
@@ -46,7 +40,10 @@ def my_metric(label, value, bg_color, icon="fas fa-asterisk"):
     st.markdown(lnk + htmlstr, unsafe_allow_html=True)
 
 
-def display_contributors_page(df, df_ingr_map):
+def display_contributors_page(df, df_ingr_map, contributor_summary=None):
+    # plotly is only imported once the page is displayed
+    import plotly.express as px
+
     st.sidebar.markdown(
         '<h1 style="color:orange;" font-size:24px;">Analysis Menu</h1>',
         unsafe_allow_html=True,
@@ -77,7 +74,7 @@ def display_contributors_page(df, df_ingr_map):
         )
 
         #section 1.1 : main metrics
-        num_contributors, num_recipes = metrics_main_contributor(df)
+        num_contributors, num_recipes = metrics_main_contributor(df, contributor_summary)
         col1, col2 = st.columns(2)
         with col1:
             my_metric("Number of Contributors", num_contributors, (255, 240, 186), "fas fa-users")
@@ -91,7 +88,7 @@ def display_contributors_page(df, df_ingr_map):
         )
 
         #section 1.2: pie chart contributeurs & number of recipes
-        recipe_bins = count_contributors_by_recipe_range_with_bins(df)
+        recipe_bins = count_contributors_by_recipe_range_with_bins(df, contributor_summary)
         df_plot = recipe_bins.reset_index()
         df_plot.columns = ["Recipe Range", "Contributors"]
 
@@ -120,9 +117,9 @@ def display_contributors_page(df, df_ingr_map):
         #section 2.1 : filter to display what granularity we want
         if filter_option == "Top Contributors":
             top_n = st.slider("Select number of top contributors:", 1, 10, 5)
-            avg_comments_df = average_and_total_comments_per_contributor(df)
+            avg_comments_df = average_and_total_comments_per_contributor(df, contributor_summary)
             top_contributors = avg_comments_df.nlargest(top_n, "avg_comments_per_recipe")
-            filtered_df = df[df["contributor_id"].isin(top_contributors["contributor_id"])]
+            filtered_df = df[derived_column(df, "contributor_key").isin(top_contributors["contributor_id"])]
         elif filter_option == "Most Viewed Recipes":
             filtered_df = df.sort_values(by="num_comments", ascending=False).head(100)
         else:
@@ -139,13 +136,8 @@ def display_contributors_page(df, df_ingr_map):
         if tags.empty:
             st.warning("No tags found in the selected data.")
         else:
-            wordcloud = WordCloud(
-                width=800, height=400, background_color='white', colormap='Oranges'
-            ).generate_from_frequencies(tags)
-            fig, ax = plt.subplots(figsize=(10, 6))
-            ax.imshow(wordcloud, interpolation="bilinear")
-            ax.axis("off")
-            st.pyplot(fig)
+            st.image(wordcloud_png(tags, scope=f"tags:{filter_option}", top_n=top_n_tags, colormap='Oranges'),
+                     use_container_width=True)
 
         #section 2.3 : Top ingredients to display 
         st.markdown(
@@ -1,11 +1,40 @@
 from load_data.preprocess.clean_dataframe import prepare_final_dataframe
 from load_data.preprocess.merging import dataframe_concat
+from load_data.columnar_cache import cache_path_for, cached_source_hash, file_sha256, read_cache, write_cache
+from load_data.list_columns import parse_list_columns
+from load_data.schema import apply_schema, memory_report
+from load_data.contributor_summary import build_contributor_summary, summary_path_for
+from load_data.query import DatasetQuery
 import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Explicit dtypes of df_preprocess.csv, so the csv parser does not have to infer them
+CSV_DTYPES = {
+    'recipe_id': 'int64',
+    'name': 'object',
+    'minutes': 'int64',
+    'contributor_id': 'int64',
+    'tags': 'object',
+    'nutrition': 'object',
+    'n_steps': 'int64',
+    'steps': 'object',
+    'ingredients': 'object',
+    'n_ingredients': 'int64',
+    'ingredient_ids': 'object',
+    'ingredient_tokens': 'object',
+    'month': 'int64',
+    'year': 'int64',
+    'num_comments': 'int64',
+    'avg_ratings': 'float64',
+    'season': 'object',
+}
 
 
 class DataFrameLoadder():
     # FIXME : --> add upload csv files
-    def __init__(self,  path_raw_interaction: str):
+    def __init__(self,  path_raw_interaction: str, use_cache: bool = True):
         """
         Dataset Loadder
 
@@ -15,12 +44,20 @@ class DataFrameLoadder():
             path_raw_interaction (str): path to raw_interaction.csv.
             path_raw_recipes (str): path to raw_recipies.csv.
             pp_recipe (TYPE): path_pp_recipe.csv.
+            use_cache (bool): read/write a parquet sidecar of the csv. Defaults to True.
 
         Returns:
             None.
 
         """
         self.path_raw_interaction = path_raw_interaction
+        self.use_cache = use_cache
+        self.cache_path = cache_path_for(path_raw_interaction)
+        # 'hit', 'miss' or 'disabled' once load() has run
+        self.cache_status = None
+        self.source_hash = None
+        # memory of each column before/after the schema, when the csv was parsed
+        self.memory_report = None
 
     def __getitem__(self, df_name: str):
         if not isinstance(df_name, str):
@@ -34,8 +71,83 @@ class DataFrameLoadder():
             return pd.read_csv(self.df_name)
 
     def load(self):
-        
-        self.raw_interaction = pd.read_csv(self.path_raw_interaction)
+        """
+        Load the dataset, from the parquet cache when it is up to date with the csv.
+
+        On a cache miss the csv is parsed and the cache is (re)built, so the next
+        load of the same csv reads the columnar file instead. The list-valued
+        columns are returned as Arrow lists (see load_data.list_columns) and the
+        other columns with the dtypes of load_data.schema.
+
+        Returns:
+            pd.DataFrame: the dataset.
+        """
+        self.source_hash = file_sha256(self.path_raw_interaction)
+
+        if self.use_cache:
+            df = read_cache(self.cache_path, self.source_hash)
+            if df is not None:
+                self.cache_status = 'hit'
+                logger.info("Cache hit: loaded %s", self.cache_path)
+                self.raw_interaction = apply_schema(df)
+                self.df = self.raw_interaction
+                return self.df
+
+        self.raw_interaction = pd.read_csv(self.path_raw_interaction, dtype=CSV_DTYPES)
+        # the list columns are parsed once here, and stored parsed in the cache
+        parsed = parse_list_columns(self.raw_interaction)
+        self.raw_interaction = apply_schema(parsed)
+        self.memory_report = memory_report(parsed, self.raw_interaction)
+        logger.info("Memory of the dataset with its schema:\n%s", self.memory_report)
         self.df = self.raw_interaction
 
+        if self.use_cache:
+            self.cache_status = 'miss'
+            logger.info("Cache miss: parsed %s, rebuilding %s", self.path_raw_interaction, self.cache_path)
+            write_cache(self.df, self.cache_path, self.source_hash)
+        else:
+            self.cache_status = 'disabled'
+
         return self.df
+
+    def contributor_summary(self):
+        """
+        Load the summary table of the contributors of the dataset, see load_data.contributor_summary.
+
+        The table is stored next to the csv, tagged with the hash of the csv like the
+        parquet cache, and rebuilt from the dataset when the csv changes.
+
+        Returns:
+            pd.DataFrame: one row per contributor.
+        """
+        if self.source_hash is None:
+            self.load()
+        summary_path = summary_path_for(self.path_raw_interaction)
+
+        if self.use_cache:
+            summary = read_cache(summary_path, self.source_hash)
+            if summary is not None:
+                logger.info("Contributor summary loaded from %s", summary_path)
+                return summary
+
+        summary = build_contributor_summary(self.df)
+        if self.use_cache:
+            write_cache(summary, summary_path, self.source_hash)
+            logger.info("Contributor summary written to %s", summary_path)
+        return summary
+
+    def query(self):
+        """
+        Lazy query over the dataset, see load_data.query.
+
+        The query reads the parquet cache when it is up to date with the csv, so its filters
+        and columns are pushed down into the read, and the loaded dataFrame otherwise.
+
+        Returns:
+            DatasetQuery: query selecting the whole dataset.
+        """
+        if self.source_hash is None:
+            self.load()
+        if self.use_cache and cached_source_hash(self.cache_path) == self.source_hash:
+            return DatasetQuery(self.cache_path)
+        return DatasetQuery(self.df)
@@ -0,0 +1,234 @@
+"""Background bootstrap of the dataset: fetch, decompress, parse and index it in a worker thread"""
+
+import logging
+import os
+import shutil
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from load_data.shared_store import load_shared_dataset
+
+logger = logging.getLogger(__name__)
+
+# Environment variables configuring where the missing data files are fetched from
+MIRROR_DIR_ENV = 'DATA_MIRROR_DIR'
+ARCHIVE_URL_ENV = 'DATA_ARCHIVE_URL'
+
+# Stages of the bootstrap and the progress reached when they start
+STAGES = {
+    'fetch': (0.0, "Fetching the data files..."),
+    'decompress': (0.2, "Decompressing the data files..."),
+    'parse': (0.3, "Parsing the recipes..."),
+    'index': (0.8, "Indexing the recipes..."),
+    'ready': (1.0, "Dataset ready."),
+}
+
+
+def _extract_member(archive_path, name, target):
+    """
+    Extract the member of a zip archive whose file name is `name` to `target`.
+
+    Only the file name of the members is compared, the paths inside the archive are never
+    used to write, and the file is renamed to target once complete.
+
+    Returns:
+        bool: True if the archive holds the file.
+    """
+    with zipfile.ZipFile(archive_path) as archive:
+        members = [info for info in archive.infolist() if not info.is_dir() and os.path.basename(info.filename) == name]
+        if not members:
+            return False
+        partial = target + '.part'
+        with archive.open(members[0]) as src, open(partial, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+    os.replace(partial, target)
+    logger.info("Extracted %s from %s", name, archive_path)
+    return True
+
+
+class DataSource():
+    def __init__(self, mirror_dir=None, archive_url=None):
+        """
+        Where the data files missing on disk are fetched from.
+
+        A local mirror is tried first: a directory holding the files, or zip archives holding
+        them. Then a zip archive is downloaded with gdown (Google Drive links).
+
+        Args:
+            mirror_dir (str, optional): directory of the local mirror. Defaults to None.
+            archive_url (str, optional): url of a zip archive of the data files. Defaults to None.
+
+        Returns:
+            None.
+        """
+        self.mirror_dir = mirror_dir
+        self.archive_url = archive_url
+
+    @classmethod
+    def from_env(cls):
+        """
+        Source configured by the DATA_MIRROR_DIR and DATA_ARCHIVE_URL environment variables.
+        """
+        return cls(os.environ.get(MIRROR_DIR_ENV), os.environ.get(ARCHIVE_URL_ENV))
+
+    def _from_mirror(self, missing, progress):
+        archives = []
+        for target in list(missing):
+            mirrored = os.path.join(self.mirror_dir, os.path.basename(target))
+            if os.path.isfile(mirrored):
+                shutil.copyfile(mirrored, target)
+                logger.info("Copied %s from the local mirror", mirrored)
+                missing.remove(target)
+        if missing:
+            archives = sorted(os.path.join(self.mirror_dir, name) for name in os.listdir(self.mirror_dir)
+                              if name.endswith('.zip'))
+        if archives:
+            progress('decompress')
+        for archive_path in archives:
+            for target in list(missing):
+                if _extract_member(archive_path, os.path.basename(target), target):
+                    missing.remove(target)
+
+    def _from_archive_url(self, missing, progress):
+        import gdown
+
+        archive_path = os.path.join(os.path.dirname(missing[0]), 'data_files.zip')
+        logger.info("Downloading %s", self.archive_url)
+        gdown.download(self.archive_url, archive_path, quiet=True)
+        progress('decompress')
+        try:
+            for target in list(missing):
+                if _extract_member(archive_path, os.path.basename(target), target):
+                    missing.remove(target)
+        finally:
+            os.remove(archive_path)
+
+    def fetch(self, paths, progress=None):
+        """
+        Make sure the data files exist, fetching the missing ones.
+
+        Args:
+            paths (list): paths of the data files.
+            progress (callable, optional): called with the name of each stage started. Defaults to None.
+
+        Raises:
+            FileNotFoundError: some files are neither on disk nor in the source.
+        """
+        progress = progress or (lambda stage: None)
+        missing = [path for path in paths if not os.path.exists(path)]
+        if not missing:
+            return
+        for path in missing:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if self.mirror_dir and os.path.isdir(self.mirror_dir):
+            self._from_mirror(missing, progress)
+        if missing and self.archive_url:
+            self._from_archive_url(missing, progress)
+        if missing:
+            raise FileNotFoundError(f"Data files not found and not available from the source: {missing}")
+
+
+class DatasetBootstrap():
+    def __init__(self, data_path, map_path, source=None):
+        """
+        Load the shared dataset in a worker thread, so the app renders while it loads.
+
+        The worker fetches the missing data files (see DataSource), then parses and indexes
+        them with `load_shared_dataset`. The pages needing the data wait on `future`, the
+        others can display `status()`.
+
+        Args:
+            data_path (str): path to df_preprocess.csv.
+            map_path (str): path to ingr_map.pkl.
+            source (DataSource, optional): source of the missing files. Defaults to None (files must exist).
+
+        Returns:
+            None.
+        """
+        self.data_path = data_path
+        self.map_path = map_path
+        self.source = source if source is not None else DataSource()
+        self.future = None
+        self._stage = None
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _progress(self, stage):
+        with self._lock:
+            self._stage = stage
+        logger.info("Dataset bootstrap: %s", stage)
+
+    def _run(self):
+        self._progress('fetch')
+        self.source.fetch([self.data_path, self.map_path], self._progress)
+        shared = load_shared_dataset(self.data_path, self.map_path, progress=self._progress)
+        # computed here rather than on the first visit of the recipes page
+        shared.seasonal_ingredients
+        self._progress('ready')
+        return shared
+
+    def start(self):
+        """
+        Start the worker, once.
+
+        Returns:
+            DatasetBootstrap: self.
+        """
+        if self.future is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dataset-bootstrap')
+            self.future = self._executor.submit(self._run)
+            # the thread exits once the dataset is loaded
+            self._executor.shutdown(wait=False)
+        return self
+
+    def status(self):
+        """
+        Progress of the bootstrap.
+
+        Returns:
+            tuple: fraction done (float between 0 and 1) and a message for the user.
+        """
+        with self._lock:
+            stage = self._stage
+        if self.future is not None and self.future.done() and self.future.exception() is not None:
+            return STAGES[stage][0] if stage else 0.0, f"Loading failed: {self.future.exception()}"
+        if stage is None:
+            return 0.0, "Waiting to load the dataset..."
+        return STAGES[stage]
+
+    @property
+    def ready(self):
+        """
+        True once the dataset is loaded.
+        """
+        return self.future is not None and self.future.done() and self.future.exception() is None
+
+    def wait(self, timeout=None):
+        """
+        Wait for the end of the bootstrap, loaded or failed.
+
+        Args:
+            timeout (float, optional): seconds to wait. Defaults to None (no limit).
+
+        Returns:
+            bool: True if the bootstrap is over.
+        """
+        wait([self.start().future], timeout)
+        return self.future.done()
+
+    def result(self, timeout=None):
+        """
+        Wait for the dataset.
+
+        Args:
+            timeout (float, optional): seconds to wait. Defaults to None (no limit).
+
+        Returns:
+            SharedDataset: the loaded dataset.
+
+        Raises:
+            TimeoutError: the dataset is not loaded after timeout seconds.
+            Exception: the error raised by the worker.
+        """
+        return self.start().future.result(timeout)
@@ -0,0 +1,167 @@
+"""Columnar (Parquet) sidecar cache for the preprocessed csv files"""
+
+import hashlib
+import json
+import logging
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# Key under which the hash of the source csv is stored in the parquet metadata
+SOURCE_HASH_KEY = b'lets_cook.source_sha256'
+
+# Key under which the format of the cache is stored: bump CACHE_FORMAT_VERSION whenever the
+# columns written change (2: list columns stored parsed as Arrow lists instead of strings,
+# 3: 'first_recipe_count' column of the contributor summary)
+FORMAT_VERSION_KEY = b'lets_cook.cache_format'
+CACHE_FORMAT_VERSION = '3'
+
+# Rows per row group: the statistics of each group let a filtered read skip it (see load_data.query)
+ROW_GROUP_ROWS = 64 * 1024
+
+
+def file_sha256(path, block_size=1 << 20):
+    """
+    Compute the sha256 of a file, reading it by blocks.
+
+    Args:
+        path (str): path of the file to hash.
+        block_size (int, optional): size of the blocks read. Defaults to 1 MiB.
+
+    Returns:
+        str: hexadecimal digest of the content of the file.
+    """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def cache_path_for(source_path):
+    """
+    Return the path of the parquet sidecar of a csv file (same folder, same name).
+
+    Args:
+        source_path (str): path to the csv file.
+
+    Returns:
+        str: path to the parquet file.
+    """
+    root, _ = os.path.splitext(source_path)
+    return root + '.parquet'
+
+
+def _list_types_mapper(arrow_type):
+    """
+    Map the Arrow list types to pandas ArrowDtype, other types use the default conversion.
+    """
+    if pa.types.is_list(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return None
+
+
+def table_to_pandas(table):
+    """
+    Convert a table read from a cache, keeping the list columns as Arrow lists instead of python objects.
+
+    The pandas metadata of the columns that were not read is dropped: pandas cannot parse the
+    dtype it records for the list columns, only the types mapper converts them.
+    """
+    metadata = table.schema.pandas_metadata
+    if metadata is not None:
+        kept = [col for col in metadata['columns'] if col['name'] is None or col['name'] in table.column_names]
+        if len(kept) != len(metadata['columns']):
+            metadata = dict(table.schema.metadata)
+            metadata[b'pandas'] = json.dumps(dict(table.schema.pandas_metadata, columns=kept)).encode()
+            table = table.replace_schema_metadata(metadata)
+    return table.to_pandas(types_mapper=_list_types_mapper)
+
+
+def cached_source_hash(cache_path):
+    """
+    Hash of the source a parquet cache of the current format was built from.
+
+    Args:
+        cache_path (str): path to the parquet file.
+
+    Returns:
+        str or None: sha256 of the source, None if the cache is missing, unreadable or of an older format.
+    """
+    try:
+        metadata = pq.read_schema(cache_path).metadata or {}
+    except (OSError, pa.ArrowException):
+        return None
+    if metadata.get(FORMAT_VERSION_KEY, b'').decode() != CACHE_FORMAT_VERSION:
+        return None
+    return metadata.get(SOURCE_HASH_KEY, b'').decode() or None
+
+
+def read_cache(cache_path, source_hash, columns=None):
+    """
+    Read the parquet sidecar if it exists, was built from the expected source and has the
+    current format (CACHE_FORMAT_VERSION).
+
+    Args:
+        cache_path (str): path to the parquet file.
+        source_hash (str): sha256 of the csv the cache should have been built from.
+        columns (list, optional): columns to read. Defaults to None (all columns).
+
+    Returns:
+        pd.DataFrame or None: the cached dataframe, None if the cache is missing, stale or of an older format.
+    """
+    if not os.path.exists(cache_path):
+        logger.info("No cache found at %s", cache_path)
+        return None
+
+    try:
+        metadata = pq.read_schema(cache_path).metadata or {}
+        if metadata.get(SOURCE_HASH_KEY, b'').decode() != source_hash:
+            logger.info("Cache %s is stale, the source file changed", cache_path)
+            return None
+        if metadata.get(FORMAT_VERSION_KEY, b'').decode() != CACHE_FORMAT_VERSION:
+            logger.info("Cache %s has an older format, it is rebuilt", cache_path)
+            return None
+        table = pq.read_table(cache_path, columns=columns)
+    except (OSError, pa.ArrowException) as e:
+        logger.warning("Could not read cache %s: %s", cache_path, e)
+        return None
+
+    return table_to_pandas(table)
+
+
+def write_cache(df, cache_path, source_hash):
+    """
+    Write a dataframe to a parquet sidecar, tagged with the hash of its source and the format of the cache.
+
+    The file is first written next to the target then moved, so a reader never
+    sees a partially written cache. A dataFrame Arrow can not convert, or a failed write,
+    only logs a warning: no cache is written.
+
+    Args:
+        df (pd.DataFrame): dataframe to store.
+        cache_path (str): path to the parquet file.
+        source_hash (str): sha256 of the csv the dataframe was read from.
+
+    Returns:
+        None.
+    """
+    tmp_path = cache_path + '.tmp'
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[SOURCE_HASH_KEY] = source_hash.encode()
+        metadata[FORMAT_VERSION_KEY] = CACHE_FORMAT_VERSION.encode()
+        table = table.replace_schema_metadata(metadata)
+        pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_ROWS)
+        os.replace(tmp_path, cache_path)
+        logger.info("Cache written to %s", cache_path)
+    except (OSError, pa.ArrowException) as e:
+        # the cache is optional, the caller keeps the dataFrame in memory
+        logger.warning("Could not write cache %s: %s", cache_path, e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,69 @@
+"""Summary table of the contributors, materialized next to the preprocessed csv"""
+
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columns of the average rating of a recipe, the first one present is used
+RATING_COLUMNS = ['avg_reviews', 'avg_ratings']
+
+SUMMARY_COLUMNS = ['contributor_id', 'recipe_count', 'first_recipe_count', 'total_comments', 'mean_comments',
+                   'mean_rating']
+
+
+def summary_path_for(source_path):
+    """
+    Path of the contributor summary of a csv file: same folder, '_contributors.parquet' suffix.
+    """
+    root, _ = os.path.splitext(source_path)
+    return root + '_contributors.parquet'
+
+
+def build_contributor_summary(df):
+    """
+    Aggregate the recipes by contributor in one pass.
+
+    Args:
+        df (pd.DataFrame): recipes with 'contributor_id', 'recipe_id' and 'num_comments' columns.
+
+    Returns:
+        pd.DataFrame: one row per contributor, sorted by contributor_id, with the number of
+            recipes, the total and mean number of comments and the mean rating of the recipes.
+            'first_recipe_count' counts each recipe once, for the contributor of its first row,
+            so its sum is the number of distinct recipes of df.
+    """
+    rating = next((col for col in RATING_COLUMNS if col in df.columns), None)
+    grouped = df.groupby('contributor_id', sort=True)
+    first_rows = df.dropna(subset=['recipe_id']).drop_duplicates(subset=['recipe_id'])
+    summary = pd.DataFrame({
+        'recipe_count': grouped['recipe_id'].nunique(),
+        'first_recipe_count': first_rows.groupby('contributor_id').size(),
+        'total_comments': grouped['num_comments'].sum(),
+        'mean_comments': grouped['num_comments'].mean(),
+        'mean_rating': grouped[rating].mean() if rating is not None else np.nan,
+    }).reset_index()
+    summary['first_recipe_count'] = summary['first_recipe_count'].fillna(0).astype('int64')
+    logger.info("Contributor summary built: %s contributors", len(summary))
+    return summary[SUMMARY_COLUMNS]
+
+
+def contributor_stats(summary, contributor_id):
+    """
+    Row of the summary of a contributor.
+
+    Args:
+        summary (pd.DataFrame): output of `build_contributor_summary`.
+        contributor_id (int): id of the contributor.
+
+    Returns:
+        pd.Series: the statistics of the contributor, None if they are not in the summary.
+    """
+    ids = summary['contributor_id'].to_numpy()
+    position = np.searchsorted(ids, contributor_id)
+    if position == len(ids) or ids[position] != contributor_id:
+        return None
+    return summary.iloc[position]
@@ -0,0 +1,210 @@
+"""
+Typed storage of the list-valued columns of the dataset.
+
+In the csv files the columns 'tags', 'ingredient_ids', 'ingredients', 'steps' and 'nutrition'
+are python lists written as strings. They are parsed once into Arrow list arrays: a flat array
+with the values of every row plus an array of offsets giving where each row starts. The tags and
+the ingredients are dictionary encoded (integer codes + the distinct names).
+"""
+
+import ast
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# Kind of values of each list column
+LIST_COLUMNS = {
+    'tags': 'dictionary',
+    'ingredient_ids': 'int',
+    'ingredients': 'dictionary',
+    'steps': 'string',
+    'nutrition': 'float',
+}
+
+# A quoted python string, as written by repr()
+_QUOTED = re.compile(r"'([^'\\]*)'|\"([^\"\\]*)\"")
+
+
+def _parse_strings(text):
+    """
+    Parse a python list of strings written as a string.
+
+    Args:
+        text (str): e.g. "['salt', 'water']".
+
+    Returns:
+        list: the strings of the list.
+    """
+    if '\\' in text:
+        # escaped characters, let python read it
+        return [str(value) for value in ast.literal_eval(text)]
+    return [single or double for single, double in _QUOTED.findall(text)]
+
+
+def _string_lists(series):
+    """
+    Parse a column of lists of strings.
+
+    Returns:
+        tuple: flat list of the values, array of the lengths of the rows and mask of the missing rows.
+    """
+    missing = ~series.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+    parsed = [_parse_strings(text) if not is_missing else [] for text, is_missing in zip(series, missing)]
+    lengths = np.fromiter((len(values) for values in parsed), dtype=np.int64, count=len(parsed))
+    flat = [value for values in parsed for value in values]
+    return flat, lengths, missing
+
+
+def _number_lists(series):
+    """
+    Parse a column of lists of numbers. Values that are not numbers become missing.
+
+    Returns:
+        tuple: flat float array of the values, array of the lengths of the rows and mask of the missing rows.
+    """
+    missing = ~series.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+    inner = series.where(~missing, '').str.strip().str.strip('[]').str.strip()
+    lengths = np.where(inner == '', 0, inner.str.count(',') + 1).astype(np.int64)
+    tokens = ','.join(inner[lengths > 0]).split(',') if lengths.any() else []
+    values = pd.to_numeric(pd.Series(tokens, dtype=object).str.strip(), errors='coerce').to_numpy(dtype=float)
+    return values, lengths, missing
+
+
+def parse_list_column(series, kind):
+    """
+    Parse a column of lists written as strings into an Arrow list column.
+
+    Args:
+        series (pd.Series): column of strings such as "[1, 2]" or "['a', 'b']", NaN for missing rows.
+        kind (str): 'int', 'float', 'string' or 'dictionary' (strings stored as integer codes).
+
+    Returns:
+        pd.Series: list column (pd.ArrowDtype) with the same index and name.
+    """
+    if kind not in ['int', 'float', 'string', 'dictionary']:
+        raise ValueError(f"kind should be 'int', 'float', 'string' or 'dictionary', got {kind}")
+
+    if kind in ['int', 'float']:
+        values, lengths, missing = _number_lists(series)
+        if kind == 'int':
+            values = pa.array(np.nan_to_num(values).astype(np.int64), mask=np.isnan(values))
+        else:
+            values = pa.array(values, mask=np.isnan(values))
+    else:
+        flat, lengths, missing = _string_lists(series)
+        if kind == 'dictionary':
+            codes, names = pd.factorize(pd.Series(flat, dtype=object))
+            values = pa.DictionaryArray.from_arrays(
+                pa.array(codes.astype(np.int32)), pa.array(np.asarray(names, dtype=object), type=pa.string())
+            )
+        else:
+            values = pa.array(flat, type=pa.string())
+
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int32)
+    np.cumsum(lengths, out=offsets[1:])
+    lists = pa.ListArray.from_arrays(pa.array(offsets), values, mask=pa.array(missing))
+    logger.debug("Parsed list column %s: %s rows, %s values", series.name, len(series), len(values))
+    return pd.Series(pd.arrays.ArrowExtensionArray(lists), index=series.index, name=series.name)
+
+
+def parse_list_columns(df):
+    """
+    Parse every list column of LIST_COLUMNS present in the dataFrame.
+
+    Args:
+        df (pd.DataFrame): dataFrame read from a csv file.
+
+    Returns:
+        pd.DataFrame: copy of the dataFrame with the list columns parsed.
+    """
+    df = df.copy()
+    for column, kind in LIST_COLUMNS.items():
+        if column in df.columns and not is_list_column(df[column]):
+            df[column] = parse_list_column(df[column], kind)
+    logger.info("Parsed the list columns.")
+    return df
+
+
+def is_list_column(series):
+    """
+    Check whether a column is already an Arrow list column.
+    """
+    return isinstance(series.dtype, pd.ArrowDtype) and pa.types.is_list(series.dtype.pyarrow_dtype)
+
+
+def as_list_array(series, kind):
+    """
+    Arrow list array of a column, parsed from its strings if it is not a list column yet.
+
+    Args:
+        series (pd.Series): list column or column of strings.
+        kind (str): kind of values, used if the column has to be parsed.
+
+    Returns:
+        pa.ListArray: the lists of the rows of the column.
+    """
+    if not is_list_column(series):
+        series = parse_list_column(series, kind)
+    lists = pa.array(series)
+    if isinstance(lists, pa.ChunkedArray):
+        lists = lists.combine_chunks()
+    return lists
+
+
+def flatten_list_column(series, kind):
+    """
+    Values of all the lists of a column, in one flat array.
+
+    Args:
+        series (pd.Series): list column or column of strings.
+        kind (str): kind of values, see LIST_COLUMNS.
+
+    Returns:
+        tuple: the values (pd.Categorical for 'dictionary', np.ndarray otherwise) and
+            the number of values of each row (np.ndarray).
+    """
+    lists = as_list_array(series, kind)
+    flat = lists.flatten()
+    lengths = lists.value_lengths().fill_null(0).to_numpy(zero_copy_only=False)
+
+    if pa.types.is_dictionary(flat.type):
+        codes = flat.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+        values = pd.Categorical.from_codes(codes, categories=flat.dictionary.to_pandas())
+    else:
+        values = flat.to_numpy(zero_copy_only=False)
+    return values, lengths
+
+
+def list_column_to_matrix(series, kind, width):
+    """
+    Values of a column of numeric lists as a matrix with one row per row of the column.
+
+    Lists shorter than `width` are completed with NaN, longer lists are truncated.
+
+    Args:
+        series (pd.Series): list column or column of strings.
+        kind (str): 'int' or 'float'.
+        width (int): number of columns of the matrix.
+
+    Returns:
+        np.ndarray: float matrix of shape (len(series), width).
+    """
+    lists = as_list_array(series, kind)
+    flat = lists.flatten().to_numpy(zero_copy_only=False).astype(float)
+    lengths = lists.value_lengths().fill_null(0).to_numpy(zero_copy_only=False)
+
+    if (lengths == width).all():
+        return flat.reshape(len(lengths), width)
+
+    matrix = np.full((len(lengths), width), np.nan)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    positions = np.arange(len(flat)) - starts
+    keep = positions < width
+    matrix[rows[keep], positions[keep]] = flat[keep]
+    return matrix
@@ -1,8 +1,7 @@
 import pandas as pd 
 import logging
 
-logging.basicConfig(filename='logging/debug.log', level=logging.DEBUG, filemode="w", format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
+logger = logging.getLogger(__name__)
 
 def add_columns(df_target, df_source, key_target, key_source, columns_to_add):
     """
@@ -21,20 +20,20 @@ def add_columns(df_target, df_source, key_target, key_source, columns_to_add):
     """
 
     try : 
-        logging.info("Starting add_columns function.")
+        logger.info("Starting add_columns function.")
     # Checking key columns
         if key_target not in df_target.columns:
             error_message = f"The key '{key_target}' is not in the output dataframe."
-            logging.error(error_message)
+            logger.error(error_message)
         if key_source not in df_source.columns:
             error_message = f"The key '{key_target}' is not in the intput dataframe."
-            logging.error(error_message)
+            logger.error(error_message)
 
         # Checking the columns to add
         missing_cols = [col for col in columns_to_add if col not in df_source.columns]
         if missing_cols:
             error_message = f"The following columns are missing in the source DataFrame : {missing_cols}"
-            logging.error(error_message)
+            logger.error(error_message)
 
         # Select only the necessary columns from the source DataFrame
         df_source_reduced = df_source[[key_source] + columns_to_add].copy()
@@ -56,11 +55,11 @@ def add_columns(df_target, df_source, key_target, key_source, columns_to_add):
         if key_source != key_target:
             df_result = df_result.drop(columns=[key_source])
         
-        logging.info("add_columns function completed successfully.")
+        logger.info("add_columns function completed successfully.")
         return df_result
 
     except Exception as e:
-        logging.exception("An error occurred in add_columns.")
+        logger.exception("An error occurred in add_columns.")
         raise
 
 def drop_columns(df, columns_to_drop):
@@ -75,25 +74,25 @@ def drop_columns(df, columns_to_drop):
         df: new dataframe without the columns that weren't needed
     """
     try:
-        logging.info("Starting drop_columns function.")
+        logger.info("Starting drop_columns function.")
 
         if not isinstance(df, pd.DataFrame):
             error_message = "The input must be a DataFrame."
-            logging.error(error_message)
+            logger.error(error_message)
             raise ValueError(error_message)
 
         columns_to_drop = columns_to_drop if isinstance(columns_to_drop, list) else [columns_to_drop]
 
         for col in columns_to_drop:
             if col not in df.columns:
-                logging.warning(f"Column '{col}' not found in the DataFrame. Skipping.")
+                logger.warning("Column '%s' not found in the DataFrame. Skipping.", col)
                 continue
-            logging.info(f"Dropping column: {col}")
+            logger.info("Dropping column: %s", col)
             df = df.drop(col, axis=1)
 
-        logging.info("drop_columns function completed successfully.")
+        logger.info("drop_columns function completed successfully.")
         return df
 
     except Exception as e:
-        logging.exception("An error occurred in drop_columns.")
+        logger.exception("An error occurred in drop_columns.")
         raise
\ No newline at end of file
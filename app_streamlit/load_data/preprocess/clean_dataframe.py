@@ -1,50 +1,58 @@
 import pandas as pd
 from load_data.preprocess.df_aggregate import df_aggregate
+from load_data.preprocess.df_aggregate import PartialAggregate
+from load_data.preprocess.distinct_users import DistinctUserCounter
 from load_data.preprocess.merging import dataframe_concat
 from load_data.preprocess.add_drop_column import add_columns
 from load_data.preprocess.add_drop_column import drop_columns
-from load_data.preprocess.cleaning_data import outliers_df
-from load_data.preprocess.cleaning_data import remove_outliers_iqr
+from load_data.preprocess.cleaning_data import outliers_mask
+from load_data.preprocess.cleaning_data import remove_outliers_iqr_multi
 from load_data.preprocess.cleaning_data import date_separated
 from load_data.preprocess.cleaning_data import add_season
-from analyse.utils import nutri_score
-import logging 
+from load_data.list_columns import list_column_to_matrix
+from analyse.utils import nutri_score_batch
+from load_data.schema import NUTRITION_COLS, apply_schema
+from load_data.preprocess.parallel import preprocessing_pool
+from load_data.preprocess.profiling import run_step
+import logging
 
-logging.basicConfig(
-    filename='logging/debug.log',
-    level=logging.DEBUG,
-    filemode='w',
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+logger = logging.getLogger(__name__)
 
-def prepare_final_dataframe(raw_interaction, raw_recipes, pp_recipes):
+COLUMNS_TO_CHECK_OUTLIERS = [
+    'recipe_id', 'minutes', 'contributor_id', 'n_steps', 'n_ingredients',
+    'Calories', 'Total Fat', 'Sugar', 'Sodium', 'Protein', 'Saturated Fat', 'Carbohydrates'
+]
+
+
+def merge_recipes(raw_interaction, raw_recipes, pp_recipes, report=None):
     """
-    Prepare a new clean dataframe, that will be used for the analysis,
-    by using other functions.
+    Steps 1 and 2 of the preprocessing: add the recipes information to the interactions.
 
     Args:
         raw_interaction (DataFrame): raw dataFrame of interactions from users
         raw_recipes (DataFrame): raw dataFrame with recipes informations
         pp_recipes (DataFrame): recipies dataFrame preprocessed
+        report (PipelineReport, optional): measures of the steps. Defaults to None.
 
     Returns:
-        df_merged (DataFrame): final dataFrame
+        df_merged (DataFrame): one row per interaction with the recipe columns
     """
-
-    logging.info("Starting to prepare the final dataframe.")
-
     # step 1 : merge raw_interaction et raw_recipes on "recipe_id" et "id"
 
     raw_recipes_renamed = raw_recipes.rename(columns={'id': 'recipe_id'})
 
-    df_merged = dataframe_concat([raw_interaction, raw_recipes_renamed], key='recipe_id', join="left")
-    df_merged.reset_index(drop=True, inplace=True)
-    logging.info("Merged raw_interaction with raw_recipes on 'recipe_id'.")
+    def merge(raw_interaction):
+        df_merged = dataframe_concat([raw_interaction, raw_recipes_renamed], key='recipe_id', join="left")
+        return df_merged.reset_index(drop=True)
+
+    df_merged = run_step(report, 'merge', merge, raw_interaction)
+    logger.info("Merged raw_interaction with raw_recipes on 'recipe_id'.")
 
 
     # step 2 : add columns 'ingredient_ids', 'ingredient_tokens' on pp_recipes
     pp_recipes_renamed = pp_recipes.rename(columns={'id': 'recipe_id'})
-    df_merged = add_columns(
+    df_merged = run_step(
+        report, 'add_columns', add_columns,
         df_merged,
         pp_recipes_renamed,
         key_target='recipe_id',
@@ -53,69 +61,324 @@ def prepare_final_dataframe(raw_interaction, raw_recipes, pp_recipes):
     )
 
     df_merged.reset_index(drop=True, inplace=True)
-    df_merged=df_merged.head(50000) #not enough ram for less 
-    logging.info("Added 'ingredient_ids' and 'ingredient_tokens' columns from pp_recipes.")
+    logger.info("Added 'ingredient_ids' and 'ingredient_tokens' columns from pp_recipes.")
+    return df_merged
+
+
+def clean_rows(df_merged, pool=None, report=None):
+    """
+    Steps 3 to 5 of the preprocessing: split the dates, remove the outliers of
+    'n_steps' and 'minutes' and drop the unused columns.
+
+    Every operation only depends on the row itself.
 
+    Args:
+        df_merged (DataFrame): output of `merge_recipes`
+        pool (PreprocessingPool, optional): workers splitting the dates. Defaults to None (serial).
+        report (PipelineReport, optional): measures of the steps. Defaults to None.
+
+    Returns:
+        df_merged (DataFrame): cleaned dataFrame
+    """
     # step 3 : seperate date and submitted and delete column
+    separate = date_separated if pool is None else pool.date_separated
     if 'date' in df_merged.columns:
-        df_merged = date_separated('date', df_merged)
+        df_merged = run_step(report, 'split_date', lambda df: separate('date', df), df_merged)
         df_merged = drop_columns(df_merged, ['day', 'date'])
-        logging.info("Separated 'date' column and dropped 'day' and 'date'.")
+        logger.info("Separated 'date' column and dropped 'day' and 'date'.")
 
     if 'submitted' in df_merged.columns:
-        df_merged = date_separated('submitted', df_merged)
+        df_merged = run_step(report, 'split_submitted', lambda df: separate('submitted', df), df_merged)
         df_merged = drop_columns(df_merged, ['day', 'submitted'])
-        logging.info("Removed outliers from 'n_steps' column.")
-    df_merged.reset_index(drop=True, inplace=True)
+        logger.info("Separated 'submitted' column and dropped 'day' and 'submitted'.")
 
     # cleaning intermediate
     if 'n_steps' in df_merged.columns:
-        df_merged.reset_index(drop=True, inplace=True)
-        outliers_n_steps = outliers_df(df_merged, 'n_steps', treshold_sup=20)
-        df_merged = df_merged[~df_merged['n_steps'].isin(outliers_n_steps)]
-        df_merged.reset_index(drop=True, inplace=True)
+        df_merged = run_step(report, 'outliers_n_steps',
+                             lambda df: df[~outliers_mask(df, 'n_steps', treshold_sup=20)], df_merged)
+        logger.info("Removed outliers from 'n_steps' column.")
 
     if 'minutes' in df_merged.columns:
-        df_merged.reset_index(drop=True, inplace=True)
-        outliers_minutes = outliers_df(df_merged, 'minutes', treshold_sup=240)
-        df_merged = df_merged[~df_merged['minutes'].isin(outliers_minutes)]
-        df_merged.reset_index(drop=True, inplace=True)
+        df_merged = run_step(report, 'outliers_minutes',
+                             lambda df: df[~outliers_mask(df, 'minutes', treshold_sup=240)], df_merged)
+        logger.info("Removed outliers from 'minutes' column.")
 
     # step 5 : delate unusfull columns
     columns_to_drop = ['description']
     df_merged = drop_columns(df_merged, columns_to_drop)
-    df_merged = df_aggregate(df_merged)
-    logging.info("Dropped 'description' column and applied aggregation.")
+    return df_merged
+
 
+def add_recipe_features(df_merged, pool=None, report=None):
+    """
+    Steps 6 and 7 of the preprocessing: add the season, the nutrients and the nutri-score.
+
+    Args:
+        df_merged (DataFrame): one row per recipe
+        pool (PreprocessingPool, optional): workers parsing the nutrients. Defaults to None (serial).
+        report (PipelineReport, optional): measures of the steps. Defaults to None.
+
+    Returns:
+        df_merged (DataFrame): dataFrame with the new columns
+    """
     # step 6 : add a column for seasons
-    df_merged=add_season(df_merged)
-    logging.info("Added 'season' column.")
+    df_merged = run_step(report, 'season', add_season, df_merged)
+    logger.info("Added 'season' column.")
 
 
     # step 7: Nutrients data treatment
-    nutrition_cols = ['Calories', 'Total Fat', 'Sugar', 'Sodium', 'Protein', 'Saturated Fat', 'Carbohydrates']
-    df_merged[nutrition_cols] = df_merged['nutrition'].str.strip('[]').str.split(',', expand=True)
-    # Conversion in float
-    df_merged[nutrition_cols] = df_merged[nutrition_cols].apply(pd.to_numeric, errors='coerce')
-    # Calcul the nutrii-score
-    df_merged['nutri_score'] = df_merged.apply(nutri_score, axis=1)
-    logging.info("Added 'season' column.")
+    def nutrients(df_merged):
+        if pool is not None:
+            nutrition, grades = pool.nutrition(df_merged['nutrition'])
+            df_merged[NUTRITION_COLS] = pd.DataFrame(nutrition, index=df_merged.index)
+            df_merged['nutri_score'] = grades
+            return df_merged
 
+        # parsed in one pass over the column, values that are not numbers become NaN
+        nutrition = list_column_to_matrix(df_merged['nutrition'], 'float', len(NUTRITION_COLS))
+        df_merged[NUTRITION_COLS] = pd.DataFrame(nutrition, index=df_merged.index)
+        # Calcul the nutrii-score
+        df_merged['nutri_score'] = nutri_score_batch(df_merged)
+        return df_merged
+
+    df_merged = run_step(report, 'nutrition', nutrients, df_merged)
+    logger.info("Added 'nutri_score' column.")
+    return df_merged
+
+
+def prepare_final_dataframe(raw_interaction, raw_recipes, pp_recipes, n_jobs=1, report=None):
+    """
+    Prepare a new clean dataframe, that will be used for the analysis,
+    by using other functions.
+
+    All the interactions are held in memory, see `prepare_final_dataframe_chunked`
+    for the full dataset.
+
+    Args:
+        raw_interaction (DataFrame): raw dataFrame of interactions from users
+        raw_recipes (DataFrame): raw dataFrame with recipes informations
+        pp_recipes (DataFrame): recipies dataFrame preprocessed
+        n_jobs (int, optional): worker processes splitting the dates and parsing the nutrients,
+            None or -1 for one per core, see load_data.preprocess.parallel. Defaults to 1 (serial).
+        report (PipelineReport, optional): filled with the time, rows and memory of each step,
+            see load_data.preprocess.profiling. Defaults to None.
+
+    Returns:
+        df_merged (DataFrame): final dataFrame
+    """
+
+    logger.info("Starting to prepare the final dataframe.")
+
+    df_merged = merge_recipes(raw_interaction, raw_recipes, pp_recipes, report)
+    with preprocessing_pool(n_jobs) as pool:
+        df_merged = clean_rows(df_merged, pool, report)
+        df_merged = run_step(report, 'aggregate', df_aggregate, df_merged)
+        logger.info("Dropped 'description' column and applied aggregation.")
+
+        df_merged = add_recipe_features(df_merged, pool, report)
 
     # Step 8 : clean dataframe (supprimer les outliers après traitement de 'nutrition')
-    columns_to_check_outliers = [
-        'recipe_id', 'minutes', 'contributor_id', 'n_steps', 'n_ingredients',
-        'Calories', 'Total Fat', 'Sugar', 'Sodium', 'Protein', 'Saturated Fat', 'Carbohydrates'
-    ]
+    columns = [col for col in COLUMNS_TO_CHECK_OUTLIERS if col in df_merged.columns]
+    df_merged, removed = run_step(report, 'iqr', remove_outliers_iqr_multi, df_merged, columns)
+    logger.info("Removed outliers from 'nutrition' columns: %s", removed)
+
+    # Step 9 : declared dtypes (categories, smaller integers and floats)
+    df_merged = run_step(report, 'schema', apply_schema, df_merged)
+
+    logger.info("Final dataframe prepared successfully.")
+
+
+    return df_merged
+
+
+def _rows_per_chunk(df_sample, memory_budget_mb):
+    """
+    Number of rows of a chunk so that it holds in the memory budget.
 
-    for col in columns_to_check_outliers:
-        if col in df_merged.columns:
-            df_merged = remove_outliers_iqr(df_merged, col)
-    logging.info("Removed outliers from 'nutrition' columns.")
+    Args:
+        df_sample (DataFrame): first rows of the data, used to estimate the size of a row
+        memory_budget_mb (int, float): memory allowed for one chunk, in MB
+
+    Returns:
+        int: number of rows per chunk
+    """
+    if len(df_sample) == 0:
+        return 1
+    bytes_per_row = df_sample.memory_usage(deep=True).sum() / len(df_sample)
+    return max(1, int(memory_budget_mb * 1e6 // bytes_per_row))
+
+
+def _iter_chunks(data, memory_budget_mb, chunk_rows=None):
+    """
+    Iterate over a csv file or a dataFrame by chunks.
+
+    Args:
+        data (str or DataFrame): path to a csv file or dataFrame
+        memory_budget_mb (int, float): memory allowed for one chunk, in MB
+        chunk_rows (int, optional): number of rows per chunk, estimated from the budget if None
+
+    Yields:
+        DataFrame: the chunks, in order
+    """
+    if isinstance(data, pd.DataFrame):
+        if chunk_rows is None:
+            chunk_rows = _rows_per_chunk(data.head(1000), memory_budget_mb)
+        for start in range(0, len(data), chunk_rows):
+            yield data.iloc[start:start + chunk_rows]
+    else:
+        if chunk_rows is None:
+            chunk_rows = _rows_per_chunk(pd.read_csv(data, nrows=1000), memory_budget_mb)
+        yield from pd.read_csv(data, chunksize=chunk_rows)
+
+
+def aggregate_interactions(chunks, aggregate=None, seen_recipes=None):
+    """
+    Pass 1 of the chunked preprocessing: metrics of the interactions and first interaction of each recipe.
 
+    Args:
+        chunks (iterable): chunks of interactions, in order.
+        aggregate (PartialAggregate, optional): aggregate of the interactions already read. Defaults to None.
+        seen_recipes (pd.Index, optional): recipes already read, their first interaction is not kept. Defaults to None.
+
+    Returns:
+        tuple: the aggregate of all the interactions (PartialAggregate) and the first interaction
+            of each new recipe (DataFrame), in order of appearance.
+    """
+    if aggregate is None:
+        aggregate = PartialAggregate()
+    if seen_recipes is None:
+        seen_recipes = pd.Index([], dtype='int64')
+
+    first_rows = []
+    for chunk in chunks:
+        aggregate = aggregate.merge(PartialAggregate.from_interactions(chunk))
+        first_rows.append(chunk.drop_duplicates(subset=['recipe_id']))
+    if not first_rows:
+        return aggregate, pd.DataFrame()
+
+    # the recipes seen in several chunks are dropped once, after a single concatenation
+    first_rows = pd.concat(first_rows, ignore_index=True).drop_duplicates(subset=['recipe_id'])
+    first_rows = first_rows[~first_rows['recipe_id'].isin(seen_recipes)].reset_index(drop=True)
+    return aggregate, first_rows
+
+
+def process_recipes(first_rows, metrics, raw_recipes, pp_recipes, memory_budget_mb=256, chunk_rows=None, pool=None,
+                    report=None):
+    """
+    Pass 2 of the chunked preprocessing: row-wise steps on the first interaction of each recipe.
+
+    Args:
+        first_rows (DataFrame): first interaction of each recipe, with an '_order' column.
+        metrics (DataFrame): output of `PartialAggregate.metrics`.
+        raw_recipes (str or DataFrame): path to the raw recipes csv or dataFrame
+        pp_recipes (DataFrame): preprocessed recipes, with the 'id', 'ingredient_ids' and 'ingredient_tokens' columns
+        memory_budget_mb (int, float, optional): memory allowed for one chunk of raw recipes, in MB. Defaults to 256.
+        chunk_rows (int, optional): number of rows per chunk, overrides the memory budget. Defaults to None.
+        pool (PreprocessingPool, optional): workers of the row-wise steps. Defaults to None (serial).
+        report (PipelineReport, optional): measures of the steps, recorded for each chunk. Defaults to None.
+
+    Returns:
+        df_merged (DataFrame): one row per recipe, before the outliers of step 8 are removed
+    """
+    def process(rows, recipes):
+        df_merged = merge_recipes(rows, recipes, pp_recipes, report)
+        df_merged = clean_rows(df_merged, pool, report)
+        df_merged = df_merged.drop(columns=['user_id', 'rating'])
+        df_merged = df_merged.merge(metrics, on='recipe_id', how='left')
+        return add_recipe_features(df_merged, pool, report)
 
-    logging.info("Final dataframe prepared successfully.")
-    
+    processed = []
+    matched = pd.Series(False, index=first_rows.index)
+    no_recipe = None
+    for recipes in _iter_chunks(raw_recipes, memory_budget_mb, chunk_rows):
+        in_chunk = first_rows['recipe_id'].isin(recipes['id'])
+        if in_chunk.any():
+            processed.append(process(first_rows[in_chunk], recipes))
+        matched |= in_chunk
+        no_recipe = recipes.iloc[0:0]
+    if not matched.all() and no_recipe is not None:
+        # interactions on recipes missing from raw_recipes, kept with empty recipe columns
+        processed.append(process(first_rows[~matched], no_recipe))
+    return pd.concat(processed)
 
+
+def finalize_dataframe(processed, report=None):
+    """
+    Last steps of the chunked preprocessing: order of the recipes, outliers and schema.
+
+    Args:
+        processed (DataFrame): output of `process_recipes`, with the '_order' column.
+        report (PipelineReport, optional): measures of the steps. Defaults to None.
+
+    Returns:
+        df_merged (DataFrame): final dataFrame
+    """
+    df_merged = processed.sort_values('_order').drop(columns='_order').reset_index(drop=True)
+
+    # Step 8 : IQR bounds on the numeric columns of all the chunks
+    columns = [col for col in COLUMNS_TO_CHECK_OUTLIERS if col in df_merged.columns]
+    numeric, removed = run_step(report, 'iqr', remove_outliers_iqr_multi, df_merged[columns], columns)
+    df_merged = df_merged.loc[numeric.index]
+    logger.info("Removed outliers from 'nutrition' columns: %s", removed)
+
+    # Step 9 : declared dtypes (categories, smaller integers and floats)
+    return run_step(report, 'schema', apply_schema, df_merged)
+
+
+def prepare_final_dataframe_chunked(raw_interaction, raw_recipes, pp_recipes, memory_budget_mb=256, chunk_rows=None,
+                                    hll_threshold=None, n_jobs=1, report=None):
+    """
+    Same result as `prepare_final_dataframe`, but the raw files are processed by chunks
+    so the full dataset can be used within a bounded amount of memory.
+
+    The interactions are read once to build the metrics of `df_aggregate` (merged across
+    chunks with `PartialAggregate`) and to keep the first interaction of each recipe, which is
+    the row `df_aggregate` keeps. The recipes are then read by chunks and go through the
+    row-wise steps. The IQR bounds of the last step are computed on the numeric columns of
+    all the chunks.
+
+    Args:
+        raw_interaction (str or DataFrame): path to the raw interactions csv or dataFrame
+        raw_recipes (str or DataFrame): path to the raw recipes csv or dataFrame
+        pp_recipes (str or DataFrame): path to the preprocessed recipes csv or dataFrame
+        memory_budget_mb (int, float, optional): memory allowed for one chunk of raw data, in MB. Defaults to 256.
+        chunk_rows (int, optional): number of rows per chunk, overrides the memory budget. Defaults to None.
+        hll_threshold (int, optional): number of users above which the users of a recipe are sketched
+            and 'num_comments' estimated, see DistinctUserCounter. Defaults to None (exact counts).
+        n_jobs (int, optional): worker processes of the row-wise steps, None or -1 for one per core.
+            Defaults to 1 (serial).
+        report (PipelineReport, optional): filled with the measures of each step, the row-wise
+            steps being recorded once per chunk (see PipelineReport.summary). Defaults to None.
+
+    Returns:
+        df_merged (DataFrame): final dataFrame
+    """
+    logger.info("Starting to prepare the final dataframe by chunks (budget %s MB).", memory_budget_mb)
+
+    # Pass 1 : metrics of the interactions and first interaction of each recipe
+    aggregate = PartialAggregate(users=DistinctUserCounter(hll_threshold=hll_threshold))
+    chunks = _iter_chunks(raw_interaction, memory_budget_mb, chunk_rows)
+    aggregate, first_rows = run_step(report, 'aggregate', lambda: aggregate_interactions(chunks, aggregate))
+    first_rows['_order'] = range(len(first_rows))
+    metrics = aggregate.metrics()
+    logger.info("Aggregated the interactions of %s recipes.", len(first_rows))
+
+    if isinstance(pp_recipes, str):
+        pp_recipes = read_pp_recipes(pp_recipes)
+
+    # Pass 2 : row-wise steps on the recipes, chunk by chunk
+    with preprocessing_pool(n_jobs) as pool:
+        processed = process_recipes(first_rows, metrics, raw_recipes, pp_recipes, memory_budget_mb, chunk_rows, pool,
+                                    report)
+    logger.info("Processed the recipes of every chunk.")
+
+    df_merged = finalize_dataframe(processed, report)
+    logger.info("Final dataframe prepared successfully.")
     return df_merged
 
+
+def read_pp_recipes(path):
+    """
+    Read the columns of the preprocessed recipes csv used by the preprocessing.
+    """
+    return pd.read_csv(path, usecols=['id', 'ingredient_ids', 'ingredient_tokens'])
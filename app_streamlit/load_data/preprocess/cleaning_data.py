@@ -2,16 +2,12 @@ import pandas as pd
 import logging
 import copy
 
-logging.basicConfig(
-    filename='logging/debug.log',
-    level=logging.DEBUG,
-    filemode='w',
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+logger = logging.getLogger(__name__)
 
 def outliers_df(dataframe, column, treshold_sup=None, treshold_inf=None, get_info=False):
     """
     Function that returns a list of all outliers in a column depending on the threshold.
+    Works with any index, see `outliers_mask` to filter the rows.
 
     Args:
         dataframe : pandas.DataFrame
@@ -23,54 +19,78 @@ def outliers_df(dataframe, column, treshold_sup=None, treshold_inf=None, get_inf
     Returns:
         outliers: DataFrame or list of outliers based on `get_info`.
     """
-    logging.info("Running outliers_df function")
-    logging.debug(f"Arguments: column={column}, treshold_sup={treshold_sup}, treshold_inf={treshold_inf}, get_info={get_info}")
+    logger.info("Running outliers_df function")
+    logger.debug("Arguments: column=%s, treshold_sup=%s, treshold_inf=%s, get_info=%s",
+                 column, treshold_sup, treshold_inf, get_info)
 
     # Verification of threshold_sup
     if treshold_sup is not None:
         if not isinstance(treshold_sup, (int, float)):
-            logging.error("treshold_sup must be an int or float")
+            logger.error("treshold_sup must be an int or float")
 
     # Verification of threshold_inf
     if treshold_inf is not None:
         if not isinstance(treshold_inf, (int, float)):
-            logging.error("treshold_inf must be an int or float")
+            logger.error("treshold_inf must be an int or float")
+
+    values = dataframe[column]
+    mask_sup = values > treshold_sup if treshold_sup is not None else None
+    mask_inf = values < treshold_inf if treshold_inf is not None else None
 
     if get_info:
         outliers = pd.DataFrame()
-        if treshold_sup is not None and treshold_inf is None:
-            outliers = dataframe.loc[(dataframe[column] > treshold_sup)]
-        if treshold_sup is None and treshold_inf is not None:
-            outliers = dataframe.loc[(dataframe[column] < treshold_inf)]
-        if treshold_sup is not None and treshold_inf is not None:
-            outliers = dataframe.loc[(dataframe[column] > treshold_sup) & (dataframe[column] < treshold_inf)]
-        logging.info(f"Found {len(outliers)} outliers with get_info=True")
+        if mask_sup is not None and mask_inf is None:
+            outliers = dataframe.loc[mask_sup]
+        if mask_sup is None and mask_inf is not None:
+            outliers = dataframe.loc[mask_inf]
+        if mask_sup is not None and mask_inf is not None:
+            # outliers on either side, as outliers_mask
+            outliers = dataframe.loc[mask_sup | mask_inf]
+        logger.info("Found %s outliers with get_info=True", len(outliers))
         return outliers
 
     else:
-        outliers_sup = []
-        outliers_inf = []
-        for i in range(len(dataframe[column])):
-            if treshold_sup is not None:
-                if dataframe[column][i] > treshold_sup:
-                    outliers_sup.append(dataframe[column][i].item())
-            if treshold_inf is not None:
-                if dataframe[column][i] < treshold_inf:
-                    outliers_inf.append(dataframe[column][i].item())
+        outliers_sup = values[mask_sup].tolist() if mask_sup is not None else []
+        outliers_inf = values[mask_inf].tolist() if mask_inf is not None else []
 
         if len(outliers_sup) > 0 and len(outliers_inf) > 0:
-            logging.info(f"Found {len(outliers_sup)} upper outliers and {len(outliers_inf)} lower outliers")
+            logger.info("Found %s upper outliers and %s lower outliers", len(outliers_sup), len(outliers_inf))
             return outliers_sup, outliers_inf
         elif len(outliers_sup) > 0:
-            logging.info(f"Found {len(outliers_sup)} upper outliers")
+            logger.info("Found %s upper outliers", len(outliers_sup))
             return outliers_sup
         elif len(outliers_inf) > 0:
-            logging.info(f"Found {len(outliers_inf)} lower outliers")
+            logger.info("Found %s lower outliers", len(outliers_inf))
             return outliers_inf
         else:
-            logging.info("There are no outliers for this column and this threshold")
+            logger.info("There are no outliers for this column and this threshold")
             return []
 
+def outliers_mask(dataframe, column, treshold_sup=None, treshold_inf=None):
+    """
+    Function that flags the rows whose value is an outlier, in one pass over the column.
+
+    A value is an outlier if it is superior to treshold_sup or inferior to treshold_inf.
+    Works with any index.
+
+    Args:
+        dataframe : pandas.DataFrame
+        column (string) : name of the column
+        treshold_sup (int,float, optional): threshold for the outliers superior to a value. Defaults to None.
+        treshold_inf (int,float, optional): threshold for the outliers inferior to a value. Defaults to None.
+
+    Returns:
+        mask (pd.Series): True for the outliers, aligned on the dataframe.
+    """
+    values = dataframe[column]
+    mask = pd.Series(False, index=dataframe.index)
+    if treshold_sup is not None:
+        mask |= values > treshold_sup
+    if treshold_inf is not None:
+        mask |= values < treshold_inf
+    logger.info("Found %s outliers in column %s", int(mask.sum()), column)
+    return mask
+
 def date_separated(col_name, dataframe):
     """
     This function takes a column with a date in the string format YYYY-MM-DD and returns 
@@ -83,8 +103,8 @@ def date_separated(col_name, dataframe):
     Returns:
         dataframe : DataFrame with additional columns for day, month, and year.
     """
-    logging.info("Running date_separated function")
-    logging.debug(f"Arguments: col_name={col_name}")
+    logger.info("Running date_separated function")
+    logger.debug("Arguments: col_name=%s", col_name)
 
     try:
         df = dataframe.copy()
@@ -94,16 +114,16 @@ def date_separated(col_name, dataframe):
         df['month'] = df[col_name].dt.month
         df['year'] = df[col_name].dt.year
 
-        logging.info("Successfully added day, month, and year columns")
+        logger.info("Successfully added day, month, and year columns")
         return df
 
     except Exception as e:
-        logging.error(f"Error in date_separated: {e}")
+        logger.error("Error in date_separated: %s", e)
         raise
 
 def add_season(df):
     """ Add a season column to the dataset """
-    logging.info("Running add_season function")
+    logger.info("Running add_season function")
 
     def get_season(month):
         if month in [12, 1, 2]:
@@ -117,10 +137,10 @@ def add_season(df):
 
     try:
         df['season'] = df['month'].map(get_season)
-        logging.info("Successfully added season column")
+        logger.info("Successfully added season column")
         return df
     except Exception as e:
-        logging.error(f"Error in add_season: {e}")
+        logger.error("Error in add_season: %s", e)
         raise
 
 def remove_outliers_iqr(df, column):
@@ -131,3 +151,48 @@ def remove_outliers_iqr(df, column):
     upper_bound = q3 + 1.5 * inter
     return df[(df[column] >= lower_bound) & (df[column] <= upper_bound)]
 
+
+def remove_outliers_iqr_multi(df, columns, semantics='sequential'):
+    """
+    Remove the outliers of several columns with the IQR method, with a single filter of the rows.
+
+    Args:
+        df (pd.DataFrame): dataFrame to filter
+        columns (list): columns to check
+        semantics (str, optional): 'sequential' computes the bounds of a column on the rows kept by
+            the previous columns, as successive calls to `remove_outliers_iqr` do. 'joint' computes all
+            the bounds on the whole dataFrame in one quantile call. Defaults to 'sequential'.
+
+    Returns:
+        tuple: the filtered dataFrame and a dict with the number of rows removed by each column
+            (with 'joint', a row out of the bounds of several columns is counted for each of them).
+    """
+    logger.info("Running remove_outliers_iqr_multi function with %s semantics", semantics)
+    if semantics not in ['sequential', 'joint']:
+        logger.error("Invalid semantics: %s", semantics)
+        raise ValueError(f"semantics should be 'sequential' or 'joint', got {semantics}")
+
+    removed = {}
+    if semantics == 'joint':
+        quantiles = df[columns].quantile([0.25, 0.75])
+        q1 = quantiles.loc[0.25].to_numpy()
+        q3 = quantiles.loc[0.75].to_numpy()
+        inter = q3 - q1
+        values = df[columns].to_numpy(dtype=float)
+        in_bounds = (values >= q1 - 1.5 * inter) & (values <= q3 + 1.5 * inter)
+        keep = in_bounds.all(axis=1)
+        removed = dict(zip(columns, (~in_bounds).sum(axis=0).tolist()))
+    else:
+        keep = pd.Series(True, index=df.index)
+        for column in columns:
+            values = df[column]
+            kept_values = values[keep]
+            q1 = kept_values.quantile(0.25)
+            q3 = kept_values.quantile(0.75)
+            inter = q3 - q1
+            in_bounds = (values >= q1 - 1.5 * inter) & (values <= q3 + 1.5 * inter)
+            removed[column] = int((keep & ~in_bounds).sum())
+            keep &= in_bounds
+
+    logger.info("Rows removed by column: %s", removed)
+    return df[keep], removed
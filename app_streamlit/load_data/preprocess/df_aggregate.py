@@ -1,11 +1,9 @@
 import logging 
+import pandas as pd
 
-logging.basicConfig(
-    filename='logging/debug.log',
-    level=logging.DEBUG,
-    filemode='w',
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from load_data.preprocess.distinct_users import DistinctUserCounter
+
+logger = logging.getLogger(__name__)
 
 def df_aggregate(df):
     """
@@ -21,31 +19,113 @@ def df_aggregate(df):
                       and additional metrics.
     """
 
-    logging.info("Running df_aggregate function")
+    logger.info("Running df_aggregate function")
 
     try:
         # Aggregate metrics
-        logging.info("Aggregating metrics for each recipe_id")
+        logger.info("Aggregating metrics for each recipe_id")
         aggregated_metrics = df.groupby('recipe_id').agg(
             num_comments=('user_id', 'nunique'),
             avg_ratings=('rating', 'mean')
         ).reset_index()
 
         # Drop duplicate recipes
-        logging.info("Dropping duplicate rows based on recipe_id")
+        logger.info("Dropping duplicate rows based on recipe_id")
         unique_recipes = df.drop_duplicates(subset=['recipe_id']).reset_index(drop=True)
 
         # Drop 'user_id' and 'rating' columns
-        logging.info("Removing unnecessary columns: 'user_id' and 'rating'")
+        logger.info("Removing unnecessary columns: 'user_id' and 'rating'")
         unique_recipes = unique_recipes.drop(columns=['user_id', 'rating'])
 
         # Merge the metrics with unique recipes
-        logging.info("Merging aggregated metrics with the unique recipes dataframe")
+        logger.info("Merging aggregated metrics with the unique recipes dataframe")
         result = unique_recipes.merge(aggregated_metrics, on='recipe_id', how='left')
 
-        logging.info(f"Successfully aggregated dataframe. Resulting shape: {result.shape}")
+        logger.info("Successfully aggregated dataframe. Resulting shape: %s", result.shape)
         return result
 
     except Exception as e:
-        logging.error(f"Error in df_aggregate: {e}")
+        logger.error("Error in df_aggregate: %s", e)
         raise
+
+
+class PartialAggregate():
+    def __init__(self, rating_stats=None, users=None):
+        """
+        Per-recipe metrics of `df_aggregate` computed on a part of the interactions.
+
+        Partial aggregates of several chunks can be merged, the result being the same
+        as the aggregation of the concatenated chunks.
+
+        Args:
+            rating_stats (pd.DataFrame, optional): 'rating_sum' and 'rating_count' indexed by recipe_id.
+            users (DistinctUserCounter, optional): distinct users of each recipe.
+
+        Returns:
+            None.
+        """
+        if rating_stats is None:
+            rating_stats = pd.DataFrame(
+                {'rating_sum': pd.Series(dtype='float64'), 'rating_count': pd.Series(dtype='int64')},
+                index=pd.Index([], dtype='int64', name='recipe_id'),
+            )
+        if users is None:
+            users = DistinctUserCounter()
+        self.rating_stats = rating_stats
+        self.users = users
+
+    @classmethod
+    def from_interactions(cls, df):
+        """
+        Build the partial aggregate of a chunk of interactions.
+
+        Args:
+            df (pd.DataFrame): interactions with at least 'recipe_id', 'user_id' and 'rating'.
+
+        Returns:
+            PartialAggregate: metrics of the chunk.
+        """
+        rating_stats = df.groupby('recipe_id')['rating'].agg(rating_sum='sum', rating_count='count')
+        pairs = df[['recipe_id', 'user_id']].dropna()
+        users = DistinctUserCounter.from_pairs(pairs['recipe_id'], pairs['user_id'])
+        return cls(rating_stats, users)
+
+    def merge(self, other):
+        """
+        Combine two partial aggregates.
+
+        Args:
+            other (PartialAggregate): aggregate of other interactions.
+
+        Returns:
+            PartialAggregate: aggregate of the interactions of both.
+        """
+        rating_stats = self.rating_stats.add(other.rating_stats, fill_value=0)
+        rating_stats['rating_count'] = rating_stats['rating_count'].astype('int64')
+        return PartialAggregate(rating_stats, self.users.merge(other.users))
+
+    def metrics(self, recipe_ids=None):
+        """
+        Compute the final metrics, as `df_aggregate` does on all the interactions.
+
+        'num_comments' is exact unless the distinct user counter sketches popular recipes.
+
+        Args:
+            recipe_ids (array-like, optional): only compute the metrics of these recipes. Defaults to None (all).
+
+        Returns:
+            pd.DataFrame: 'recipe_id', 'num_comments' and 'avg_ratings', one row per recipe_id.
+        """
+        stats = self.rating_stats
+        if recipe_ids is not None:
+            stats = stats[stats.index.isin(recipe_ids)]
+        num_comments = self.users.counts(recipe_ids)
+        stats = stats.sort_index()
+        avg_ratings = stats['rating_sum'] / stats['rating_count'].where(stats['rating_count'] > 0)
+
+        metrics = pd.DataFrame({
+            'num_comments': num_comments.reindex(stats.index, fill_value=0).astype('int64'),
+            'avg_ratings': avg_ratings,
+        })
+        metrics.index.name = 'recipe_id'
+        return metrics.reset_index()
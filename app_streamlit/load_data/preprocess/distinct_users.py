@@ -0,0 +1,287 @@
+"""Distinct users of each recipe, mergeable across chunks and batches of interactions"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# A (recipe_id, user_id) pair is stored as one int64 key, the recipe_id in the high bits
+USER_BITS = 32
+_USER_MASK = (1 << USER_BITS) - 1
+_MAX_RECIPE_ID = (1 << (63 - USER_BITS)) - 1
+
+DEFAULT_PRECISION = 12
+
+# The keys merged from other counters are deduplicated at once, when they outnumber the keys
+# already deduplicated (and are at least this many), or when the counter is read
+MIN_PENDING_KEYS = 1 << 20
+
+
+def pair_keys(recipe_ids, user_ids):
+    """
+    Sorted distinct keys of (recipe_id, user_id) pairs.
+
+    Args:
+        recipe_ids (array-like): ids of the recipes, non-negative integers.
+        user_ids (array-like): ids of the users, integers between 0 and 2**32 - 1.
+
+    Returns:
+        np.ndarray: int64 keys, sorted and distinct.
+    """
+    recipe_ids = np.asarray(recipe_ids).astype('int64')
+    user_ids = np.asarray(user_ids).astype('int64')
+    if len(user_ids) > 0:
+        if user_ids.min() < 0 or user_ids.max() > _USER_MASK:
+            raise ValueError(f"User ids must be between 0 and {_USER_MASK}")
+        if recipe_ids.min() < 0 or recipe_ids.max() > _MAX_RECIPE_ID:
+            raise ValueError(f"Recipe ids must be between 0 and {_MAX_RECIPE_ID}")
+    return np.unique((recipe_ids << USER_BITS) | user_ids)
+
+
+def _hash(values):
+    """
+    64-bit hash of integers (splitmix64 finalizer).
+    """
+    x = values.astype('uint64')
+    with np.errstate(over='ignore'):
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _bit_length(x):
+    """
+    Number of bits of each unsigned 64-bit integer, 0 for 0.
+    """
+    length = np.zeros(len(x), dtype='int64')
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = x >= np.uint64(1 << shift)
+        x = np.where(high, x >> np.uint64(shift), x)
+        length += high * shift
+    return length + (x > 0)
+
+
+class HyperLogLog():
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        """
+        HyperLogLog sketch of a set of user ids.
+
+        The sketch uses 2**precision bytes and estimates the number of distinct users with a
+        relative standard error of about 1.04 / sqrt(2**precision) (1.6% for precision 12).
+
+        Args:
+            precision (int, optional): number of bits of the hash choosing the register, 7 to 16. Defaults to 12.
+            registers (np.ndarray, optional): registers of a sketch already built. Defaults to None.
+
+        Returns:
+            None.
+        """
+        if not 7 <= precision <= 16:
+            raise ValueError(f"The precision must be between 7 and 16, got {precision}")
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(1 << precision, dtype='uint8')
+
+    def add(self, user_ids):
+        """
+        Add user ids to the sketch.
+        """
+        hashed = _hash(np.asarray(user_ids))
+        index = (hashed >> np.uint64(64 - self.precision)).astype('int64')
+        rest = hashed & np.uint64((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - _bit_length(rest) + 1
+        np.maximum.at(self.registers, index, rank.astype('uint8'))
+        return self
+
+    def merge(self, other):
+        """
+        Sketch of the union of the users of both sketches.
+        """
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge sketches of precision {self.precision} and {other.precision}")
+        return HyperLogLog(self.precision, np.maximum(self.registers, other.registers))
+
+    def count(self):
+        """
+        Estimated number of distinct users.
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.ldexp(1.0, -self.registers.astype('int64')).sum()
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros > 0:
+            # small range correction (linear counting)
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class DistinctUserCounter():
+    def __init__(self, keys=None, sketches=None, hll_threshold=None, precision=DEFAULT_PRECISION):
+        """
+        Distinct users of each recipe, merged across chunks of interactions.
+
+        The users of a recipe are kept exactly, as sorted keys (see `pair_keys`). When
+        `hll_threshold` is set, a recipe with more users moves to a HyperLogLog sketch, so the
+        memory of a very popular recipe is bounded and its count becomes an estimate.
+        Merging counters gives the counter of the union of their interactions.
+
+        Args:
+            keys (np.ndarray, optional): sorted distinct keys of the exact pairs. Defaults to None.
+            sketches (dict, optional): recipe_id -> HyperLogLog of the recipes over the threshold. Defaults to None.
+            hll_threshold (int, optional): number of users above which a recipe is sketched. Defaults to None (exact).
+            precision (int, optional): precision of the sketches. Defaults to 12.
+
+        Returns:
+            None.
+        """
+        self._keys = keys if keys is not None else np.empty(0, dtype='int64')
+        self._pending = []
+        self._pending_size = 0
+        self.sketches = sketches if sketches is not None else {}
+        self.hll_threshold = hll_threshold
+        self.precision = precision
+        self._compact()
+
+    @classmethod
+    def from_pairs(cls, recipe_ids, user_ids, **kwargs):
+        """
+        Counter of the (recipe_id, user_id) pairs of interactions.
+        """
+        return cls(pair_keys(recipe_ids, user_ids), **kwargs)
+
+    @property
+    def keys(self):
+        """
+        Sorted distinct keys of the exact pairs (see `pair_keys`).
+        """
+        self._flush()
+        return self._keys
+
+    @property
+    def exact(self):
+        """
+        True when no recipe is sketched, the counts are then exact.
+        """
+        self._flush()
+        return not self.sketches
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the keys and the sketches.
+        """
+        return (self._keys.nbytes + sum(pending.nbytes for pending in self._pending)
+                + sum(sketch.registers.nbytes for sketch in self.sketches.values()))
+
+    def _flush(self):
+        """
+        Deduplicate the pending keys with the others in one pass, and sketch the recipes over the threshold.
+        """
+        if not self._pending:
+            return
+        self._keys = np.unique(np.concatenate([self._keys] + self._pending))
+        self._pending = []
+        self._pending_size = 0
+        self._compact()
+
+    def _compact(self):
+        """
+        Move the pairs of the sketched recipes, and of the recipes over the threshold, to sketches.
+        """
+        recipes = self._keys >> USER_BITS
+        to_sketch = np.isin(recipes, np.fromiter(self.sketches, dtype='int64', count=len(self.sketches)))
+        if self.hll_threshold is not None and len(recipes) > 0:
+            ids, counts = np.unique(recipes, return_counts=True)
+            to_sketch |= np.isin(recipes, ids[counts > self.hll_threshold])
+        if not to_sketch.any():
+            return
+
+        keys = self._keys[to_sketch]
+        ids, starts = np.unique(keys >> USER_BITS, return_index=True)
+        ends = np.append(starts[1:], len(keys))
+        for recipe_id, start, end in zip(ids.tolist(), starts, ends):
+            sketch = HyperLogLog(self.precision).add(keys[start:end] & _USER_MASK)
+            if recipe_id in self.sketches:
+                sketch = self.sketches[recipe_id].merge(sketch)
+            self.sketches[recipe_id] = sketch
+        self._keys = self._keys[~to_sketch]
+        logger.debug("%s recipes moved to sketches, %s sketched in total", len(ids), len(self.sketches))
+
+    def merge(self, other):
+        """
+        Combine two counters, keeping the threshold and precision of this one.
+
+        The keys of `other` are only collected, they are deduplicated once they outnumber the
+        keys of this counter: merging the counters of N chunks does not sort every key N times.
+
+        Args:
+            other (DistinctUserCounter): counter of other interactions.
+
+        Returns:
+            DistinctUserCounter: counter of the interactions of both.
+        """
+        sketches = dict(self.sketches)
+        for recipe_id, sketch in other.sketches.items():
+            sketches[recipe_id] = sketches[recipe_id].merge(sketch) if recipe_id in sketches else sketch
+
+        merged = DistinctUserCounter(None, sketches, self.hll_threshold, self.precision)
+        merged._keys = self._keys
+        merged._pending = self._pending + [other._keys] + other._pending
+        merged._pending_size = self._pending_size + len(other._keys) + other._pending_size
+        if merged._pending_size >= max(len(merged._keys), MIN_PENDING_KEYS):
+            merged._flush()
+        return merged
+
+    def counts(self, recipe_ids=None):
+        """
+        Number of distinct users of each recipe.
+
+        Args:
+            recipe_ids (array-like, optional): only count the users of these recipes. Defaults to None (all).
+
+        Returns:
+            pd.Series: int64 counts indexed by recipe_id, sorted; estimates for the sketched recipes.
+        """
+        self._flush()
+        recipes = self._keys >> USER_BITS
+        sketched = list(self.sketches)
+        if recipe_ids is not None:
+            wanted = pd.Index(recipe_ids).unique()
+            recipes = recipes[wanted.get_indexer(recipes) >= 0]
+            sketched = [recipe_id for recipe_id in sketched if recipe_id in wanted]
+        ids, counts = np.unique(recipes, return_counts=True)
+        if sketched:
+            ids = np.append(ids, sketched)
+            counts = np.append(counts, [self.sketches[recipe_id].count() for recipe_id in sketched])
+        counts = pd.Series(counts, index=pd.Index(ids, dtype='int64', name='recipe_id'), dtype='int64')
+        return counts.sort_index()
+
+    def to_frames(self):
+        """
+        The keys and sketches as dataFrames, to save them (see `from_frames`).
+
+        Returns:
+            tuple: dataFrame of the 'key' column and dataFrame of the 'recipe_id' and 'registers' (bytes) columns.
+        """
+        keys = pd.DataFrame({'key': self.keys})
+        sketches = pd.DataFrame({
+            'recipe_id': pd.Series(list(self.sketches), dtype='int64'),
+            'registers': pd.Series([sketch.registers.tobytes() for sketch in self.sketches.values()], dtype=object),
+        })
+        return keys, sketches
+
+    @classmethod
+    def from_frames(cls, keys, sketches, hll_threshold=None, precision=DEFAULT_PRECISION):
+        """
+        Counter saved with `to_frames`.
+        """
+        registers = [np.frombuffer(value, dtype='uint8').copy() for value in sketches['registers']]
+        if registers:
+            precision = int(np.log2(len(registers[0])))
+        sketches = {
+            recipe_id: HyperLogLog(precision, value)
+            for recipe_id, value in zip(sketches['recipe_id'].tolist(), registers)
+        }
+        return cls(keys['key'].to_numpy(dtype='int64'), sketches, hll_threshold, precision)
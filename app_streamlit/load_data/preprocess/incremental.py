@@ -0,0 +1,148 @@
+"""Preprocessing of the interactions by batches, without reprocessing the recipes already seen"""
+
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from load_data.preprocess.df_aggregate import PartialAggregate
+from load_data.preprocess.distinct_users import DistinctUserCounter
+from load_data.preprocess.clean_dataframe import _iter_chunks
+from load_data.preprocess.clean_dataframe import aggregate_interactions
+from load_data.preprocess.clean_dataframe import finalize_dataframe
+from load_data.preprocess.clean_dataframe import process_recipes
+from load_data.preprocess.clean_dataframe import read_pp_recipes
+
+logger = logging.getLogger(__name__)
+
+# Files of the state saved by `IncrementalPreprocessing.save`
+STATE_FILES = {
+    'rating_stats': 'rating_stats.parquet',
+    'user_keys': 'user_keys.parquet',
+    'user_sketches': 'user_sketches.parquet',
+    'recipes': 'recipes.parquet',
+}
+
+
+class IncrementalPreprocessing():
+    def __init__(self, raw_recipes, pp_recipes, aggregate=None, recipes=None, memory_budget_mb=256, chunk_rows=None,
+                 hll_threshold=None):
+        """
+        Preprocessing updated with batches of new interactions.
+
+        The state holds the running sums and counts of the interactions (PartialAggregate) and
+        the recipes after the row-wise steps (before the outliers of step 8 are removed). A batch
+        only rewrites 'num_comments' and 'avg_ratings' of the recipes it touches, and runs the
+        row-wise steps on the recipes it adds; the season and nutri-score of the other recipes
+        are kept. The result is the same as `prepare_final_dataframe` on all the interactions.
+
+        Args:
+            raw_recipes (str or DataFrame): path to the raw recipes csv or dataFrame
+            pp_recipes (str or DataFrame): path to the preprocessed recipes csv or dataFrame
+            aggregate (PartialAggregate, optional): metrics of the interactions already processed. Defaults to None.
+            recipes (DataFrame, optional): recipes already processed, with the '_order' column. Defaults to None.
+            memory_budget_mb (int, float, optional): memory allowed for one chunk of raw data, in MB. Defaults to 256.
+            chunk_rows (int, optional): number of rows per chunk, overrides the memory budget. Defaults to None.
+            hll_threshold (int, optional): number of users above which the users of a recipe are
+                sketched, see DistinctUserCounter. Defaults to None (exact counts).
+
+        Returns:
+            None.
+        """
+        self.raw_recipes = raw_recipes
+        self.pp_recipes = read_pp_recipes(pp_recipes) if isinstance(pp_recipes, str) else pp_recipes
+        if aggregate is None:
+            aggregate = PartialAggregate(users=DistinctUserCounter(hll_threshold=hll_threshold))
+        self.aggregate = aggregate
+        self.recipes = recipes
+        self.memory_budget_mb = memory_budget_mb
+        self.chunk_rows = chunk_rows
+
+    def append(self, new_interactions):
+        """
+        Add a batch of interactions.
+
+        Args:
+            new_interactions (str or DataFrame): path to a csv file or dataFrame of new interactions.
+
+        Returns:
+            IncrementalPreprocessing: self, updated.
+        """
+        seen_recipes = self.aggregate.rating_stats.index
+        chunks = _iter_chunks(new_interactions, self.memory_budget_mb, self.chunk_rows)
+        batch, first_rows = aggregate_interactions(chunks, seen_recipes=seen_recipes)
+        self.aggregate = self.aggregate.merge(batch)
+        touched = batch.rating_stats.index
+
+        # recipes already processed: only their metrics change
+        if self.recipes is not None:
+            rows = self.recipes['recipe_id'].isin(touched)
+            if rows.any():
+                metrics = self.aggregate.metrics(self.recipes.loc[rows, 'recipe_id']).set_index('recipe_id')
+                updated = metrics.reindex(self.recipes.loc[rows, 'recipe_id'])
+                self.recipes.loc[rows, 'num_comments'] = updated['num_comments'].to_numpy()
+                self.recipes.loc[rows, 'avg_ratings'] = updated['avg_ratings'].to_numpy()
+            logger.info("Updated the metrics of %s recipes.", rows.sum())
+
+        # new recipes: row-wise steps on their first interaction, after the recipes already seen
+        if len(first_rows) > 0:
+            first_rows['_order'] = range(len(seen_recipes), len(seen_recipes) + len(first_rows))
+            metrics = self.aggregate.metrics(first_rows['recipe_id'])
+            processed = process_recipes(first_rows, metrics, self.raw_recipes, self.pp_recipes,
+                                        self.memory_budget_mb, self.chunk_rows)
+            if self.recipes is None:
+                self.recipes = processed.reset_index(drop=True)
+            else:
+                self.recipes = pd.concat([self.recipes, processed], ignore_index=True)
+            logger.info("Processed %s new recipes.", len(first_rows))
+        return self
+
+    def result(self):
+        """
+        Final dataFrame of all the interactions appended.
+
+        Returns:
+            df_merged (DataFrame): same as `prepare_final_dataframe` on all the interactions.
+        """
+        return finalize_dataframe(self.recipes)
+
+    def save(self, directory):
+        """
+        Save the state in a directory, see STATE_FILES.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.aggregate.rating_stats.reset_index().to_parquet(os.path.join(directory, STATE_FILES['rating_stats']))
+        user_keys, user_sketches = self.aggregate.users.to_frames()
+        user_keys.to_parquet(os.path.join(directory, STATE_FILES['user_keys']), index=False)
+        user_sketches.to_parquet(os.path.join(directory, STATE_FILES['user_sketches']), index=False)
+        self.recipes.to_parquet(os.path.join(directory, STATE_FILES['recipes']), index=False)
+        logger.info("Saved the incremental preprocessing state in %s", directory)
+
+    @classmethod
+    def load(cls, directory, raw_recipes, pp_recipes, hll_threshold=None, **kwargs):
+        """
+        Load a state saved by `save`.
+
+        Args:
+            directory (str): directory of the state.
+            raw_recipes (str or DataFrame): path to the raw recipes csv or dataFrame
+            pp_recipes (str or DataFrame): path to the preprocessed recipes csv or dataFrame
+            hll_threshold (int, optional): see DistinctUserCounter. Defaults to None.
+            **kwargs: memory_budget_mb and chunk_rows.
+
+        Returns:
+            IncrementalPreprocessing: the preprocessing, ready for new batches.
+        """
+        rating_stats = pd.read_parquet(os.path.join(directory, STATE_FILES['rating_stats'])).set_index('recipe_id')
+        users = DistinctUserCounter.from_frames(
+            pd.read_parquet(os.path.join(directory, STATE_FILES['user_keys'])),
+            pd.read_parquet(os.path.join(directory, STATE_FILES['user_sketches'])),
+            hll_threshold,
+        )
+        recipes = pd.read_parquet(os.path.join(directory, STATE_FILES['recipes']))
+        # parquet gives None for the missing values of object columns, the preprocessing gives NaN
+        for col in recipes.columns[recipes.dtypes == object]:
+            recipes[col] = recipes[col].where(recipes[col].notna(), np.nan)
+        aggregate = PartialAggregate(rating_stats, users)
+        return cls(raw_recipes, pp_recipes, aggregate=aggregate, recipes=recipes, **kwargs)
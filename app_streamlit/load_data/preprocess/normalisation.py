@@ -2,12 +2,7 @@ import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 import logging
 
-logging.basicConfig(
-    filename='logging/debug.log',
-    level=logging.DEBUG,
-    filemode='w',
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+logger = logging.getLogger(__name__)
 
 def normalisation (df,column_name):
     """
@@ -20,22 +15,22 @@ def normalisation (df,column_name):
     Returns:
         df (pd.DataFrame): DataFrame with an additional column containing the normalized values.
     """
-    logging.info("Running normalisation function")
-    logging.debug(f"Arguments: column_name={column_name}")
+    logger.info("Running normalisation function")
+    logger.debug("Arguments: column_name=%s", column_name)
 
     # Check if the column is numeric
     if not pd.api.types.is_numeric_dtype(df[column_name]):
-        logging.error(f"Column '{column_name}' is not numeric. Normalization cannot proceed.")
+        logger.error("Column '%s' is not numeric. Normalization cannot proceed.", column_name)
         raise TypeError('The column must be numeric for normalization.')
 
     try:
         # Apply MinMaxScaler to normalize the column
-        logging.info(f"Normalizing column: {column_name}")
+        logger.info("Normalizing column: %s", column_name)
         scaler = MinMaxScaler()
         df[[column_name + '_normalised']] = scaler.fit_transform(df[[column_name]])
-        logging.info(f"Successfully normalized column '{column_name}'. Added new column '{column_name}_normalised'.")
+        logger.info("Successfully normalized column '%s'. Added new column '%s_normalised'.", column_name, column_name)
         return df
 
     except Exception as e:
-        logging.error(f"Error during normalization: {e}")
+        logger.error("Error during normalization: %s", e)
         raise
@@ -0,0 +1,227 @@
+"""Optional parallel execution of the row-wise steps of the preprocessing, with a process pool"""
+
+import contextlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from load_data.list_columns import list_column_to_matrix
+from load_data.preprocess.cleaning_data import date_separated
+from load_data.schema import NUTRITION_COLS
+from analyse.utils import NUTRI_SCORE_GRADES, nutri_score_batch
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_n_jobs(n_jobs):
+    """
+    Number of worker processes: None or -1 for one per core.
+    """
+    if n_jobs is None or n_jobs == -1:
+        return os.cpu_count() or 1
+    if n_jobs < 1:
+        raise ValueError(f"n_jobs should be a positive number of workers, None or -1, got {n_jobs}")
+    return n_jobs
+
+
+class SharedArray():
+    def __init__(self, shape, dtype, data=None):
+        """
+        Numpy array in a shared memory block, read and written by the workers without copies.
+
+        Args:
+            shape (tuple): shape of the array.
+            dtype (str or np.dtype): type of the values.
+            data (np.ndarray, optional): values copied in the array. Defaults to None (zeros).
+
+        Returns:
+            None.
+        """
+        dtype = np.dtype(dtype)
+        size = max(1, int(np.prod(shape)) * dtype.itemsize)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+        if data is not None:
+            self.array[...] = data
+        else:
+            self.array[...] = 0
+
+    @property
+    def spec(self):
+        """
+        What a worker needs to attach the array: name of the block, shape and dtype.
+        """
+        return self.shm.name, self.array.shape, self.array.dtype.str
+
+    def release(self):
+        """
+        Copy the values out of the block, then free it.
+        """
+        values = self.array.copy()
+        del self.array
+        self.shm.close()
+        self.shm.unlink()
+        return values
+
+
+def _run_on_block(task, specs, start, end, *args):
+    """
+    Worker side: attach the shared arrays and run a task on the rows start to end.
+    """
+    blocks = [shared_memory.SharedMemory(name=name) for name, _, _ in specs]
+    arrays = [np.ndarray(shape, dtype=dtype, buffer=block.buf) for block, (_, shape, dtype) in zip(blocks, specs)]
+    try:
+        task(arrays, start, end, *args)
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+def _dates_task(arrays, start, end, date_format):
+    """
+    Parse the dates of a block: datetime (ns), day, month and year (NaN for the missing dates).
+    """
+    strings, datetimes, day, month, year = arrays
+    parsed = pd.to_datetime(pd.Series(strings[start:end].astype('U')), format=date_format)
+    datetimes[start:end] = parsed.to_numpy().view('int64')
+    day[start:end] = parsed.dt.day.to_numpy()
+    month[start:end] = parsed.dt.month.to_numpy()
+    year[start:end] = parsed.dt.year.to_numpy()
+
+
+def _nutrition_task(arrays, start, end, nutrition):
+    """
+    Parse the nutrition lists of a block and compute their nutri-score.
+    """
+    matrix, codes = arrays
+    matrix[start:end] = list_column_to_matrix(nutrition, 'float', len(NUTRITION_COLS))
+    grades = nutri_score_batch(pd.DataFrame(matrix[start:end], columns=NUTRITION_COLS))
+    codes[start:end] = grades.cat.codes.to_numpy()
+
+
+class PreprocessingPool():
+    def __init__(self, n_jobs=None):
+        """
+        Process pool running the row-wise steps of the preprocessing by blocks of rows.
+
+        The columns go to the workers through shared memory blocks (the text columns the
+        workers parse are sent with each block), and each worker writes the rows of its
+        block in shared output arrays, so the result does not depend on the order in which
+        the blocks finish and is identical to the serial steps.
+
+        Args:
+            n_jobs (int, optional): number of worker processes, None or -1 for one per core. Defaults to None.
+
+        Returns:
+            None.
+        """
+        self.n_jobs = resolve_n_jobs(n_jobs)
+        self.executor = None
+
+    def __enter__(self):
+        self.executor = ProcessPoolExecutor(max_workers=self.n_jobs)
+        logger.info("Preprocessing pool started with %s workers", self.n_jobs)
+        return self
+
+    def __exit__(self, *exc):
+        self.executor.shutdown()
+        self.executor = None
+
+    def _blocks(self, n_rows):
+        """
+        Bounds of contiguous blocks of rows, one per worker.
+        """
+        bounds = np.linspace(0, n_rows, min(self.n_jobs, max(n_rows, 1)) + 1).astype(int)
+        return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+    def _run(self, task, shared, block_args=None, args=()):
+        """
+        Run a task on every block of rows and wait for all of them.
+        """
+        specs = [array.spec for array in shared]
+        n_rows = shared[0].array.shape[0]
+        futures = []
+        for start, end in self._blocks(n_rows):
+            extra = (block_args(start, end),) if block_args is not None else ()
+            futures.append(self.executor.submit(_run_on_block, task, specs, start, end, *(args + extra)))
+        for future in futures:
+            future.result()
+
+    def date_separated(self, col_name, dataframe):
+        """
+        Parallel `date_separated`: same columns and values.
+
+        The format of the dates is inferred from the first one, as pandas does. Columns
+        whose format cannot be inferred are separated by `date_separated` itself.
+        """
+        values = dataframe[col_name]
+        missing = values.isna().to_numpy()
+        first = values[~missing].iloc[0] if not missing.all() else None
+        date_format = guess_datetime_format(first) if isinstance(first, str) else None
+        if date_format is None:
+            return date_separated(col_name, dataframe)
+        try:
+            strings = np.asarray(values.where(~missing, '').to_numpy(dtype=str), dtype='S')
+        except UnicodeEncodeError:
+            return date_separated(col_name, dataframe)
+
+        n_rows = len(values)
+        shared = [
+            SharedArray(strings.shape, strings.dtype, strings),
+            SharedArray((n_rows,), 'int64'),
+            SharedArray((n_rows,), 'float64'),
+            SharedArray((n_rows,), 'float64'),
+            SharedArray((n_rows,), 'float64'),
+        ]
+        try:
+            self._run(_dates_task, shared, args=(date_format,))
+        finally:
+            strings, datetimes, day, month, year = [array.release() for array in shared]
+
+        if not missing.any():
+            # without missing dates pandas gives integer parts
+            day, month, year = day.astype('int32'), month.astype('int32'), year.astype('int32')
+        df = dataframe.copy()
+        df[col_name] = datetimes.view('datetime64[ns]')
+        df['day'] = day
+        df['month'] = month
+        df['year'] = year
+        logger.info("Separated '%s' with %s workers", col_name, self.n_jobs)
+        return df
+
+    def nutrition(self, series):
+        """
+        Parallel parsing of the nutrition lists and nutri-score.
+
+        Args:
+            series (pd.Series): 'nutrition' column, lists or strings.
+
+        Returns:
+            tuple: matrix of the nutrients (one column per NUTRITION_COLS) and the nutri-score
+                grades (pd.Series aligned on series), as `list_column_to_matrix` and `nutri_score_batch` give.
+        """
+        n_rows = len(series)
+        shared = [SharedArray((n_rows, len(NUTRITION_COLS)), 'float64'), SharedArray((n_rows,), 'int8')]
+        try:
+            self._run(_nutrition_task, shared, block_args=lambda start, end: series.iloc[start:end])
+        finally:
+            matrix, codes = [array.release() for array in shared]
+
+        grades = pd.Categorical.from_codes(codes, categories=NUTRI_SCORE_GRADES, ordered=True)
+        logger.info("Parsed the nutrition of %s rows with %s workers", n_rows, self.n_jobs)
+        return matrix, pd.Series(grades, index=series.index, name='nutri_score')
+
+
+def preprocessing_pool(n_jobs):
+    """
+    Context manager giving a PreprocessingPool, or None for the serial steps when n_jobs is 1.
+    """
+    if n_jobs == 1:
+        return contextlib.nullcontext()
+    return PreprocessingPool(n_jobs)
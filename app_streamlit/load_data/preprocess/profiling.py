@@ -0,0 +1,156 @@
+"""Timing, row counts and memory of each step of the preprocessing"""
+
+import json
+import logging
+import sys
+import time
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+REPORT_COLUMNS = ['step', 'wall_s', 'cpu_s', 'rows_in', 'rows_out', 'peak_rss_delta_bytes']
+
+
+def _peak_rss():
+    """
+    Peak resident memory of the process in bytes, None where it is not available.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _rows(value):
+    """
+    Number of rows of a step input or output: a dataFrame, or the first item of a tuple.
+    """
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    return None
+
+
+def _sum_or_na(values):
+    """
+    Sum of a column of measures, <NA> if none was measured.
+    """
+    return values.sum(min_count=1)
+
+
+class PipelineReport():
+    def __init__(self):
+        """
+        Measures of the steps of a preprocessing run, filled by `run_step`.
+
+        Each step records its wall and CPU time, the rows of its input and output and the
+        growth of the peak resident memory of the process while it ran (0 when the step
+        stays under the previous peak). The chunked preprocessing records a step once per
+        chunk, see `summary`.
+
+        Returns:
+            None.
+        """
+        self.steps = []
+
+    def measure(self, name, func, *args, **kwargs):
+        """
+        Run a step and record its measures.
+
+        Args:
+            name (str): name of the step.
+            func (callable): the step, its first argument is the dataFrame it processes.
+            *args, **kwargs: arguments of the step.
+
+        Returns:
+            the result of func.
+        """
+        rss_before = _peak_rss()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        result = func(*args, **kwargs)
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+        rss_after = _peak_rss()
+
+        record = {
+            'step': name,
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'rows_in': _rows(args[0]) if args else None,
+            'rows_out': _rows(result),
+            'peak_rss_delta_bytes': rss_after - rss_before if rss_before is not None else None,
+        }
+        self.steps.append(record)
+        logger.info("Step '%s': %.3f s wall, %.3f s CPU, rows %s -> %s",
+                    name, wall, cpu, record['rows_in'], record['rows_out'])
+        return result
+
+    def to_frame(self):
+        """
+        One row per step run, in order, missing measures as <NA>.
+        """
+        frame = pd.DataFrame(self.steps, columns=REPORT_COLUMNS)
+        return frame.astype({'rows_in': 'Int64', 'rows_out': 'Int64', 'peak_rss_delta_bytes': 'Int64'})
+
+    def summary(self):
+        """
+        One row per step: times, rows and memory summed over its runs, in order of first run.
+        """
+        frame = self.to_frame()
+        summary = frame.groupby('step', sort=False).agg(
+            runs=('step', 'size'),
+            wall_s=('wall_s', 'sum'),
+            cpu_s=('cpu_s', 'sum'),
+            rows_in=('rows_in', _sum_or_na),
+            rows_out=('rows_out', _sum_or_na),
+            peak_rss_delta_bytes=('peak_rss_delta_bytes', _sum_or_na),
+        )
+        return summary.reset_index()
+
+    def to_json(self, path=None):
+        """
+        The report as JSON: the steps and the total times.
+
+        Args:
+            path (str, optional): file written with the report. Defaults to None.
+
+        Returns:
+            str: the JSON document.
+        """
+        document = json.dumps({
+            'steps': self.steps,
+            'total_wall_s': sum(step['wall_s'] for step in self.steps),
+            'total_cpu_s': sum(step['cpu_s'] for step in self.steps),
+        }, indent=2)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(document)
+            logger.info("Pipeline report written to %s", path)
+        return document
+
+
+def run_step(report, name, func, *args, **kwargs):
+    """
+    Run a step of the preprocessing, measured when a report is given.
+
+    Args:
+        report (PipelineReport or None): report of the run.
+        name (str): name of the step.
+        func (callable): the step.
+        *args, **kwargs: arguments of the step.
+
+    Returns:
+        the result of func.
+    """
+    if report is None:
+        return func(*args, **kwargs)
+    return report.measure(name, func, *args, **kwargs)
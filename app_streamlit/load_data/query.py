@@ -0,0 +1,214 @@
+"""Lazy queries over the cleaned dataset, pushed down into the parquet cache when reading from it"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from load_data.columnar_cache import table_to_pandas
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = ('==', '!=', '<', '<=', '>', '>=', 'in', 'not in', 'notna', 'isna')
+
+
+def _arrow_condition(column, op, value):
+    """
+    Filter of the parquet reader for one condition.
+    """
+    field = pc.field(column)
+    if op == '==':
+        return field == value
+    if op == '!=':
+        return field != value
+    if op == '<':
+        return field < value
+    if op == '<=':
+        return field <= value
+    if op == '>':
+        return field > value
+    if op == '>=':
+        return field >= value
+    if op == 'in':
+        return field.isin(list(value))
+    if op == 'not in':
+        return ~field.isin(list(value))
+    if op == 'notna':
+        return field.is_valid()
+    return field.is_null()
+
+
+def _pandas_condition(series, op, value):
+    """
+    Mask of the rows of a column satisfying one condition, missing values never match
+    except with 'isna' (as in the parquet reader).
+    """
+    if op == 'notna':
+        return series.notna().to_numpy()
+    if op == 'isna':
+        return series.isna().to_numpy()
+    if op == 'in':
+        mask = series.isin(list(value))
+    elif op == 'not in':
+        mask = ~series.isin(list(value))
+    elif op == '==':
+        mask = series == value
+    elif op == '!=':
+        mask = series != value
+    elif op == '<':
+        mask = series < value
+    elif op == '<=':
+        mask = series <= value
+    elif op == '>':
+        mask = series > value
+    else:
+        mask = series >= value
+    return (mask & series.notna()).to_numpy(dtype=bool, na_value=False)
+
+
+class DatasetQuery():
+    def __init__(self, source, filters=(), columns=None):
+        """
+        Lazy query over the cleaned dataset: filters and columns are only applied when the
+        result is asked for (`collect`, `count`, `group_count`, `top`).
+
+        On a parquet file (the cache of load_data.columnar_cache) the columns are pruned and
+        the filters are given to the reader, which skips the row groups whose statistics
+        exclude them. On a dataFrame only the columns of the result are copied.
+
+        Args:
+            source (str or pd.DataFrame): path of a parquet file, or dataFrame in memory.
+            filters (tuple, optional): (column, operator, value) conditions, all of them must hold. Defaults to ().
+            columns (list, optional): columns of the result. Defaults to None (all the columns).
+
+        Returns:
+            None.
+        """
+        self.source = source
+        self.filters = tuple(filters)
+        self.columns = list(columns) if columns is not None else None
+
+    @property
+    def in_memory(self):
+        return isinstance(self.source, pd.DataFrame)
+
+    def source_columns(self):
+        """
+        Columns of the dataset the query reads from.
+        """
+        if self.in_memory:
+            return list(self.source.columns)
+        return pq.read_schema(self.source).names
+
+    def filter(self, column, op, value=None):
+        """
+        Query keeping the rows where `column op value` holds, see OPERATORS.
+
+        Args:
+            column (str): column of the condition.
+            op (str): one of OPERATORS, 'notna' and 'isna' take no value.
+            value (optional): value compared, a list for 'in' and 'not in'.
+
+        Returns:
+            DatasetQuery: the new query.
+        """
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator '{op}', expected one of {OPERATORS}")
+        return DatasetQuery(self.source, self.filters + ((column, op, value),), self.columns)
+
+    def select(self, columns):
+        """
+        Query keeping only some columns.
+
+        Args:
+            columns (list): columns of the result.
+
+        Returns:
+            DatasetQuery: the new query.
+        """
+        columns = list(columns)
+        if self.columns is not None:
+            missing = [col for col in columns if col not in self.columns]
+            if missing:
+                raise KeyError(f"Columns {missing} are not selected by the query")
+        return DatasetQuery(self.source, self.filters, columns)
+
+    def _read(self, columns):
+        """
+        Rows satisfying the filters, with the given columns (None for all).
+        """
+        available = self.source_columns()
+        needed = (columns or []) + [column for column, _, _ in self.filters]
+        missing = sorted(set(needed) - set(available))
+        if missing:
+            raise KeyError(f"Columns {missing} are not in the dataset")
+
+        if not self.in_memory:
+            expression = None
+            for condition in self.filters:
+                condition = _arrow_condition(*condition)
+                expression = condition if expression is None else expression & condition
+            table = pq.read_table(self.source, columns=columns, filters=expression)
+            logger.debug("Query read %s rows and %s columns of %s", table.num_rows, table.num_columns, self.source)
+            return table_to_pandas(table)
+
+        df = self.source
+        mask = np.ones(len(df), dtype=bool)
+        for column, op, value in self.filters:
+            mask &= _pandas_condition(df[column], op, value)
+        if columns is None:
+            return df[mask] if self.filters else df
+        return df.loc[mask, columns] if self.filters else df[columns]
+
+    def collect(self):
+        """
+        Run the query.
+
+        Returns:
+            pd.DataFrame: the rows and columns selected. The index of the dataFrame is kept in
+                memory, the rows read from a parquet file get a new range index.
+        """
+        return self._read(self.columns)
+
+    def count(self):
+        """
+        Number of rows satisfying the filters, only the columns of the filters are read.
+        """
+        columns = list(dict.fromkeys(column for column, _, _ in self.filters)) or self.source_columns()[:1]
+        return len(self._read(columns))
+
+    def group_count(self, by):
+        """
+        Number of rows of each group, only the groups present are kept.
+
+        Args:
+            by (str or list): column(s) to group by.
+
+        Returns:
+            pd.DataFrame: the group columns and a 'count' column.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        df = self._read(by)
+        return df.groupby(by, observed=True).size().reset_index(name='count')
+
+    def top(self, n, by, ascending=False):
+        """
+        First rows of the result sorted by some columns.
+
+        Args:
+            n (int): number of rows.
+            by (str or list): column(s) to sort by.
+            ascending (bool or list, optional): order of the sort. Defaults to False.
+
+        Returns:
+            pd.DataFrame: the n first rows, with the selected columns.
+        """
+        by_columns = [by] if isinstance(by, str) else list(by)
+        columns = None
+        if self.columns is not None:
+            columns = self.columns + [col for col in by_columns if col not in self.columns]
+        df = self._read(columns)
+        df = df.sort_values(by=by, ascending=ascending).head(n)
+        return df if self.columns is None else df[self.columns]
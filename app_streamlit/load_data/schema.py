@@ -0,0 +1,142 @@
+"""Declared dtypes of the cleaned dataset (output of the preprocessing, input of the app)"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from analyse.ingredients import SEASONS
+from analyse.utils import MINUTES_CATEGORIES, NUTRI_SCORE_GRADES
+
+logger = logging.getLogger(__name__)
+
+NUTRITION_COLS = ['Calories', 'Total Fat', 'Sugar', 'Sodium', 'Protein', 'Saturated Fat', 'Carbohydrates']
+
+# Columns with a few distinct values: categories and whether they are ordered
+CATEGORICAL_COLUMNS = {
+    'season': (SEASONS, False),
+    'nutri_score': (NUTRI_SCORE_GRADES, True),
+    'minutes_tr': (MINUTES_CATEGORIES, True),
+}
+
+# Integer columns stored on fewer bytes
+INTEGER_COLUMNS = {
+    'minutes': 'int32',
+    'n_steps': 'int16',
+    'n_ingredients': 'int16',
+    'month': 'int8',
+    'year': 'int16',
+}
+
+FLOAT_COLUMNS = {col: 'float32' for col in NUTRITION_COLS}
+
+# Text columns with one value per recipe, stored in Arrow string arrays
+STRING_COLUMNS = ['name']
+
+ARROW_STRING = pd.StringDtype('pyarrow')
+
+
+def _fits(series, dtype):
+    """
+    Check whether the values of an integer column can be stored in a smaller integer type.
+    """
+    if series.isna().any() or not pd.api.types.is_integer_dtype(series.dtype):
+        return False
+    if len(series) == 0:
+        return True
+    info = np.iinfo(dtype)
+    return info.min <= series.min() and series.max() <= info.max
+
+
+def _categorical_dtypes(df):
+    """
+    Declared dtypes of the categorical columns to convert, values outside the categories become missing.
+    """
+    dtypes = {}
+    for col, (categories, ordered) in CATEGORICAL_COLUMNS.items():
+        if col in df.columns:
+            dtype = pd.CategoricalDtype(categories, ordered=ordered)
+            if df[col].dtype != dtype:
+                unknown = set(df[col].dropna().unique()) - set(categories)
+                if unknown:
+                    logger.warning("Values of '%s' not in the schema become missing: %s", col, sorted(map(str, unknown)))
+                dtypes[col] = dtype
+    return dtypes
+
+
+def _integer_dtypes(df):
+    """
+    Declared dtypes of the integer columns to convert, a column whose values do not fit is kept.
+    """
+    dtypes = {}
+    for col, dtype in INTEGER_COLUMNS.items():
+        if col in df.columns and df[col].dtype != dtype:
+            if _fits(df[col], dtype):
+                dtypes[col] = dtype
+            else:
+                logger.warning("Column '%s' kept as %s, its values do not fit in %s", col, df[col].dtype, dtype)
+    return dtypes
+
+
+def _float_dtypes(df):
+    """
+    Declared dtypes of the float columns to convert.
+    """
+    return {col: dtype for col, dtype in FLOAT_COLUMNS.items() if col in df.columns and df[col].dtype != dtype}
+
+
+def _string_dtypes(df):
+    """
+    Arrow string dtype of the text columns to convert, held as python objects or other strings.
+    """
+    return {
+        col: ARROW_STRING for col in STRING_COLUMNS
+        if col in df.columns and df[col].dtype != ARROW_STRING
+        and (df[col].dtype == object or isinstance(df[col].dtype, pd.StringDtype))
+    }
+
+
+def apply_schema(df):
+    """
+    Convert the columns of the cleaned dataset to their declared dtypes.
+
+    Columns missing from the dataFrame are skipped. An integer column holding missing values
+    or values too large for its declared type keeps its dtype, with a warning.
+
+    Args:
+        df (pd.DataFrame): cleaned dataset.
+
+    Returns:
+        pd.DataFrame: the dataset with the declared dtypes.
+    """
+    dtypes = {}
+    for kind_dtypes in (_categorical_dtypes, _integer_dtypes, _float_dtypes, _string_dtypes):
+        dtypes.update(kind_dtypes(df))
+
+    if not dtypes:
+        return df
+    logger.info("Schema applied to the columns %s", list(dtypes))
+    return df.astype(dtypes)
+
+
+def memory_report(before, after):
+    """
+    Memory used by each column before and after applying the schema.
+
+    Args:
+        before (pd.DataFrame): dataset before `apply_schema`.
+        after (pd.DataFrame): dataset after `apply_schema`.
+
+    Returns:
+        pd.DataFrame: dtypes and bytes of each column, with a 'total' row.
+    """
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'dtype_after': after.dtypes.astype(str),
+        'bytes_before': before.memory_usage(index=False, deep=True),
+        'bytes_after': after.memory_usage(index=False, deep=True),
+    })
+    report.loc['total'] = ['', '', report['bytes_before'].sum(), report['bytes_after'].sum()]
+    report['bytes_before'] = report['bytes_before'].astype('int64')
+    report['bytes_after'] = report['bytes_after'].astype('int64')
+    return report
@@ -0,0 +1,133 @@
+"""Process-wide, read-only store of the dataset shared by every streamlit session"""
+
+import logging
+from functools import cached_property
+
+import pandas as pd
+
+from load_data.LoadData import DataFrameLoadder
+from analyse.ingredients import IngredientLookup, SeasonalIngredientCounts
+from analyse.memo import ANALYSIS_MEMO, set_dataset_version, shares_data
+from analyse.derived import clear_derived, register_dataset
+from analyse.contributor_index import ContributorIndex, sort_by_contributor
+from load_data.contributor_summary import build_contributor_summary
+from load_data.query import DatasetQuery
+
+logger = logging.getLogger(__name__)
+
+
+class SharedDataset():
+    def __init__(self, clean_df, df_ingr_map, version=None, contributor_summary=None):
+        """
+        Dataset loaded once per process and shared by all the sessions.
+
+        The frames held here must never be modified: pages get views through
+        `view()`, which rely on pandas copy-on-write so that a page writing into
+        its frame only copies the columns it touches.
+
+        Args:
+            clean_df (pd.DataFrame): preprocessed recipes.
+            df_ingr_map (pd.DataFrame): mapping of the ingredient ids to their names.
+            version (str, optional): fingerprint of the data (hash of the source csv).
+            contributor_summary (pd.DataFrame, optional): summary of the contributors, built from clean_df if None.
+
+        Returns:
+            None.
+        """
+        # sorted by contributor, so the recipes of a contributor are a slice of the frame
+        clean_df = sort_by_contributor(clean_df)
+        self.clean_df = clean_df
+        if version is not None:
+            # the version follows the views of the frame, the analysis results and the
+            # derived columns are computed once per version
+            register_dataset(set_dataset_version(clean_df, version))
+        self.df_ingr_map = df_ingr_map
+        self.ingredients = IngredientLookup(df_ingr_map)
+        self.contributor_index = ContributorIndex(clean_df)
+        if contributor_summary is None:
+            contributor_summary = build_contributor_summary(clean_df)
+        self.contributor_summary = contributor_summary
+        if version is not None:
+            set_dataset_version(contributor_summary, version)
+        self.version = version
+        self.nbytes = int(clean_df.memory_usage(deep=True).sum() + df_ingr_map.memory_usage(deep=True).sum()
+                          + self.ingredients.codes.nbytes + self.contributor_index.offsets.nbytes
+                          + self.contributor_index.contributors.nbytes
+                          + contributor_summary.memory_usage(deep=True).sum())
+        logger.info("Shared dataset %s holds %s bytes", version, self.nbytes)
+
+    @cached_property
+    def seasonal_ingredients(self):
+        """
+        Season x ingredient counts of the dataset, computed on first use.
+
+        Returns:
+            SeasonalIngredientCounts: counts for any number of top ingredients.
+        """
+        return SeasonalIngredientCounts(self.clean_df, self.ingredients)
+
+    def query(self):
+        """
+        Lazy query over the shared recipes, only the columns selected are copied.
+
+        Returns:
+            DatasetQuery: query selecting the whole dataset.
+        """
+        return DatasetQuery(self.clean_df)
+
+    def view(self):
+        """
+        Return a view of the recipes dataframe for a session.
+
+        Returns:
+            pd.DataFrame: shallow copy of the shared dataframe.
+        """
+        if not pd.get_option('mode.copy_on_write'):
+            logger.warning("Copy-on-write is disabled, pages writing in their view will modify the shared dataset")
+        return self.clean_df.copy(deep=False)
+
+    def overlay_nbytes(self, view):
+        """
+        Count the bytes a session holds on top of the shared store.
+
+        These are the columns added to the view or copied because a page wrote into them.
+
+        Args:
+            view (pd.DataFrame): view returned by `view()`.
+
+        Returns:
+            int: number of bytes owned by the view only.
+        """
+        nbytes = 0
+        for col in view.columns:
+            series = view[col]
+            if col in self.clean_df.columns and shares_data(series, self.clean_df[col]):
+                continue
+            nbytes += int(series.memory_usage(index=False, deep=True))
+        return nbytes
+
+
+def load_shared_dataset(data_path, map_path, progress=None):
+    """
+    Load the dataset and the ingredient map in a SharedDataset.
+
+    Args:
+        data_path (str): path to df_preprocess.csv.
+        map_path (str): path to ingr_map.pkl.
+        progress (callable, optional): called with 'parse' then 'index' when these steps start. Defaults to None.
+
+    Returns:
+        SharedDataset: the loaded store.
+    """
+    progress = progress or (lambda stage: None)
+    progress('parse')
+    loader = DataFrameLoadder(path_raw_interaction=data_path)
+    clean_df = loader.load()
+    logger.info("Dataset loaded for the process (cache %s)", loader.cache_status)
+    df_ingr_map = pd.read_pickle(map_path)
+    # results and derived columns of a previous load are not valid anymore
+    ANALYSIS_MEMO.invalidate()
+    clear_derived()
+    progress('index')
+    return SharedDataset(clean_df, df_ingr_map, version=loader.source_hash,
+                         contributor_summary=loader.contributor_summary())
@@ -0,0 +1,83 @@
+"""Logging configuration of the app, set up once by the entry points (app, tests, benchmarks)"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Environment variables overriding the defaults of configure_logging
+LEVEL_ENV = 'APP_LOG_LEVEL'
+FILE_ENV = 'APP_LOG_FILE'
+QUEUE_ENV = 'APP_LOG_QUEUE'
+
+DEFAULT_LEVEL = 'WARNING'
+
+_listener = None
+
+
+def _stop_listener():
+    # writes the records still queued, then closes the handlers the listener writes to
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def configure_logging(level=None, filename=None, use_queue=None, force=False):
+    """
+    Configure the root logger, the modules log through `logging.getLogger(__name__)`.
+
+    Only the first call configures the logging, unless force is True. The modules log with
+    lazy %-style arguments, so below the configured level a call costs a level check: the
+    messages and the dataFrames they show are never formatted.
+
+    Args:
+        level (str or int, optional): level of the root logger. Defaults to APP_LOG_LEVEL, or WARNING.
+        filename (str, optional): file the records are appended to, its folder is created. Defaults to
+            APP_LOG_FILE, or the standard error.
+        use_queue (bool, optional): hand the records to a queue, written by a background thread, so the
+            callers never wait on the file. Defaults to APP_LOG_QUEUE ('1' to enable), or False.
+        force (bool, optional): replace a previous configuration. Defaults to False.
+
+    Returns:
+        logging.Logger: the root logger.
+    """
+    root = logging.getLogger()
+    if getattr(root, '_app_configured', False) and not force:
+        return root
+
+    level = level or os.environ.get(LEVEL_ENV, DEFAULT_LEVEL)
+    filename = filename or os.environ.get(FILE_ENV)
+    if use_queue is None:
+        use_queue = os.environ.get(QUEUE_ENV) == '1'
+
+    _stop_listener()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+    if filename:
+        folder = os.path.dirname(os.path.abspath(filename))
+        os.makedirs(folder, exist_ok=True)
+        handler = logging.FileHandler(filename)
+    else:
+        handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    if use_queue:
+        global _listener
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_stop_listener)
+        handler = logging.handlers.QueueHandler(records)
+
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    root._app_configured = True
+    return root
@@ -4,21 +4,99 @@ from menu_page import display_menu_page
 from contributors_page import display_contributors_page
 from recipes_page import display_recipes_page
 from profile_page import display_profile_page
-from load_data.LoadData import DataFrameLoadder
+from load_data.bootstrap import DataSource, DatasetBootstrap
+from log_config import configure_logging
+from analyse.memo import ANALYSIS_MEMO
+from analyse.derived import derived_nbytes
+from analyse.plots import WORDCLOUD_CACHE
 import os
-import zipfile
-import gdown
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DATA_PATH = os.path.join(BASE_DIR, "data_files", "df_preprocess.csv")
+MAP_PATH = os.path.join(BASE_DIR, "data_files", "ingr_map.pkl")
 
 
 # Wrapper functions for pages
 def display_recipes_page_wrapper():
-    display_recipes_page(st.session_state.clean_df, st.session_state.df_ingr_map) 
+    require_dataset()
+    display_recipes_page(st.session_state.clean_df, st.session_state.ingredients,
+                         st.session_state.seasonal_ingredients) 
 
 def display_profile_page_wrapper():
-    display_profile_page(st.session_state.clean_df)
+    require_dataset()
+    display_profile_page(st.session_state.clean_df, contributor_index=st.session_state.contributor_index,
+                         contributor_summary=st.session_state.contributor_summary)
 
 def display_contributors_page_wrapper():
-    display_contributors_page(st.session_state.clean_df, st.session_state.df_ingr_map)
+    require_dataset()
+    display_contributors_page(st.session_state.clean_df, st.session_state.ingredients,
+                              st.session_state.contributor_summary)
+
+@st.cache_resource
+def get_bootstrap(data_path, map_path):
+    """
+    Start loading the dataset in the background, once for the whole process, every session
+    reads the same store.
+    """
+    return DatasetBootstrap(data_path, map_path, source=DataSource.from_env()).start()
+
+def attach_dataset(shared):
+    """
+    Give the session its views of the shared store.
+    """
+    if st.session_state.get("dataset_version") != shared.version or "clean_df" not in st.session_state:
+        st.session_state.clean_df = shared.view()
+        st.session_state.df_ingr_map = shared.df_ingr_map
+        st.session_state.ingredients = shared.ingredients
+        st.session_state.seasonal_ingredients = shared.seasonal_ingredients
+        st.session_state.contributor_index = shared.contributor_index
+        st.session_state.contributor_summary = shared.contributor_summary
+        st.session_state.dataset_version = shared.version
+
+def require_dataset():
+    """
+    Wait for the dataset with a progress bar, then give the session its views.
+    Stops the page if the dataset could not be loaded, the next run loads it again.
+    """
+    bootstrap = get_bootstrap(DATA_PATH, MAP_PATH)
+    if not bootstrap.future.done():
+        bar = st.progress(*bootstrap.status())
+        while not bootstrap.wait(0.5):
+            bar.progress(*bootstrap.status())
+        bar.empty()
+    try:
+        shared = bootstrap.result()
+    except Exception as e:
+        st.error(f"The dataset could not be loaded: {e}")
+        # the next run of the page tries again
+        get_bootstrap.clear()
+        st.stop()
+    attach_dataset(shared)
+    return shared
+
+@st.fragment(run_every=1)
+def display_loading_progress(bootstrap):
+    """
+    Progress of the dataset bootstrap in the sidebar, the app reruns once the dataset is ready.
+    """
+    if bootstrap.future.done():
+        st.rerun()
+    st.progress(*bootstrap.status())
+
+def display_memory_metric(shared):
+    """
+    Display in the sidebar the memory held by the session compared with the shared store,
+    and the counters of the memoized analysis results and word clouds.
+    """
+    session_mb = shared.overlay_nbytes(st.session_state.clean_df) / 1e6
+    shared_mb = shared.nbytes / 1e6
+    derived_mb = derived_nbytes() / 1e6
+    st.sidebar.caption(f"Memory: {session_mb:.1f} MB for this session / {shared_mb:.1f} MB shared"
+                       f" + {derived_mb:.1f} MB derived columns")
+    memo = ANALYSIS_MEMO.stats()
+    st.sidebar.caption(f"Analysis cache: {memo['hits']} hits / {memo['misses']} misses, {memo['nbytes'] / 1e6:.1f} MB")
+    clouds = WORDCLOUD_CACHE.stats()
+    st.sidebar.caption(f"Word clouds: {clouds['entries']} cached, {clouds['hits']} hits / {clouds['misses']} misses")
 
 # Define the main function
 def main():
@@ -39,18 +117,22 @@ if __name__ == "__main__":
     # Set the page configuration
     st.set_page_config(page_title="Data Manager", page_icon=":material/edit:")
 
-    # Initialize session state for clean_df
-    BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    data_path = os.path.join(BASE_DIR, "data_files", "df_preprocess.csv")
-    if "clean_df" not in st.session_state:
-        # Executed only once per session
-        DF = DataFrameLoadder(path_raw_interaction=data_path)
-        df = DF.load()
-        st.session_state.clean_df = df
+    # Warnings only unless APP_LOG_LEVEL says otherwise, written by a background thread
+    configure_logging(use_queue=True)
+
+    # Pages writing into their dataframe only copy the columns they modify
+    pd.set_option("mode.copy_on_write", True)
 
-    if "df_ingr_map" not in st.session_state:
-        map_path = os.path.join(BASE_DIR, "data_files", "ingr_map.pkl")
-        df_ingr_map = pd.read_pickle(map_path)
-        st.session_state.df_ingr_map = df_ingr_map
+    # Load the dataset once per process, in the background: the menu renders right away,
+    # the pages needing the data wait for it
+    bootstrap = get_bootstrap(DATA_PATH, MAP_PATH)
 
     main()
+    if bootstrap.ready:
+        # Each session only gets views of the shared store
+        shared = bootstrap.result()
+        attach_dataset(shared)
+        display_memory_metric(shared)
+    elif not bootstrap.future.done():
+        with st.sidebar:
+            display_loading_progress(bootstrap)
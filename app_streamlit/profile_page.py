@@ -3,6 +3,7 @@ import pandas as pd
 from analyse.utils import user_recipes
 from analyse.utils import top_recipes_user
 from analyse.utils import top_recipes
+from load_data.contributor_summary import contributor_stats
 
 # Source fonction my_metric : https://py.cafe/maartenbreddels/streamlit-custom-metrics
 def my_metric(label, value, bg_color, icon="fas fa-asterisk"):
@@ -25,20 +26,27 @@ def my_metric(label, value, bg_color, icon="fas fa-asterisk"):
     
     st.markdown(lnk + htmlstr, unsafe_allow_html=True)
 
-def display_profile_page(clean_df, user_id = 47892):
+def display_profile_page(clean_df, user_id = 47892, contributor_index=None, contributor_summary=None):
     """
     Display the profile page content.
     Args:
         clean_df : pandas.DataFrame
             DataFrame containing recipe data.
+        contributor_index : ContributorIndex, optional
+            index of the recipes of each contributor, built once for the dataset.
+        contributor_summary : pandas.DataFrame, optional
+            summary of the contributors (see load_data.contributor_summary), read for the metrics.
     """ 
 
-    clean_df = st.session_state.clean_df 
     st.title("Profile Analysis")
     st.write("Here you will find some metrics about your profile.")
     
     # Dropdown to choose user   
-    user_id = st.selectbox("Select User", clean_df['contributor_id'].unique())
+    if contributor_index is not None:
+        contributors = contributor_index.contributors
+    else:
+        contributors = clean_df['contributor_id'].unique()
+    user_id = st.selectbox("Select User", contributors)
 
     if user_id:
         # Add button to allow user to choose to analyze the profile
@@ -47,7 +55,7 @@ def display_profile_page(clean_df, user_id = 47892):
             st.markdown('<p style="color:orange; font-weight:bold; font-size:35px;">' +  "Profile tracking : User " + str(user_id) +'</p>', unsafe_allow_html=True)
 
             # Filter data for the given user
-            user_recipes_df = user_recipes(clean_df, user_id)
+            user_recipes_df = user_recipes(clean_df, user_id, contributor_index)
 
             # Check if user has data
             if user_recipes_df.empty:
@@ -57,9 +65,14 @@ def display_profile_page(clean_df, user_id = 47892):
             # Get top recipes using the existing function
             top_recipes_df = top_recipes_user(user_recipes_df)
 
-            # Calculate metrics
-            nb_com_mean = user_recipes_df['num_comments'].mean()
-            rating_mean = user_recipes_df['avg_reviews'].mean()
+            # Calculate metrics, read from the contributor summary when there is one
+            stats = contributor_stats(contributor_summary, user_id) if contributor_summary is not None else None
+            if stats is not None:
+                nb_com_mean = stats['mean_comments']
+                rating_mean = stats['mean_rating']
+            else:
+                nb_com_mean = user_recipes_df['num_comments'].mean()
+                rating_mean = user_recipes_df['avg_reviews'].mean()
 
             # Display metrics
             rose = (240, 135, 114)
@@ -1,29 +1,30 @@
 import streamlit as st
 import pandas as pd
 import os
-import seaborn as sns
-import matplotlib.pyplot as plt
 from load_data.LoadData import DataFrameLoadder
-from analyse.utils import unique_ingr, cat_minutes, get_insight_low_ranking, best_recipe_filter_time, visualise_recipe_season, visualise_low_rank_insight
-from wordcloud import WordCloud
-import random
+from analyse.utils import MINUTES_LABELS, unique_ingr_counts, cat_minutes, get_insight_low_ranking, best_recipe_filter_time
+from analyse.plots import nutrient_histogram, visualise_recipe_season, visualise_low_rank_insight, wordcloud_png
 from analyse.utils import top_recipes
 import numpy as np
-import plotly.express as px
 from analyse.utils import top_recipes_user
+from analyse.derived import derived_column
 
 #df_ingr_map=pd.read_pickle('../data_files/ingr_map.pkl')
 
 
 
 
-def display_recipes_page(clean_df, df_ingr_map): 
+def display_recipes_page(clean_df, df_ingr_map, seasonal=None): 
     """
     Display the recipes page content.
+
+    seasonal (SeasonalIngredientCounts) holds the ingredients counts per season of clean_df,
+    computed once for the dataset.
     """
-    st.title("Recipes")
+    # plotly is only imported once the page is displayed
+    import plotly.express as px
 
-    clean_df = st.session_state.clean_df
+    st.title("Recipes")
 
     # Get path of the images 
     current_dir = os.path.dirname(__file__)
@@ -43,47 +44,23 @@ def display_recipes_page(clean_df, df_ingr_map):
     st.write("You selected :", genre)
     
     top_number_ingr = st.text_area("Enter the amount of ingredients to compare (default set to 200) and select again the season:",'200')
-    winter,summer,spring,autumn=unique_ingr(clean_df,df_ingr_map,int(top_number_ingr))
-
-    def word_to_count(lst):
-        dico={}
-        for i in lst:
-            dico[i]=random.randint(10, 100)
-        return dico
-    
-    winter_d=word_to_count(winter)
-    sum_d=word_to_count(winter)
-    spring_d=word_to_count(spring)
-    autumn_d=word_to_count(spring)
-
-    if genre == 'winter :snowflake:':
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(winter_d)
-        fig, ax = plt.subplots()
-        ax.imshow(wordcloud, interpolation="bilinear")
-        ax.axis("off")
-        st.pyplot(fig)
-    if genre == 'summer :sunny:':
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(sum_d)
-        fig, ax = plt.subplots()
-        ax.imshow(wordcloud, interpolation="bilinear")
-        ax.axis("off")
-        st.pyplot(fig)
-    if genre == 'spring :cherry_blossom:':
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(spring_d)
-        fig, ax = plt.subplots()
-        ax.imshow(wordcloud, interpolation="bilinear")
-        ax.axis("off")
-        st.pyplot(fig)
-    if genre == 'autumn :maple_leaf:':
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(autumn_d)
-        fig, ax = plt.subplots()
-        ax.imshow(wordcloud, interpolation="bilinear")
-        ax.axis("off")
-        st.pyplot(fig)   
+    top_n_ingr = int(top_number_ingr)
+    # frequencies of the clouds: occurrences of the ingredients in their season
+    winter,spring,summer,autumn=unique_ingr_counts(clean_df,df_ingr_map,top_n_ingr,seasonal=seasonal)
+    season_counts = {
+        'winter :snowflake:': ('winter', winter),
+        'spring :cherry_blossom:': ('spring', spring),
+        'summer :sunny:': ('summer', summer),
+        'autumn :maple_leaf:': ('autumn', autumn),
+    }
 
+    if genre is not None:
+        season, counts = season_counts[genre]
+        if counts.empty:
+            st.warning(f"No ingredient is specific to {season} in the top {top_n_ingr}.")
+        else:
+            st.image(wordcloud_png(counts, scope=f"season:{season}", top_n=top_n_ingr), use_container_width=True)
 
-        
-    
     # Section : Most popular recipes
 
     st.markdown('<p style="color:orange; font-weight:bold; font-size:35px;">Most popular recipes</p>', unsafe_allow_html=True)
@@ -113,22 +90,13 @@ def display_recipes_page(clean_df, df_ingr_map):
         'Saturated Fat': 'purple',
         'Carbohydrates': 'brown'
     }
-    plt.figure(figsize=(10, 5), facecolor='#0F1116')
-    # Without grids
-    sns.set_theme(style='white')  
-    # Historgam with KDE courb
-    sns.histplot(clean_df[option], bins=bins, kde=True, color=color_map[option])
-    plt.xlabel(option, fontsize=14, color='white')
-    plt.ylabel('Frequency', fontsize=14, color='white')
-    plt.gca().set_facecolor('#0F1116')
-    sns.despine()
-    st.pyplot(plt)
+    st.pyplot(nutrient_histogram(clean_df[option], bins, color_map[option]))
 
 
 
     # Section : Nutri score
-    nutri_score_mapping = {"A": 1, "B": 2, "C": 3, "D": 4, "E": 5}
-    clean_df["nutri_score_numeric"] = clean_df["nutri_score"].map(nutri_score_mapping)
+    # A -> 1 ... E -> 5, computed once for the dataset (clean_df is not modified)
+    nutri_score_numeric = derived_column(clean_df, "nutri_score_numeric")
 
     nutri_score_colors = {
     "A": "lightgreen", 
@@ -139,7 +107,7 @@ def display_recipes_page(clean_df, df_ingr_map):
     }
     fig = px.scatter(
     clean_df,
-    x="nutri_score_numeric", 
+    x=nutri_score_numeric, 
     y="num_comments",   
     size="avg_reviews",     
     color="nutri_score",    
@@ -169,18 +137,12 @@ def display_recipes_page(clean_df, df_ingr_map):
     st.write("In this section you will get to see 5 stars and more commented recipes filtered on the time needed to prepare them.")
     
     
+    # matching user input to functions inputs, from the table of cat_minutes
+    dico_time = MINUTES_LABELS
+
     opt_time = st.selectbox(
     "Wich time of preparation you want to focus on?",
-    ("15 minutes or less", "Between 15 to 30 minutes", "Between 30 minutes to 1 hour", "Between 1 hour to 2 hours", "Between 2 hours to 3 hours", "Between 3 hours to 4 hours", "More than 4 hours"))
-    
-    # matching user input to functions inputs
-    dico_time = {"15 minutes or less" : 'less_15min',
-                 "Between 15 to 30 minutes" : '15_30min' ,
-                 "Between 30 minutes to 1 hour" :'30min_1h' , 
-                 "Between 1 hour to 2 hours" : '1h_2h',
-                 "Between 2 hours to 3 hours": '2h_3h',
-                 "Between 3 hours to 4 hours" : '3h_4h' ,
-                 "More than 4 hours" : '4h_more' }
+    tuple(dico_time))
     
     opt_nb_ex = st.selectbox(
     "How many recipes you want to see ?",
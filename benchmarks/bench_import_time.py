@@ -0,0 +1,140 @@
+"""
+Import time of the modules of the app, measured with `python -X importtime`, and guard
+against the plotting libraries being imported at startup.
+
+Usage (from the root of the project):
+    # measure and write the baseline
+    python benchmarks/bench_import_time.py --output import_baseline.json
+
+    # fail (exit code 1) if a module imports a plotting library, or got slower than the baseline
+    python benchmarks/bench_import_time.py --baseline import_baseline.json
+
+Each module is imported in a fresh interpreter, the best cumulative time of --repeat runs is kept.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+APP_DIR = os.path.join(ROOT, 'app_streamlit')
+
+# Modules imported when the app starts
+DEFAULT_MODULES = ['main_app', 'menu_page', 'analyse.utils']
+
+# Only imported when a page draws a figure
+PLOTTING_MODULES = ['matplotlib', 'seaborn', 'plotly.express', 'wordcloud']
+
+
+def parse_importtime(stderr):
+    """
+    Cumulative import time of each module from the output of `-X importtime`.
+
+    Args:
+        stderr (str): standard error of the interpreter.
+
+    Returns:
+        dict: module name to cumulative time in microseconds.
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():  # header line
+            continue
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def import_profile(module):
+    """
+    Import a module of the app in a fresh interpreter.
+
+    Args:
+        module (str): name of the module, importable from app_streamlit.
+
+    Returns:
+        dict: 'cumulative_ms' the import time of the module, 'plotting_imports' the
+            plotting libraries it imported.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([APP_DIR, ROOT]))
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                             cwd=ROOT, env=env, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{process.stderr[-2000:]}")
+    times = parse_importtime(process.stderr)
+    return {
+        'cumulative_ms': times[module] / 1000,
+        'plotting_imports': [name for name in PLOTTING_MODULES if name in times],
+    }
+
+
+def run_imports(modules, repeat=5):
+    """
+    Best import time of each module over `repeat` fresh interpreters.
+    """
+    results = {}
+    for module in modules:
+        profiles = [import_profile(module) for _ in range(repeat)]
+        results[module] = {
+            'cumulative_ms': min(profile['cumulative_ms'] for profile in profiles),
+            'plotting_imports': profiles[0]['plotting_imports'],
+        }
+        print(f"{module:<20} {results[module]['cumulative_ms']:9.1f} ms"
+              f"  plotting imports: {results[module]['plotting_imports'] or 'none'}")
+    return results
+
+
+def check(results, baseline=None, tolerance=0.25):
+    """
+    Problems of a run: plotting libraries imported, modules slower than their baseline
+    by more than the tolerance.
+
+    Returns:
+        list: messages, empty if the run is fine.
+    """
+    problems = []
+    for module, result in results.items():
+        if result['plotting_imports']:
+            problems.append(f"{module} imports {', '.join(result['plotting_imports'])} at startup")
+        reference = (baseline or {}).get(module)
+        if reference is not None and result['cumulative_ms'] > reference['cumulative_ms'] * (1 + tolerance):
+            problems.append(f"{module} imports in {result['cumulative_ms']:.1f} ms, "
+                            f"baseline {reference['cumulative_ms']:.1f} ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', nargs='+', default=DEFAULT_MODULES,
+                        help=f"modules imported (default: {' '.join(DEFAULT_MODULES)})")
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per module (default: 5)')
+    parser.add_argument('--output', help='JSON file written with the results')
+    parser.add_argument('--baseline', help='JSON file of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slow-down against the baseline, as a fraction (default: 0.25)')
+    args = parser.parse_args()
+
+    results = run_imports(args.modules, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    problems = check(results, baseline, args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
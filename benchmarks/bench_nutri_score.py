@@ -0,0 +1,64 @@
+"""
+Benchmark of the row-wise nutri_score (DataFrame.apply) against nutri_score_batch.
+
+Usage (from the root of the project):
+    python benchmarks/bench_nutri_score.py --rows 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app_streamlit')))
+
+from analyse.utils import nutri_score, nutri_score_batch  # noqa: E402
+
+
+def make_nutrients(rows, seed=0):
+    """
+    Random nutrients covering every level of points of the Nutri-Score.
+
+    Args:
+        rows (int): number of rows.
+        seed (int, optional): seed of the generator. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: the nutrient columns used by the Nutri-Score.
+    """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Calories': rng.uniform(0, 4000, rows),
+        'Sugar': rng.uniform(0, 60, rows),
+        'Saturated Fat': rng.uniform(0, 15, rows),
+        'Sodium': rng.uniform(0, 1200, rows),
+        'Protein': rng.uniform(0, 12, rows),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='number of rows (default: 1,000,000)')
+    args = parser.parse_args()
+
+    df = make_nutrients(args.rows)
+
+    start = time.perf_counter()
+    batch = nutri_score_batch(df)
+    batch_time = time.perf_counter() - start
+    print(f"nutri_score_batch       : {batch_time:8.3f} s")
+
+    start = time.perf_counter()
+    row_wise = df.apply(nutri_score, axis=1)
+    row_time = time.perf_counter() - start
+    print(f"apply(nutri_score)      : {row_time:8.3f} s")
+
+    assert (batch.astype(str) == row_wise).all(), "the two implementations disagree"
+    print(f"speed-up on {args.rows} rows: x{row_time / batch_time:.0f}")
+
+
+if __name__ == '__main__':
+    main()
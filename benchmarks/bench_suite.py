@@ -0,0 +1,227 @@
+"""
+Benchmark suite of the preprocessing and analysis functions on synthetic data
+(see benchmarks/synthetic.py) at several sizes, with a machine-readable baseline.
+
+Usage (from the root of the project):
+    # measure and write the baseline
+    python benchmarks/bench_suite.py --sizes 10000 100000 1000000 --output bench_baseline.json
+
+    # measure again and fail (exit code 1) if a benchmark got slower than the baseline
+    python benchmarks/bench_suite.py --sizes 10000 100000 1000000 --baseline bench_baseline.json
+
+The best time of --repeat runs is compared, a benchmark regresses when it is slower than
+its baseline by more than --tolerance (a fraction, 0.25 by default).
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'app_streamlit'))
+
+from benchmarks.synthetic import make_clean_dataset, make_ingr_map, make_raw_dataset  # noqa: E402
+from log_config import configure_logging  # noqa: E402
+from load_data.list_columns import list_column_to_matrix, parse_list_columns  # noqa: E402
+from load_data.preprocess.clean_dataframe import prepare_final_dataframe  # noqa: E402
+from load_data.preprocess.cleaning_data import outliers_df  # noqa: E402
+from load_data.preprocess.df_aggregate import df_aggregate  # noqa: E402
+from load_data.schema import NUTRITION_COLS, apply_schema  # noqa: E402
+from analyse.utils import (MINUTES_CATEGORIES, best_recipe_filter_time, get_top_ingredients2,  # noqa: E402
+                           get_top_tags, nutri_score, nutri_score_batch, unique_ingr)
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# The row-wise nutri_score takes minutes on a million rows
+ROW_WISE_MAX_ROWS = 100_000
+
+
+class Datasets():
+    def __init__(self, rows, seed=0):
+        """
+        Synthetic inputs of the benchmarks at one size, generated on first use.
+
+        Args:
+            rows (int): number of rows (recipes of the cleaned dataset, interactions of the raw one).
+            seed (int, optional): seed of the generator. Defaults to 0.
+
+        Returns:
+            None.
+        """
+        self.rows = rows
+        self.seed = seed
+        self._cache = {}
+
+    def _get(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def raw(self):
+        """
+        raw_interaction, raw_recipes and pp_recipes.
+        """
+        return self._get('raw', lambda: make_raw_dataset(self.rows, self.seed))
+
+    @property
+    def clean(self):
+        """
+        Cleaned dataset as the app loads it: parsed list columns and declared dtypes.
+        The pages read the ratings as 'avg_reviews'.
+        """
+        def build():
+            df = apply_schema(parse_list_columns(make_clean_dataset(self.rows, self.seed)))
+            return df.rename(columns={'avg_ratings': 'avg_reviews'})
+        return self._get('clean', build)
+
+    @property
+    def nutrients(self):
+        """
+        Nutrient columns of the cleaned dataset.
+        """
+        def build():
+            matrix = list_column_to_matrix(self.clean['nutrition'], 'float', len(NUTRITION_COLS))
+            return pd.DataFrame(matrix, columns=NUTRITION_COLS)
+        return self._get('nutrients', build)
+
+    @property
+    def ingr_map(self):
+        return self._get('ingr_map', make_ingr_map)
+
+
+# name: function of the datasets returning the call to time, and the maximum number of rows (None for any)
+BENCHMARKS = {
+    'prepare_final_dataframe': (lambda data: lambda: prepare_final_dataframe(*data.raw), None),
+    'nutri_score': (lambda data: lambda: data.nutrients.apply(nutri_score, axis=1), ROW_WISE_MAX_ROWS),
+    'nutri_score_batch': (lambda data: lambda: nutri_score_batch(data.nutrients), None),
+    'outliers_df': (lambda data: lambda: outliers_df(data.clean, 'minutes', treshold_sup=240), None),
+    'df_aggregate': (lambda data: lambda: df_aggregate(data.raw[0]), None),
+    'get_top_ingredients2': (lambda data: lambda: get_top_ingredients2(data.clean, data.ingr_map), None),
+    'get_top_tags': (lambda data: lambda: get_top_tags(data.clean, most_commented=True, top_recipes=1000), None),
+    'unique_ingr': (lambda data: lambda: unique_ingr(data.clean, data.ingr_map), None),
+    'best_recipe_filter_time': (lambda data: lambda: best_recipe_filter_time(data.clean, MINUTES_CATEGORIES[2], 10), None),
+}
+
+
+def time_call(call, repeat):
+    """
+    Wall times of `repeat` runs of a call.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run_suite(sizes, repeat=3, names=None, seed=0):
+    """
+    Run the benchmarks at every size.
+
+    Args:
+        sizes (list): numbers of rows.
+        repeat (int, optional): runs of each benchmark. Defaults to 3.
+        names (list, optional): benchmarks run, see BENCHMARKS. Defaults to None (all of them).
+        seed (int, optional): seed of the synthetic data. Defaults to 0.
+
+    Returns:
+        dict: the environment of the run and, for each benchmark and size, the best and median times.
+    """
+    names = list(BENCHMARKS) if names is None else names
+    unknown = sorted(set(names) - set(BENCHMARKS))
+    if unknown:
+        raise ValueError(f"Unknown benchmarks {unknown}, expected some of {list(BENCHMARKS)}")
+
+    results = {name: {} for name in names}
+    for rows in sizes:
+        data = Datasets(rows, seed)
+        for name in names:
+            make_call, max_rows = BENCHMARKS[name]
+            if max_rows is not None and rows > max_rows:
+                print(f"{name:<25} {rows:>9} rows: skipped (more than {max_rows} rows)")
+                continue
+            times = time_call(make_call(data), repeat)
+            results[name][str(rows)] = {'best_s': min(times), 'median_s': float(np.median(times))}
+            print(f"{name:<25} {rows:>9} rows: {min(times):9.4f} s")
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, tolerance=0.25):
+    """
+    Benchmarks slower than their baseline by more than the tolerance.
+
+    Only the benchmarks and sizes measured in both runs are compared.
+
+    Args:
+        current (dict): output of `run_suite`.
+        baseline (dict): output of `run_suite` taken as reference.
+        tolerance (float, optional): allowed slow-down, as a fraction of the baseline time. Defaults to 0.25.
+
+    Returns:
+        list: (name, rows, baseline time, current time) of each regression.
+    """
+    regressions = []
+    for name, sizes in current['results'].items():
+        for rows, measure in sizes.items():
+            reference = baseline['results'].get(name, {}).get(rows)
+            if reference is None:
+                continue
+            if measure['best_s'] > reference['best_s'] * (1 + tolerance):
+                regressions.append((name, int(rows), reference['best_s'], measure['best_s']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='numbers of rows (default: 10,000 100,000 1,000,000)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each benchmark (default: 3)')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='benchmarks to run (default: all)')
+    parser.add_argument('--output', help='JSON file written with the results')
+    parser.add_argument('--baseline', help='JSON file of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slow-down against the baseline, as a fraction (default: 0.25)')
+    args = parser.parse_args()
+
+    configure_logging()
+    current = run_suite(args.sizes, args.repeat, args.only)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        for name, rows, reference, measure in regressions:
+            print(f"REGRESSION {name} on {rows} rows: {reference:.4f} s -> {measure:.4f} s "
+                  f"(x{measure / reference:.2f})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regression against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Synthetic data with the schema of sample/sample_raw_recipes.csv, at any number of rows.
+
+The cleaned dataset has the columns and value formats of the sample (lists written as
+python literals, as in the csv files), the raw dataset has the three input files of the
+preprocessing (interactions, raw recipes and preprocessed recipes, as in tests/conftest.py).
+"""
+
+import numpy as np
+import pandas as pd
+
+SAMPLE_COLUMNS = ['recipe_id', 'name', 'minutes', 'contributor_id', 'tags', 'nutrition', 'n_steps', 'steps',
+                  'ingredients', 'n_ingredients', 'ingredient_ids', 'ingredient_tokens', 'month', 'year',
+                  'num_comments', 'avg_ratings', 'season']
+
+SEASON_OF_MONTH = {12: 'winter', 1: 'winter', 2: 'winter', 3: 'spring', 4: 'spring', 5: 'spring',
+                   6: 'summer', 7: 'summer', 8: 'summer', 9: 'autumn', 10: 'autumn', 11: 'autumn'}
+
+N_TAGS = 500
+N_INGREDIENTS = 8000
+
+# Share of the recipes rated 5 on average (often a single review), like the real dataset
+PERFECT_RATING_SHARE = 0.2
+
+
+def _vocabulary(prefix, size):
+    return np.array([f'{prefix}-{i}' for i in range(size)], dtype=object)
+
+
+def _list_literals(values, lengths):
+    """
+    Python literals of the lists cut from `values` by `lengths`, as the csv files store them.
+    """
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    return [repr(values[start:end].tolist()) for start, end in zip(starts, ends)]
+
+
+def _skewed(rng, size, n_values):
+    """
+    Values between 0 and n_values - 1, a few of them frequent (like tags and ingredients).
+    """
+    return (rng.zipf(1.3, size) - 1) % n_values
+
+
+def _recipes(rows, rng):
+    """
+    Columns of the recipes shared by the cleaned and the raw datasets.
+    """
+    tags = _vocabulary('tag', N_TAGS)
+    ingredient_names = _vocabulary('ingredient', N_INGREDIENTS)
+
+    n_tags = rng.integers(3, 20, rows)
+    n_ingredients = rng.integers(2, 15, rows)
+    n_steps = rng.integers(1, 25, rows)
+    ingredient_ids = _skewed(rng, n_ingredients.sum(), N_INGREDIENTS)
+    nutrition = np.round(rng.gamma(2.0, [200, 15, 20, 15, 15, 20, 8], (rows, 7)), 1)
+
+    return pd.DataFrame({
+        'recipe_id': rng.permutation(np.arange(rows) * 3 + 38)[:rows],
+        'name': [f'recipe {i}' for i in range(rows)],
+        'minutes': rng.integers(0, 300, rows),
+        'contributor_id': rng.integers(1, max(2, rows // 20), rows) + 1500,
+        'tags': _list_literals(tags[_skewed(rng, n_tags.sum(), N_TAGS)], n_tags),
+        'nutrition': [repr(row) for row in nutrition.tolist()],
+        'n_steps': n_steps,
+        'steps': _list_literals(np.full(n_steps.sum(), 'mix the ingredients', dtype=object), n_steps),
+        'ingredients': _list_literals(ingredient_names[ingredient_ids], n_ingredients),
+        'n_ingredients': n_ingredients,
+        'ingredient_ids': _list_literals(ingredient_ids, n_ingredients),
+        'ingredient_tokens': '[[40480, 37229]]',
+    })
+
+
+def make_clean_dataset(rows, seed=0):
+    """
+    Cleaned dataset with the columns and formats of sample_raw_recipes.csv.
+
+    Args:
+        rows (int): number of recipes.
+        seed (int, optional): seed of the generator. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: one row per recipe, list columns as strings.
+    """
+    rng = np.random.default_rng(seed)
+    df = _recipes(rows, rng)
+    df['month'] = rng.integers(1, 13, rows)
+    df['year'] = rng.integers(1999, 2019, rows)
+    df['num_comments'] = rng.geometric(0.3, rows)
+    df['avg_ratings'] = np.round(rng.uniform(0, 5, rows) ** 0.5 * 5 ** 0.5, 2)
+    df.loc[rng.random(rows) < PERFECT_RATING_SHARE, 'avg_ratings'] = 5.0
+    df['season'] = df['month'].map(SEASON_OF_MONTH)
+    return df[SAMPLE_COLUMNS]
+
+
+def make_raw_dataset(rows, seed=0):
+    """
+    Inputs of prepare_final_dataframe: one interaction per row, on rows // 5 recipes.
+
+    Args:
+        rows (int): number of interactions.
+        seed (int, optional): seed of the generator. Defaults to 0.
+
+    Returns:
+        tuple: raw_interaction, raw_recipes, pp_recipes (pd.DataFrame)
+    """
+    rng = np.random.default_rng(seed)
+    recipes = _recipes(max(1, rows // 5), rng)
+    n_recipes = len(recipes)
+
+    raw_recipes = recipes.drop(columns=['ingredient_ids', 'ingredient_tokens']).rename(columns={'recipe_id': 'id'})
+    days = pd.to_datetime('1999-01-01') + pd.to_timedelta(rng.integers(0, 7000, n_recipes), unit='D')
+    raw_recipes['submitted'] = days.strftime('%Y-%m-%d')
+    raw_recipes['description'] = 'a recipe'
+
+    pp_recipes = recipes[['recipe_id', 'ingredient_ids', 'ingredient_tokens']].rename(columns={'recipe_id': 'id'})
+
+    dates = pd.to_datetime('2000-01-01') + pd.to_timedelta(rng.integers(0, 7000, rows), unit='D')
+    raw_interaction = pd.DataFrame({
+        'user_id': rng.integers(1, max(2, rows // 3), rows),
+        'recipe_id': recipes['recipe_id'].to_numpy()[_skewed(rng, rows, n_recipes)],
+        'date': dates.strftime('%Y-%m-%d'),
+        'rating': rng.integers(0, 6, rows),
+        'review': 'tasty',
+    })
+    return raw_interaction, raw_recipes, pp_recipes
+
+
+def make_ingr_map():
+    """
+    Mapping of the ingredient IDs of the synthetic data to their names, as ingr_map.pkl.
+    """
+    ids = np.arange(N_INGREDIENTS)
+    return pd.DataFrame({'id': ids, 'replaced': _vocabulary('ingredient', N_INGREDIENTS)})
@@ -8,6 +8,11 @@ import pandas as pd
 import numpy as np
 import pytest
 
+from log_config import configure_logging
+
+# The tests log everything in logging/debug.log
+configure_logging(level='DEBUG', filename='logging/debug.log')
+
 
 @pytest.fixture
 def sample_raw_recipes():
@@ -218,4 +223,37 @@ def sample_date_avgrating():
         'name': ['Recipe A', 'Recipe B', 'Recipe C', 'Recipe D', 'Recipe E', 'Recipe F'],
         'num_comments': [10, 50, 5, 0, 30, 20],
         'avg_ratings': [4.5, 3.8, 4.7, 4.2, 4.0, 3.5]
-    })
\ No newline at end of file
+    })
+@pytest.fixture
+def raw_dataset():
+    """
+    Raw interactions, raw recipes and preprocessed recipes built from the sample,
+    with the columns of the original files, to run the whole preprocessing.
+
+    Some users comment several times the same recipe and one interaction is on a
+    recipe missing from the raw recipes.
+
+    Returns:
+        tuple: raw_interaction, raw_recipes, pp_recipes (pd.DataFrame)
+    """
+    sample = pd.read_csv('sample/sample_raw_recipes.csv')
+    rng = np.random.default_rng(0)
+
+    raw_recipes = sample[['name', 'recipe_id', 'minutes', 'contributor_id', 'tags', 'nutrition',
+                          'n_steps', 'steps', 'ingredients', 'n_ingredients']].rename(columns={'recipe_id': 'id'})
+    raw_recipes['submitted'] = [f"{y}-{m:02d}-01" for y, m in zip(sample['year'], sample['month'])]
+    raw_recipes['description'] = 'a recipe'
+    raw_recipes['minutes'] = raw_recipes['minutes'].where(np.arange(len(raw_recipes)) % 17 != 0, 500)
+
+    pp_recipes = sample[['recipe_id', 'ingredient_ids', 'ingredient_tokens']].rename(columns={'recipe_id': 'id'})
+
+    n = 1000
+    raw_interaction = pd.DataFrame({
+        'user_id': rng.integers(1, 60, n),
+        'recipe_id': rng.choice(np.append(raw_recipes['id'].to_numpy(), 999999999), n),
+        'date': pd.to_datetime('2010-01-01') + pd.to_timedelta(rng.integers(0, 3000, n), unit='D'),
+        'rating': rng.integers(0, 6, n),
+        'review': 'tasty',
+    })
+    raw_interaction['date'] = raw_interaction['date'].dt.strftime('%Y-%m-%d')
+    return raw_interaction, raw_recipes, pp_recipes
@@ -0,0 +1,64 @@
+import ast
+
+import pandas as pd
+
+from benchmarks.bench_import_time import check, import_profile
+from benchmarks.bench_suite import BENCHMARKS, Datasets, compare, run_suite
+from benchmarks.synthetic import SAMPLE_COLUMNS, make_clean_dataset, make_raw_dataset
+from load_data.preprocess.clean_dataframe import prepare_final_dataframe
+
+
+def test_synthetic_dataset_schema():
+    """
+    The synthetic datasets have the columns and list formats of the sample, and the raw one
+    goes through the preprocessing.
+    """
+    sample = pd.read_csv('sample/sample_raw_recipes.csv', nrows=5)
+    assert list(sample.columns) == SAMPLE_COLUMNS
+
+    df = make_clean_dataset(200)
+    assert list(df.columns) == SAMPLE_COLUMNS
+    assert len(df) == 200 and df['recipe_id'].is_unique
+    for column in ['tags', 'nutrition', 'steps', 'ingredients', 'ingredient_ids']:
+        assert all(isinstance(ast.literal_eval(value), list) for value in df[column])
+    assert (df['n_ingredients'] == df['ingredients'].map(lambda value: len(ast.literal_eval(value)))).all()
+
+    final = prepare_final_dataframe(*make_raw_dataset(500))
+    assert set(SAMPLE_COLUMNS) <= set(final.columns)
+    assert final['recipe_id'].is_unique
+
+
+def test_benchmark_compare():
+    """
+    A run is compared with its baseline on the benchmarks measured in both.
+    """
+    current = run_suite([300], repeat=1, names=['nutri_score_batch', 'outliers_df'])
+    assert set(current['results']) == {'nutri_score_batch', 'outliers_df'}
+    assert compare(current, current) == []
+
+    baseline = {'results': {
+        'nutri_score_batch': {'300': {'best_s': current['results']['nutri_score_batch']['300']['best_s'] / 10}},
+        'outliers_df': {'1000': {'best_s': 1e-9}},
+    }}
+    regressions = compare(current, baseline, tolerance=0.5)
+    assert [(name, rows) for name, rows, _, _ in regressions] == [('nutri_score_batch', 300)]
+
+
+def test_best_recipe_benchmark_selects_recipes(caplog):
+    """
+    The synthetic data has perfect-rated recipes, the filter benchmark sorts real rows.
+    """
+    make_call, _ = BENCHMARKS['best_recipe_filter_time']
+    result = make_call(Datasets(2000))()
+    assert len(result) == 10
+    assert (result['avg_reviews'] == 5).all()
+    assert not [record for record in caplog.records if record.levelname == 'ERROR']
+
+
+def test_startup_imports_no_plotting_library():
+    """
+    The app starts without importing the plotting libraries, they are imported by the pages drawing figures.
+    """
+    results = {module: import_profile(module) for module in ['main_app', 'analyse.utils']}
+    assert check(results) == []
+    assert results['main_app']['cumulative_ms'] > 0
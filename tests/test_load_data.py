@@ -0,0 +1,272 @@
+import ast
+import shutil
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from load_data.LoadData import DataFrameLoadder
+from load_data.bootstrap import DataSource, DatasetBootstrap
+from load_data.columnar_cache import SOURCE_HASH_KEY, file_sha256, write_cache
+from load_data.shared_store import SharedDataset
+from load_data.schema import apply_schema
+from load_data.list_columns import is_list_column, list_column_to_matrix, parse_list_column
+from load_data.query import DatasetQuery
+
+
+@pytest.fixture
+def csv_copy(tmp_path):
+    """
+    Copy of the sample csv in a temporary folder, so the loader can write its cache next to it.
+    """
+    path = tmp_path / 'df_preprocess.csv'
+    shutil.copy('sample/sample_raw_recipes.csv', path)
+    return path
+
+
+def test_load_cache_miss_then_hit(csv_copy):
+    """
+    The first load parses the csv and writes the parquet sidecar, the second one reads it.
+    """
+    first = DataFrameLoadder(str(csv_copy))
+    df_first = first.load()
+    assert first.cache_status == 'miss'
+    assert csv_copy.with_suffix('.parquet').exists()
+
+    second = DataFrameLoadder(str(csv_copy))
+    df_second = second.load()
+    assert second.cache_status == 'hit'
+    pd.testing.assert_frame_equal(df_first, df_second)
+
+
+def test_load_cache_keeps_list_columns(csv_copy):
+    """
+    The list columns are parsed once, and read back from the cache without parsing.
+    """
+    DataFrameLoadder(str(csv_copy)).load()
+    df = DataFrameLoadder(str(csv_copy)).load()
+    for column in ['tags', 'ingredient_ids', 'ingredients', 'steps', 'nutrition']:
+        assert is_list_column(df[column])
+
+    raw = pd.read_csv(csv_copy)
+    assert df['tags'].iloc[0] == ast.literal_eval(raw['tags'].iloc[0])
+    assert df['ingredient_ids'].isna().sum() == raw['ingredient_ids'].isna().sum()
+
+
+def test_load_applies_schema(csv_copy):
+    """
+    The loaded dataset has the declared dtypes, from the csv and from the cache.
+    """
+    loader = DataFrameLoadder(str(csv_copy))
+    df = loader.load()
+    report = loader.memory_report
+    assert report.loc['total', 'bytes_after'] < report.loc['total', 'bytes_before']
+
+    df = DataFrameLoadder(str(csv_copy)).load()
+    assert isinstance(df['season'].dtype, pd.CategoricalDtype)
+    assert list(df['season'].cat.categories) == ['winter', 'spring', 'summer', 'autumn']
+    assert df['month'].dtype == 'int8'
+    assert df['minutes'].dtype == 'int32'
+    assert df['name'].dtype == 'string[pyarrow]'
+
+
+def test_apply_schema_keeps_columns_that_do_not_fit():
+    df = pd.DataFrame({'n_steps': [1, 100_000], 'year': [2001, None], 'Calories': [1.5, 2.0]})
+    converted = apply_schema(df)
+    assert converted['n_steps'].dtype == 'int64'
+    assert converted['year'].dtype == 'float64'
+    assert converted['Calories'].dtype == 'float32'
+
+
+def test_contributor_summary_stored_next_to_csv(csv_copy):
+    loader = DataFrameLoadder(str(csv_copy))
+    summary = loader.contributor_summary()
+    path = csv_copy.parent / 'df_preprocess_contributors.parquet'
+    assert path.exists()
+    assert summary['recipe_count'].sum() == loader.df['recipe_id'].nunique()
+
+    reloaded = DataFrameLoadder(str(csv_copy)).contributor_summary()
+    pd.testing.assert_frame_equal(reloaded, summary)
+
+
+def test_parse_list_column():
+    series = pd.Series(["['a', 'b']", "[]", None, "['it\\'s', 'b']"], name='tags')
+    parsed = parse_list_column(series, 'dictionary')
+    assert parsed.name == 'tags'
+    assert parsed.iloc[0] == ['a', 'b']
+    assert parsed.iloc[1] == []
+    assert pd.isna(parsed.iloc[2])
+    assert parsed.iloc[3] == ["it's", 'b']
+
+    numbers = pd.Series(['[1.5, 2]', '[3, x, 4]', None])
+    matrix = list_column_to_matrix(numbers, 'float', 2)
+    np.testing.assert_array_equal(matrix, [[1.5, 2], [3, np.nan], [np.nan, np.nan]])
+
+
+def test_load_cache_rebuilt_when_source_changes(csv_copy):
+    """
+    Editing the csv invalidates the cache.
+    """
+    DataFrameLoadder(str(csv_copy)).load()
+
+    df = pd.read_csv(csv_copy).head(10)
+    df.to_csv(csv_copy, index=False)
+
+    loader = DataFrameLoadder(str(csv_copy))
+    reloaded = loader.load()
+    assert loader.cache_status == 'miss'
+    assert len(reloaded) == 10
+
+
+def test_load_cache_rebuilt_when_format_changes(csv_copy):
+    """
+    A sidecar of an older format, tagged only with the hash of the csv and holding the
+    list columns as strings, is rebuilt instead of being served.
+    """
+    raw = pd.read_csv(csv_copy)
+    for path in [csv_copy.with_suffix('.parquet'), csv_copy.parent / 'df_preprocess_contributors.parquet']:
+        table = pa.Table.from_pandas(raw, preserve_index=False)
+        metadata = dict(table.schema.metadata)
+        metadata[SOURCE_HASH_KEY] = file_sha256(csv_copy).encode()
+        pq.write_table(table.replace_schema_metadata(metadata), path)
+
+    loader = DataFrameLoadder(str(csv_copy))
+    df = loader.load()
+    assert loader.cache_status == 'miss'
+    assert is_list_column(df['tags'])
+    summary = loader.contributor_summary()
+    assert 'recipe_count' in summary.columns
+
+    reloaded = DataFrameLoadder(str(csv_copy))
+    pd.testing.assert_frame_equal(reloaded.load(), df)
+    assert reloaded.cache_status == 'hit'
+
+
+def test_write_cache_skips_frames_arrow_can_not_convert(tmp_path):
+    """
+    The cache is optional: a column Arrow can not convert leaves no cache, and no error.
+    """
+    path = tmp_path / 'mixed.parquet'
+    write_cache(pd.DataFrame({'mixed': [1, 'a', 2.5]}), str(path), 'hash')
+    assert not path.exists()
+    assert not (tmp_path / 'mixed.parquet.tmp').exists()
+
+
+def test_load_without_cache(csv_copy):
+    loader = DataFrameLoadder(str(csv_copy), use_cache=False)
+    loader.load()
+    assert loader.cache_status == 'disabled'
+    assert not csv_copy.with_suffix('.parquet').exists()
+
+
+def test_shared_dataset_views_copy_on_write(sample_raw_recipes):
+    """
+    A page writing into its view gets its own copy of the column, the shared store is unchanged.
+    """
+    with pd.option_context('mode.copy_on_write', True):
+        shared = SharedDataset(sample_raw_recipes, pd.DataFrame({'id': [1], 'replaced': ['salt']}))
+        view = shared.view()
+        assert shared.overlay_nbytes(view) == 0
+
+        view['contributor_id'] = view['contributor_id'].astype(str)
+        view['minutes_tr'] = 'less_15min'
+
+        assert shared.clean_df['contributor_id'].dtype == 'int64'
+        assert 'minutes_tr' not in shared.clean_df.columns
+        overlay = shared.overlay_nbytes(view)
+        assert 0 < overlay < shared.nbytes
+
+
+def test_query_parquet_matches_memory(csv_copy):
+    """
+    A query on the parquet cache, with its filters pushed down into the read, gives the
+    rows of the same query on the loaded dataFrame.
+    """
+    loader = DataFrameLoadder(str(csv_copy))
+    df = loader.load()
+    on_disk = loader.query()
+    assert not on_disk.in_memory
+
+    for query in [on_disk, DatasetQuery(df)]:
+        query = query.filter('season', 'in', ['winter', 'summer']).filter('minutes', '<=', 60)
+        result = query.select(['recipe_id', 'minutes']).collect()
+        expected = df.loc[df['season'].isin(['winter', 'summer']) & (df['minutes'] <= 60), ['recipe_id', 'minutes']]
+        assert list(result.columns) == ['recipe_id', 'minutes']
+        np.testing.assert_array_equal(result['recipe_id'].to_numpy(), expected['recipe_id'].to_numpy())
+        assert query.count() == len(expected)
+
+        counts = query.group_count('season')
+        assert counts['count'].sum() == len(expected)
+
+        top = query.select(['recipe_id', 'num_comments']).top(3, by='num_comments')
+        assert top['num_comments'].tolist() == expected.join(df['num_comments'])['num_comments'].nlargest(3).tolist()
+
+
+def test_query_count_filters_on_two_columns(csv_copy):
+    """
+    count reads every column of the filters from the parquet cache.
+    """
+    loader = DataFrameLoadder(str(csv_copy))
+    df = loader.load()
+    query = loader.query().filter('minutes', '<=', 60).filter('avg_ratings', '>=', 4)
+    assert not query.in_memory
+    expected = ((df['minutes'] <= 60) & (df['avg_ratings'] >= 4)).sum()
+    assert 0 < expected < len(df)
+    assert query.count() == expected
+    assert query.filter('avg_ratings', '<', 4).count() == 0
+
+
+def test_query_rejects_unknown_operator_and_column(sample_raw_recipes):
+    query = DatasetQuery(sample_raw_recipes)
+    with pytest.raises(ValueError):
+        query.filter('minutes', 'like', 10)
+    with pytest.raises(KeyError):
+        query.filter('unknown', '==', 1).collect()
+
+
+def test_data_source_mirror(tmp_path):
+    """
+    Missing files are copied from the local mirror or extracted from its zip archives.
+    """
+    mirror = tmp_path / 'mirror'
+    mirror.mkdir()
+    shutil.copy('sample/sample_raw_recipes.csv', mirror / 'df_preprocess.csv')
+    with zipfile.ZipFile(mirror / 'data_files.zip', 'w') as archive:
+        archive.writestr('data_files/ingr_map.pkl', b'map')
+
+    data_path = tmp_path / 'data_files' / 'df_preprocess.csv'
+    map_path = tmp_path / 'data_files' / 'ingr_map.pkl'
+    stages = []
+    DataSource(mirror_dir=str(mirror)).fetch([str(data_path), str(map_path)], stages.append)
+    assert data_path.read_bytes() == (mirror / 'df_preprocess.csv').read_bytes()
+    assert map_path.read_bytes() == b'map'
+    assert stages == ['decompress']
+    assert not (tmp_path / 'data_files' / 'ingr_map.pkl.part').exists()
+
+    with pytest.raises(FileNotFoundError):
+        DataSource(mirror_dir=str(mirror)).fetch([str(tmp_path / 'missing.csv')])
+
+
+def test_dataset_bootstrap(csv_copy, tmp_path):
+    """
+    The dataset is loaded in the background, a failed load is reported through the future.
+    """
+    map_path = tmp_path / 'ingr_map.pkl'
+    pd.DataFrame({'id': [1, 2], 'replaced': ['salt', 'sugar']}).to_pickle(map_path)
+
+    bootstrap = DatasetBootstrap(str(csv_copy), str(map_path)).start()
+    shared = bootstrap.result(timeout=60)
+    assert isinstance(shared, SharedDataset)
+    assert shared.version == file_sha256(str(csv_copy))
+    assert bootstrap.ready
+    assert bootstrap.status()[0] == 1.0
+
+    failed = DatasetBootstrap(str(tmp_path / 'missing.csv'), str(map_path)).start()
+    assert failed.wait(timeout=60)
+    assert not failed.ready
+    assert failed.status()[1].startswith('Loading failed')
+    with pytest.raises(FileNotFoundError):
+        failed.result()
@@ -0,0 +1,46 @@
+import logging
+import logging.handlers
+
+import pytest
+
+import log_config
+from log_config import configure_logging
+
+
+@pytest.fixture
+def restore_logging():
+    """
+    Give the root logger back to the configuration of conftest, with the listener of the
+    test stopped and its handlers closed.
+    """
+    yield
+    log_config._stop_listener()
+    configure_logging(level='DEBUG', filename='logging/debug.log', force=True)
+
+
+def test_configure_logging_queue(tmp_path, restore_logging):
+    """
+    With a queue the records are written by the listener thread, below the level the
+    arguments of a call are never formatted.
+    """
+    class Frame():
+        rendered = 0
+
+        def __str__(self):
+            Frame.rendered += 1
+            return 'frame'
+
+    path = tmp_path / 'logs' / 'app.log'
+    root = configure_logging(level='INFO', filename=str(path), use_queue=True, force=True)
+    assert isinstance(root.handlers[0], logging.handlers.QueueHandler)
+    assert configure_logging(level='DEBUG') is root and root.level == logging.INFO
+
+    logger = logging.getLogger('analyse.utils')
+    logger.debug("Top recipes:\n%s", Frame())
+    logger.info("Top %s recipes extracted successfully.", 10)
+    log_config._stop_listener()
+
+    assert Frame.rendered == 0
+    lines = path.read_text().splitlines()
+    assert len(lines) == 1
+    assert lines[0].endswith("analyse.utils - INFO - Top 10 recipes extracted successfully.")
@@ -0,0 +1,119 @@
+import pandas as pd
+
+from analyse.memo import AnalysisMemo, memoize, set_dataset_version
+
+
+def make_counted(memo):
+    """
+    Memoized function counting its real calls.
+    """
+    calls = []
+
+    @memoize(memo=memo)
+    def total(df, column, scale=1):
+        calls.append(column)
+        return df[column].sum() * scale
+
+    return total, calls
+
+
+def test_memoize_hits_on_same_version_and_arguments():
+    memo = AnalysisMemo()
+    total, calls = make_counted(memo)
+    df = set_dataset_version(pd.DataFrame({'a': [1, 2, 3], 'b': [4, 5, 6]}), 'v1')
+
+    assert total(df, 'a') == 6
+    assert total(df.copy(deep=False), 'a') == 6
+    assert total(df, 'a', scale=2) == 12
+    assert total(df.iloc[:2], 'a') == 3
+    assert calls == ['a', 'a', 'a']
+    assert memo.stats()['hits'] == 1
+
+    # no version, no memo
+    untagged = pd.DataFrame({'a': [1, 2, 3]})
+    total(untagged, 'a')
+    total(untagged, 'a')
+    assert len(calls) == 5
+
+
+def test_memoize_invalidate_and_eviction():
+    memo = AnalysisMemo(max_entries=2)
+    total, calls = make_counted(memo)
+    v1 = set_dataset_version(pd.DataFrame({'a': [1, 2]}), 'v1')
+    v2 = set_dataset_version(pd.DataFrame({'a': [1, 2]}), 'v2')
+
+    total(v1, 'a')
+    total(v2, 'a')
+    assert memo.invalidate('v1') == 1
+    total(v1, 'a')
+    total(v2, 'a')
+    assert len(calls) == 3
+
+    total(v1, 'a', scale=3)
+    assert len(memo) == 2
+    total(v1, 'a')
+    assert len(calls) == 5
+
+    memo.invalidate()
+    assert len(memo) == 0 and memo.nbytes == 0
+
+
+def test_memoize_returns_copies():
+    memo = AnalysisMemo()
+
+    @memoize(memo=memo)
+    def head(df):
+        return df.head(2)
+
+    df = set_dataset_version(pd.DataFrame({'a': [1, 2, 3]}), 'v1')
+    first = head(df)
+    first.loc[0, 'a'] = 100
+    assert head(df).loc[0, 'a'] == 1
+
+
+def test_shares_data_views_and_slices():
+    """
+    Views and row slices of a frame share its buffers, whatever the dtype, copies do not
+    (the Arrow buffers are immutable, a copy keeps them).
+    """
+    import pyarrow as pa
+    from analyse.memo import shares_data
+
+    df = pd.DataFrame({
+        'minutes': [10, 20, 30, 40],
+        'season': pd.Categorical(['winter', 'spring', 'summer', 'autumn']),
+        'tags': pd.Series([['a'], ['b', 'c'], [], ['d']], dtype=pd.ArrowDtype(pa.list_(pa.string()))),
+    })
+    for col in df.columns:
+        assert shares_data(df.copy(deep=False)[col], df[col])
+        assert shares_data(df.iloc[1:3][col], df[col])
+    for col in ['minutes', 'season']:
+        assert not shares_data(df.copy()[col], df[col])
+    assert not shares_data(df['minutes'].clip(upper=25), df['minutes'])
+    rebuilt = pd.Series(df['tags'].tolist(), dtype=df['tags'].dtype)
+    assert not shares_data(rebuilt, df['tags'])
+
+
+def test_memoize_rewritten_columns_and_index_slices(monkeypatch):
+    """
+    A view whose column was rewritten is not memoized, the slices of an index are keyed on
+    their position in its buffer, without hashing it.
+    """
+    memo = AnalysisMemo()
+    total, calls = make_counted(memo)
+    df = set_dataset_version(pd.DataFrame({'a': [1, 2, 3, 4]}, index=[10, 11, 12, 13]), 'v1')
+
+    view = df.copy(deep=False)
+    assert total(view, 'a') == 10
+    view['a'] = view['a'].clip(upper=2)
+    assert total(view, 'a') == 7
+
+    def no_hash(*args, **kwargs):
+        raise AssertionError('index hashed')
+
+    monkeypatch.setattr(pd.util, 'hash_pandas_object', no_hash)
+    assert total(df.iloc[1:3], 'a') == 5
+    assert total(df.iloc[1:3], 'a') == 5
+    assert total(df.iloc[2:4], 'a') == 7
+    assert len(calls) == 4
+    assert memo.stats()['hits'] == 1
@@ -4,7 +4,14 @@ from tests.conftest import sample_raw_recipes
 from app_streamlit.load_data.preprocess.normalisation import *
 from app_streamlit.load_data.preprocess.add_drop_column import *
 from app_streamlit.load_data.preprocess.cleaning_data import outliers_df 
+from load_data.preprocess.clean_dataframe import prepare_final_dataframe, prepare_final_dataframe_chunked
+from load_data.preprocess.df_aggregate import df_aggregate, PartialAggregate
+from load_data.preprocess.incremental import IncrementalPreprocessing
+from load_data.preprocess.distinct_users import DistinctUserCounter
+from load_data.preprocess.profiling import PipelineReport
+import json
 import logging
+import numpy as np
 import pytest
 
 
@@ -49,13 +56,76 @@ def test_outliers_df(outliers_sample):
     assert len(outliers) == 4  # Check number of outliers
     assert all(value < 10 for value in outliers)
 
-    # Test with both treshold_sup and treshold_inf
-    outliers_info = outliers_df(outliers_sample, column='A', treshold_sup=10, treshold_inf=30, get_info=True)
+    # Test with both treshold_sup and treshold_inf: outliers on either side
+    outliers_info = outliers_df(outliers_sample, column='A', treshold_sup=30, treshold_inf=10, get_info=True)
     assert isinstance(outliers_info, pd.DataFrame)
-    assert len(outliers_info) == 6  # Check filtered rows
-    assert all(outliers_info['A'].between(10, 30, inclusive='neither'))
+    assert len(outliers_info) == 10  # Check filtered rows
+    assert not any(outliers_info['A'].between(10, 30))
 
 
+def test_outliers_df_any_index(outliers_sample):
+    """
+    outliers_df does not rely on a 0..n index anymore.
+    """
+    shuffled = outliers_sample.sample(frac=1, random_state=0)
+    shuffled.index = shuffled.index * 10 + 5
+    expected = outliers_df(outliers_sample, column='A', treshold_sup=30)
+    outliers = outliers_df(shuffled, column='A', treshold_sup=30)
+    assert sorted(outliers) == sorted(expected)
+    assert all(isinstance(value, int) for value in outliers)
+
+    sup, inf = outliers_df(shuffled, column='A', treshold_sup=40, treshold_inf=5)
+    assert sorted(sup) == [42, 45, 48]
+    assert sorted(inf) == [0, 3]
+
+def test_outliers_mask(outliers_sample):
+    """
+    outliers_mask flags the values above treshold_sup or below treshold_inf,
+    aligned on the index of the dataframe.
+    """
+    df = outliers_sample.set_index(outliers_sample.index + 100)
+    mask = outliers_mask(df, 'A', treshold_sup=40, treshold_inf=5)
+    assert mask.index.equals(df.index)
+    assert df.loc[mask, 'A'].tolist() == [0, 3, 42, 45, 48]
+
+    # both thresholds in one pass
+    df = pd.DataFrame({'A': [1, 50, 1, 2, 10]})
+    assert df[~outliers_mask(df, 'A', treshold_sup=20, treshold_inf=2)]['A'].tolist() == [2, 10]
+
+def test_outliers_df_info_matches_mask(outliers_sample):
+    """
+    The rows reported by outliers_df are the rows flagged by outliers_mask.
+    """
+    for thresholds in [{'treshold_sup': 30}, {'treshold_inf': 10}, {'treshold_sup': 40, 'treshold_inf': 5}]:
+        outliers_info = outliers_df(outliers_sample, column='A', get_info=True, **thresholds)
+        expected = outliers_sample[outliers_mask(outliers_sample, 'A', **thresholds)]
+        pd.testing.assert_frame_equal(outliers_info, expected)
+
+def test_remove_outliers_iqr_multi():
+    """
+    The sequential semantics gives the same rows as successive calls to remove_outliers_iqr,
+    the joint one computes all the bounds on the whole dataFrame.
+    """
+    df = pd.DataFrame({
+        'A': np.r_[np.arange(100), 1000],
+        'B': np.r_[np.arange(100) * 2.0, 50],
+        'C': np.r_[-500, np.arange(100)],
+    })
+    expected = df
+    for col in ['A', 'B', 'C']:
+        expected = remove_outliers_iqr(expected, col)
+
+    result, removed = remove_outliers_iqr_multi(df, ['A', 'B', 'C'])
+    pd.testing.assert_frame_equal(result, expected)
+    assert removed == {'A': 1, 'B': 0, 'C': 1}
+
+    joint, removed = remove_outliers_iqr_multi(df, ['A', 'B', 'C'], semantics='joint')
+    assert removed == {'A': 1, 'B': 0, 'C': 1}
+    assert len(joint) == len(df) - 2
+
+    with pytest.raises(ValueError):
+        remove_outliers_iqr_multi(df, ['A'], semantics='other')
+
 
 def test_df_merged(merged_sample):
     """
@@ -178,4 +248,156 @@ def test_drop_columns_existing(sample_raw_recipes):
     df = sample_raw_recipes[['recipe_id', 'name', 'ingredients']].head(10)
     result = drop_columns(df, ['name', 'ingredients'])
     expected = sample_raw_recipes[['recipe_id']].head(10)
-    pd.testing.assert_frame_equal(result, expected)  #remove column
\ No newline at end of file
+    pd.testing.assert_frame_equal(result, expected)  #remove column
+
+def test_partial_aggregate_matches_df_aggregate(raw_dataset):
+    """
+    Merging the partial aggregates of several chunks gives the metrics of df_aggregate.
+    """
+    raw_interaction = raw_dataset[0]
+    expected = df_aggregate(raw_interaction)[['recipe_id', 'num_comments', 'avg_ratings']]
+
+    aggregate = PartialAggregate()
+    for start in range(0, len(raw_interaction), 150):
+        aggregate = aggregate.merge(PartialAggregate.from_interactions(raw_interaction.iloc[start:start + 150]))
+    result = aggregate.metrics()
+
+    pd.testing.assert_frame_equal(
+        result,
+        expected.sort_values('recipe_id').reset_index(drop=True),
+    )
+
+
+@pytest.mark.parametrize("chunk_rows", [64, 10_000])
+def test_prepare_final_dataframe_chunked(raw_dataset, chunk_rows):
+    """
+    The chunked pipeline gives the same dataFrame as the in-memory one.
+    """
+    expected = prepare_final_dataframe(*raw_dataset)
+    result = prepare_final_dataframe_chunked(*raw_dataset, chunk_rows=chunk_rows)
+    assert len(result) > 0
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_prepare_final_dataframe_chunked_from_csv(raw_dataset, tmp_path):
+    """
+    The chunked pipeline reads the raw csv files by chunks.
+    """
+    paths = []
+    for name, df in zip(['raw_interaction', 'raw_recipes', 'pp_recipes'], raw_dataset):
+        path = tmp_path / f'{name}.csv'
+        df.to_csv(path, index=False)
+        paths.append(str(path))
+
+    expected = prepare_final_dataframe(*[pd.read_csv(path) for path in paths])
+    result = prepare_final_dataframe_chunked(*paths, memory_budget_mb=0.05)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_incremental_preprocessing(raw_dataset, tmp_path):
+    """
+    Appending the interactions by batches, with the state saved in between, gives the
+    dataFrame of the whole preprocessing.
+    """
+    raw_interaction, raw_recipes, pp_recipes = raw_dataset
+    expected = prepare_final_dataframe(*raw_dataset)
+
+    half = len(raw_interaction) // 2
+    first = IncrementalPreprocessing(raw_recipes, pp_recipes, chunk_rows=7)
+    first.append(raw_interaction.iloc[:half]).save(tmp_path / 'state')
+
+    second = IncrementalPreprocessing.load(tmp_path / 'state', raw_recipes, pp_recipes, chunk_rows=7)
+    result = second.append(raw_interaction.iloc[half:]).result()
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_distinct_user_counter_exact(raw_dataset):
+    """
+    Counters of chunks merged in any order count the distinct users of each recipe exactly.
+    """
+    raw_interaction = raw_dataset[0]
+    expected = raw_interaction.groupby('recipe_id')['user_id'].nunique()
+
+    chunks = np.array_split(np.arange(len(raw_interaction)), 3)
+    counter = DistinctUserCounter()
+    for rows in [chunks[2], chunks[0], chunks[1]]:
+        chunk = raw_interaction.iloc[rows]
+        counter = counter.merge(DistinctUserCounter.from_pairs(chunk['recipe_id'], chunk['user_id']))
+    assert counter.exact
+    pd.testing.assert_series_equal(counter.counts(), expected, check_names=False, check_dtype=False)
+    assert counter.counts([expected.index[0]]).tolist() == [expected.iloc[0]]
+
+
+def test_distinct_user_counter_merge_deduplicates_once(monkeypatch):
+    """
+    Merged chunks are deduplicated once, when the counter is read, with the same counts.
+    """
+    import load_data.preprocess.distinct_users as distinct_users
+
+    rng = np.random.default_rng(0)
+    recipe_ids = rng.integers(0, 50, size=5000)
+    user_ids = rng.integers(0, 200, size=5000)
+    expected = pd.Series(user_ids).groupby(recipe_ids).nunique()
+
+    unique_calls = []
+    for name in ['unique', 'union1d']:
+        function = getattr(np, name)
+        monkeypatch.setattr(distinct_users.np, name,
+                            lambda *args, function=function, **kwargs: unique_calls.append(1) or function(*args, **kwargs))
+    counter = DistinctUserCounter()
+    for rows in np.array_split(np.arange(5000), 20):
+        chunk = DistinctUserCounter.from_pairs(recipe_ids[rows], user_ids[rows])
+        unique_calls.clear()
+        counter = counter.merge(chunk)
+        assert not unique_calls
+    pd.testing.assert_series_equal(counter.counts(), expected, check_names=False, check_dtype=False)
+    assert len(counter.keys) == expected.sum()
+
+def test_distinct_user_counter_sketch():
+    """
+    Recipes over the threshold are sketched, with an estimate close to the exact count,
+    and the counter is saved and loaded with its sketches.
+    """
+    rng = np.random.default_rng(0)
+    popular = rng.choice(10**9, size=20000, replace=False)
+    first = DistinctUserCounter.from_pairs([1] * 12000 + [2] * 3, list(popular[:12000]) + [5, 6, 7], hll_threshold=100)
+    second = DistinctUserCounter.from_pairs([1] * 12000, popular[8000:], hll_threshold=100)
+
+    counter = first.merge(second)
+    assert list(counter.sketches) == [1]
+    counts = counter.counts()
+    assert counts[2] == 3
+    assert abs(counts[1] - 20000) / 20000 < 0.05
+    assert counter.nbytes < 20000
+
+    loaded = DistinctUserCounter.from_frames(*counter.to_frames(), hll_threshold=100)
+    pd.testing.assert_series_equal(loaded.counts(), counts)
+
+
+def test_prepare_final_dataframe_parallel(raw_dataset):
+    """
+    The parallel row-wise steps give the same dataFrame as the serial ones.
+    """
+    expected = prepare_final_dataframe(*raw_dataset)
+    pd.testing.assert_frame_equal(prepare_final_dataframe(*raw_dataset, n_jobs=2), expected)
+    pd.testing.assert_frame_equal(prepare_final_dataframe_chunked(*raw_dataset, chunk_rows=150, n_jobs=3), expected)
+
+
+def test_pipeline_report(raw_dataset, tmp_path):
+    """
+    The report records every step of the preprocessing, with its rows, and is written as JSON.
+    """
+    report = PipelineReport()
+    result = prepare_final_dataframe(*raw_dataset, report=report)
+    pd.testing.assert_frame_equal(result, prepare_final_dataframe(*raw_dataset))
+
+    frame = report.to_frame()
+    assert frame['step'].tolist() == ['merge', 'add_columns', 'split_date', 'split_submitted', 'outliers_n_steps',
+                                      'outliers_minutes', 'aggregate', 'season', 'nutrition', 'iqr', 'schema']
+    assert frame['rows_in'].iloc[0] == len(raw_dataset[0])
+    assert frame['rows_out'].iloc[-1] == len(result)
+    assert (frame[['wall_s', 'cpu_s']] >= 0).all().all()
+
+    document = json.loads(report.to_json(tmp_path / 'report.json'))
+    assert [step['step'] for step in document['steps']] == frame['step'].tolist()
+    assert (tmp_path / 'report.json').exists()
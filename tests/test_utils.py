@@ -3,6 +3,9 @@ import pandas as pd
 from app_streamlit.analyse.utils import * 
 from unittest.mock import patch
 from app_streamlit.analyse.utils import nutri_score
+from app_streamlit.analyse.plots import visualise_recipe_season, visualise_low_rank_insight
+import matplotlib.pyplot as plt
+import seaborn as sns
 
 def test_metrics_main_contributor(sample_raw_recipes):
     """
@@ -45,6 +48,74 @@ def test_count_contributors_by_recipe_range_with_bins(sample_raw_recipes):
     assert all(isinstance(label, str) for label in result.index)
     assert result.sum() > 0  
 
+def test_contributor_functions_do_not_mutate(sample_raw_recipes):
+    """
+    The analysis functions read the derived contributor key, computed once for the
+    registered dataset, and leave their inputs unchanged.
+    """
+    from analyse.derived import clear_derived, derived_column, register_dataset
+    from analyse.memo import set_dataset_version
+    df = set_dataset_version(sample_raw_recipes, 'test-derived')
+    register_dataset(df)
+    before = df.copy()
+    top_contributors = df[['contributor_id']].drop_duplicates().head(5)
+
+    stats = average_and_total_comments_per_contributor(df)
+    top = top_commented_recipes_by_contributors(df, top_contributors)
+    pd.testing.assert_frame_equal(df, before)
+    assert top_contributors['contributor_id'].dtype == 'int64'
+    assert set(top['contributor_id']) <= set(top_contributors['contributor_id'].astype(str))
+    assert stats['total_comments'].sum() == df['num_comments'].sum()
+
+    subset = df.iloc[10:50]
+    key = derived_column(subset, 'contributor_key')
+    assert key.index.equals(subset.index)
+    assert list(key) == list(subset['contributor_id'].astype(str))
+
+    rewritten = subset.assign(contributor_id=subset['contributor_id'] + 1)
+    key = derived_column(rewritten, 'contributor_key')
+    assert list(key) == list(rewritten['contributor_id'].astype(str))
+    clear_derived('test-derived')
+
+def test_contributor_functions_read_summary(sample_raw_recipes):
+    """
+    The contributor functions give the same results from the summary table as from the frame.
+    """
+    from load_data.contributor_summary import build_contributor_summary, contributor_stats
+    summary = build_contributor_summary(sample_raw_recipes)
+
+    assert metrics_main_contributor(sample_raw_recipes, summary) == metrics_main_contributor(sample_raw_recipes)
+    pd.testing.assert_series_equal(
+        count_contributors_by_recipe_range_with_bins(sample_raw_recipes, summary),
+        count_contributors_by_recipe_range_with_bins(sample_raw_recipes),
+        check_names=False,
+    )
+    pd.testing.assert_frame_equal(
+        average_and_total_comments_per_contributor(sample_raw_recipes, summary),
+        average_and_total_comments_per_contributor(sample_raw_recipes),
+    )
+
+    contributor_id = sample_raw_recipes['contributor_id'].iloc[0]
+    stats = contributor_stats(summary, contributor_id)
+    recipes = sample_raw_recipes[sample_raw_recipes['contributor_id'] == contributor_id]
+    assert stats['mean_rating'] == recipes['avg_ratings'].mean()
+    assert contributor_stats(summary, -1) is None
+
+def test_metrics_main_contributor_duplicated_recipes(sample_raw_recipes):
+    """
+    The number of recipes read from the summary counts the distinct recipes, when a recipe
+    has several rows, for one or several contributors.
+    """
+    from load_data.contributor_summary import build_contributor_summary
+    duplicated = sample_raw_recipes.iloc[:5].copy()
+    duplicated['contributor_id'] = duplicated['contributor_id'].iloc[::-1].to_numpy()
+    df = pd.concat([sample_raw_recipes, duplicated, sample_raw_recipes.iloc[5:8]], ignore_index=True)
+    assert df['recipe_id'].duplicated().any()
+
+    summary = build_contributor_summary(df)
+    assert metrics_main_contributor(df, summary) == metrics_main_contributor(df)
+    assert metrics_main_contributor(df)[1] == sample_raw_recipes['recipe_id'].nunique()
+
 def test_top_commented_recipes(sample_raw_recipes):
     """
     Test that the top N commented recipes are correctly extracted.
@@ -66,6 +137,16 @@ def test_get_top_tags(sample_raw_recipes):
     assert len(result) <= 5
     assert all(isinstance(tag, str) for tag in result.index)
 
+def test_get_top_tags_list_column(sample_raw_recipes):
+    """
+    The tags parsed by the loader give the same top tags as the strings of the csv.
+    """
+    from load_data.list_columns import parse_list_columns
+    expected = get_top_tags(sample_raw_recipes, top_n=10)
+    result = get_top_tags(parse_list_columns(sample_raw_recipes), top_n=10)
+    pd.testing.assert_series_equal(result, expected)
+    assert result.is_monotonic_decreasing
+
 def test_get_top_ingredients2(sample_raw_recipes):
     """
     Test that the top ingredients are correctly extracted, excluding specified ingredients.
@@ -78,6 +159,74 @@ def test_get_top_ingredients2(sample_raw_recipes):
     assert all(isinstance(ingredient, str) for ingredient in result.index)
     assert 'salt' not in result.index
 
+def test_ingredient_lookup_top():
+    """
+    The lookup counts the names of the IDs like mapping them one by one, unknown IDs included.
+    """
+    from analyse.ingredients import IngredientLookup
+    # get_top_ingredients2 is redefined further down in this module
+    from analyse.utils import get_top_ingredients2 as top_ingredients2
+    df_ingr_map = pd.DataFrame({'id': [1, 2, 3, 5], 'replaced': ['salt', 'egg', 'milk', 'egg']})
+    df = pd.DataFrame({'ingredient_ids': ['[1, 2, 3]', '[2, 5, 4]', None, '[3, 2, 100]']})
+    lookup = IngredientLookup(df_ingr_map)
+
+    result = top_ingredients2(df, lookup, excluded_ingredients={'salt'}, top_n=3)
+    assert result.to_dict() == {'egg': 4, 'milk': 2, 'Unknown': 2}
+    assert result.index.name == 'mapped_ingredients'
+    pd.testing.assert_series_equal(top_ingredients2(df, df_ingr_map, {'salt'}, 3), result)
+    assert 'mapped_ingredients' not in df.columns
+
+def test_seasonal_counts_match_per_season(sample_raw_recipes):
+    """
+    The one-pass season x ingredient counts give the same tops and unique ingredients
+    as counting each season on its own.
+    """
+    from analyse.ingredients import IngredientLookup
+    from analyse.utils import get_top_ingredients2 as top_ingredients2
+    df_ingr_map = pd.DataFrame({'id': range(8000), 'replaced': [f'ingredient{i % 97}' for i in range(8000)]})
+    lookup = IngredientLookup(df_ingr_map)
+
+    tops = trendy_ingredients_by_seasons(sample_raw_recipes, lookup, 15)
+    uniques = unique_ingr(sample_raw_recipes, lookup, top_n=15)
+    expected_tops = [
+        top_ingredients2(sample_raw_recipes[sample_raw_recipes['season'] == season], lookup, top_n=15)
+        for season in ['winter', 'spring', 'summer', 'autumn']
+    ]
+    for top, expected in zip(tops, expected_tops):
+        pd.testing.assert_series_equal(top, expected)
+    for i, unique in enumerate(uniques):
+        others = set().union(*[expected_tops[j].index for j in range(4) if j != i])
+        assert unique == [name for name in expected_tops[i].index if name not in others]
+
+def test_cat_minutes_buckets():
+    """
+    Edges of the buckets: upper edges included, 240 minutes and above, negative and missing in '4h_more'.
+    """
+    minutes = [0, 15, 15.5, 30, 31, 60, 61, 120, 121, 180, 181, 239, 239.9, 240, 240.5, 10000, -1, None]
+    expected = ['less_15min', 'less_15min', '15_30min', '15_30min', '30min_1h', '30min_1h', '1h_2h',
+                '1h_2h', '2h_3h', '2h_3h', '3h_4h', '3h_4h', '3h_4h', '4h_more', '4h_more', '4h_more',
+                '4h_more', '4h_more']
+    result = cat_minutes(pd.DataFrame({'minutes': minutes}))
+    assert list(result) == expected
+    assert result.cat.ordered
+    assert list(result.cat.categories) == list(MINUTES_LABELS.values())
+
+def test_best_recipe_filter_time_query_matches_buckets():
+    """
+    The conditions pushed down into the query select the rows of each bucket of cat_minutes.
+    """
+    from load_data.query import DatasetQuery
+    minutes = [0, 15, 15.5, 30, 31, 60, 61, 120, 121, 180, 181, 239, 239.9, 240, 240.5, 10000, -1, None]
+    df = pd.DataFrame({'minutes': minutes, 'name': 'recipe', 'n_steps': 1, 'num_comments': range(len(minutes)),
+                       'ingredients': 'salt', 'avg_reviews': 5})
+    buckets = cat_minutes(df)
+    for category in MINUTES_CATEGORIES:
+        expected = df[buckets == category].sort_values('num_comments', ascending=False).head(10)
+        for source in [df, DatasetQuery(df)]:
+            result = best_recipe_filter_time(source, category, 10)
+            assert list(result.index) == list(expected.index)
+    assert best_recipe_filter_time(df, '30-60 min', 10).empty
+
 def test_user_recipes(recipes_table):
     # Get recipes for the specific user
     user_recipes_df = user_recipes(recipes_table, 47892)
@@ -86,6 +235,20 @@ def test_user_recipes(recipes_table):
     assert list(user_recipes_df['name']) == ["Recipe1", "Recipe2"]  # Ensure names match exactly
 
 
+def test_user_recipes_with_contributor_index(sample_raw_recipes):
+    """
+    The recipes found through the contributor index are the ones found by scanning the frame.
+    """
+    from analyse.contributor_index import ContributorIndex
+    index = ContributorIndex(sample_raw_recipes)
+    assert list(index.contributors) == sorted(sample_raw_recipes['contributor_id'].unique())
+    for contributor_id in index.contributors:
+        expected = user_recipes(sample_raw_recipes, contributor_id)
+        result = user_recipes(sample_raw_recipes, contributor_id, index)
+        assert list(result['recipe_id']) == list(expected['recipe_id'])
+    assert user_recipes(sample_raw_recipes, -1, index).empty
+
+
 # Test for the top_recipes_user function
 def test_top_recipes_user(sample_raw_recipes):
     """
@@ -110,6 +273,36 @@ def test_top_recipes_user(sample_raw_recipes):
 def test_nutri_score(nutriments_data):
     assert nutri_score(nutriments_data) == "A"
 
+def test_nutri_score_batch_matches_nutri_score():
+    """
+    The vectorized Nutri-Score gives the same grade as the row-wise one,
+    including on the thresholds themselves and on missing values.
+    """
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({
+        'Calories': rng.uniform(0, 4000, n),
+        'Sugar': rng.uniform(0, 60, n),
+        'Saturated Fat': rng.uniform(0, 15, n),
+        'Sodium': rng.uniform(0, 1200, n),
+        'Protein': rng.uniform(0, 12, n),
+    })
+    # values on the thresholds and missing values
+    df.loc[:9, 'Calories'] = CALORIES_THRESHOLDS
+    df.loc[10:19, 'Sugar'] = SUGAR_THRESHOLDS
+    df.loc[20:24, 'Protein'] = PROTEIN_THRESHOLDS
+    df.loc[30, 'Sodium'] = np.nan
+    df.loc[31, 'Protein'] = np.nan
+    df.index = df.index + 100
+
+    result = nutri_score_batch(df)
+    expected = df.apply(nutri_score, axis=1)
+
+    assert isinstance(result.dtype, pd.CategoricalDtype)
+    assert list(result.cat.categories) == ['A', 'B', 'C', 'D', 'E']
+    assert (result.astype(str) == expected).all()
+    assert result.index.equals(df.index)
+
 
 
 # Sample function for getting top ingredients, as assumed to be working
@@ -266,6 +459,16 @@ def test_visualise_recipe_season(sample_data):
     assert len(low_bars) == 3, "Incorrect number of low-ranking bars"
     assert len(high_bars) == 3, "Incorrect number of high-ranking bars"
 
+def test_visualise_recipe_season_new_figure(visu_data):
+    """Only the counts are memoized, each call draws its own figure."""
+    from analyse.memo import set_dataset_version
+    df = set_dataset_version(visu_data.rename(columns={'avg_ratings': 'avg_reviews'}), 'test-figure')
+    first = visualise_recipe_season(df)
+    second = visualise_recipe_season(df)
+    assert first is not second
+    plt.close(first)
+    plt.close(second)
+
 def test_group_by_season_and_count(sample_data):
     """Test if the grouping by season and count calculation works correctly."""
     df_high = sample_data[sample_data['avg_ratings'].isin([4, 5])]
@@ -280,3 +483,41 @@ def test_group_by_season_and_count(sample_data):
     assert count_data_low.loc[count_data_low['season'] == 'Winter', 'count'].iloc[0] == 1, "Low-ranking count for Winter is incorrect"
     assert count_data_low.loc[count_data_low['season'] == 'Fall', 'count'].iloc[0] == 2, "Low-ranking count for Fall is incorrect"
 
+
+def test_unique_ingr_counts():
+    """The season word clouds use the occurrences of the ingredients specific to each season."""
+    df = pd.DataFrame({
+        'season': ['winter', 'winter', 'summer', 'spring', 'autumn'],
+        'ingredient_ids': ['[1, 2]', '[1, 3]', '[2, 4]', '[4]', '[5]'],
+    })
+    ingr_map = pd.DataFrame({'id': [1, 2, 3, 4, 5], 'replaced': ['leek', 'egg', 'chestnut', 'peach', 'pumpkin']})
+    counts = unique_ingr_counts(df, ingr_map, top_n=10)
+    names = unique_ingr(df, ingr_map, top_n=10)
+    assert [list(series.index) for series in counts] == [list(season) for season in names]
+    winter, spring, summer, autumn = counts
+    assert winter.to_dict() == {'leek': 2, 'chestnut': 1}
+    assert spring.empty and summer.empty
+    assert autumn.to_dict() == {'pumpkin': 1}
+
+def test_wordcloud_png_cache():
+    """Word clouds are rendered once per scope, number of words and frequencies, in a bounded cache."""
+    from app_streamlit.analyse.memo import AnalysisMemo
+    from app_streamlit.analyse.plots import frequency_fingerprint, wordcloud_png
+
+    cache = AnalysisMemo(max_entries=2)
+    frequencies = pd.Series({'leek': 5, 'chestnut': 2, 'pumpkin': 1})
+    png = wordcloud_png(frequencies, scope='season:winter', top_n=3, width=200, height=100, cache=cache)
+    assert png.startswith(b'\x89PNG')
+    assert frequency_fingerprint(frequencies) == frequency_fingerprint(dict(reversed(list(frequencies.items()))))
+
+    again = wordcloud_png(frequencies.to_dict(), scope='season:winter', top_n=3, width=200, height=100, cache=cache)
+    assert again is png and cache.hits == 1
+
+    # same frequencies rendered again from scratch give the same image
+    fresh = wordcloud_png(frequencies, scope='season:winter', top_n=3, width=200, height=100, cache=AnalysisMemo())
+    assert fresh == png
+
+    for scope in ['season:spring', 'season:summer']:
+        wordcloud_png(frequencies, scope=scope, top_n=3, width=200, height=100, cache=cache)
+    assert len(cache) == 2
+    assert cache.stats()['nbytes'] >= 2 * len(png)